@@ -0,0 +1,266 @@
+"""
+Load tests `-events` against a fake Google Calendar (see `fake_calendar.py`) full of generated
+events, so it needs discord.py but no tokens and no network connection.
+
+The fake runs in its own process, so the memory that is measured is only the bot's. For every
+window of days it times building the `-events` embed (`event_utils.build_events_embed()`) with
+each way the bot can get events:
+
+    googleapiclient  straight from the API, with `gcal_backend.GoogleApiBackend`
+    aiohttp          straight from the API, with `gcal_backend.AiohttpBackend`
+    store            from a synced `EventStore`
+    first page       the first page of `-events` (`event_utils.event_pages()`), from the store
+    cached           the first page again, once it is in `event_utils.EMBED_CACHE`
+
+and it times a full and an incremental sync of the `EventStore`. Each one is reported as p50 and
+p95 latency, peak memory, and the HTTP requests, API calls and KiB sent by the fake per run.
+
+    python benchmarks/calendar_bench.py --calendars 4 --events 2500 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import os.path
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+import urllib.request
+from typing import Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.abspath(os.path.join(HERE, '..'))
+sys.path.append(ROOT)  # import from directory above
+os.chdir(ROOT)  # `extras` reads config.json from here
+
+import event_utils
+from classes.event_store import EventStore
+from classes.gcal_api import CalendarService
+from classes.gcal_backend import AiohttpBackend, GoogleApiBackend
+from classes.swr_cache import SWRCache
+from fake_calendar import build_service
+
+COUNTED = ('http', 'calls', 'bytes')
+
+
+class FakeCredentials:
+    """
+    The fake doesn't check tokens, so these never need refreshing
+    """
+    def __init__(self):
+        self.credentials = self
+        self.token = "fake"
+
+    def needs_refresh(self) -> bool:
+        return False
+
+    def refresh(self) -> None:
+        pass
+
+    async def call(self, func, *args):
+        return func(*args)
+
+
+class FakeProcess:
+    def __init__(self, args: List[str]):
+        """
+        Runs `fake_calendar.py` with `args` until `stop()`
+
+        :param args: command line args for `fake_calendar.py`
+        :type args: List[str]
+        """
+        self.process = subprocess.Popen([sys.executable, os.path.join(HERE, 'fake_calendar.py')]
+                                        + args, stdout=subprocess.PIPE, text=True)
+        self.url = self.process.stdout.readline().split()[-1]  # "Serving on <url>"
+
+    def admin(self, path: str, method: str = 'POST') -> dict:
+        request = urllib.request.Request(self.url + '/_fake/' + path, method=method, data=b"")
+        with urllib.request.urlopen(request) as response:
+            return json.load(response)
+
+    def stats(self) -> Dict[str, int]:
+        return self.admin('stats', method='GET')
+
+    def stop(self) -> None:
+        self.process.terminate()
+        self.process.wait()
+
+
+def percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+
+def measure(fake: FakeProcess, run: Callable, repeat: int, setup: Callable = None) -> dict:
+    """
+    Times `run()` `repeat` times, counting what it asked the fake for, then runs it once more under
+    tracemalloc to get its peak memory. Runs that raise are counted as failed.
+
+    :param fake: the fake Google Calendar
+    :type fake: FakeProcess
+    :param run: what is measured
+    :type run: Callable
+    :param repeat: number of timed runs
+    :type repeat: int
+    :param setup: called before every run, it isn't timed
+    :type setup: Callable
+    :return: the results for one row of the report
+    :rtype: dict
+    """
+    times, counts, failed = [], {key: [] for key in COUNTED}, 0
+    peak = 0.0
+    for i in range(repeat + 1):
+        if setup is not None:
+            setup()
+        measure_memory = i == repeat  # tracemalloc slows everything down, so it gets its own run
+        before = fake.stats()
+        if measure_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            run()
+        except Exception as e:
+            failed += 1
+            print(f"  failed: {type(e).__name__}: {str(e)[:100]}", file=sys.stderr)
+            continue
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            if measure_memory:
+                peak = tracemalloc.get_traced_memory()[1] / 1024
+                tracemalloc.stop()
+        if not measure_memory:
+            times.append(elapsed)
+            after = fake.stats()
+            for key in COUNTED:
+                counts[key].append(after.get(key, 0) - before.get(key, 0))
+
+    def mean(values: List[int]) -> float:
+        return round(statistics.mean(values), 1) if values else 0
+
+    return {
+        'p50 ms': round(percentile(times, 50), 2) if times else None,
+        'p95 ms': round(percentile(times, 95), 2) if times else None,
+        'peak KiB': round(peak, 1),
+        'http': mean(counts['http']),
+        'calls': mean(counts['calls']),
+        'KiB': round(mean(counts['bytes']) / 1024, 1),
+        'failed': failed
+    }
+
+
+def run_benchmark(fake: FakeProcess, windows: List[int], repeat: int, changes: int) -> dict:
+    """
+    Runs every scenario against `fake`, see the top of the file
+
+    :param fake: the fake Google Calendar
+    :type fake: FakeProcess
+    :param windows: the numbers of days `-events` is timed with
+    :type windows: List[int]
+    :param repeat: number of timed runs of each
+    :type repeat: int
+    :param changes: number of changes to the calendars before each incremental sync
+    :type changes: int
+    :return: scenario -> window (or 'sync') -> results
+    :rtype: dict
+    """
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    service = build_service(fake.url)
+    backends = {'googleapiclient': GoogleApiBackend(CalendarService(service=service)),
+                'aiohttp': AiohttpBackend(FakeCredentials(), base_url=fake.url + '/calendar/v3')}
+    results = {}
+
+    def embed(days: int) -> Callable:
+        return lambda: loop.run_until_complete(event_utils.build_events_embed(days == 0, days))
+
+    for name, backend in backends.items():
+        event_utils.CALENDAR_BACKEND = backend
+        event_utils.EVENT_STORE = EventStore()  # never synced, so `-events` asks Google
+        results[name] = {days: measure(fake, embed(days), repeat) for days in windows}
+    loop.run_until_complete(backends['aiohttp'].close())
+
+    stores = []
+    results['full sync'] = {'sync': measure(fake, lambda: stores[-1].sync(service), repeat,
+                                            setup=lambda: stores.append(EventStore()))}
+    store = stores[-1]
+    results['incremental sync'] = {'sync': measure(
+        fake, lambda: store.sync(service), repeat,
+        setup=lambda: fake.admin(f'changes?count={changes}'))}
+
+    event_utils.EVENT_STORE = store
+    results['store'] = {days: measure(fake, embed(days), repeat) for days in windows}
+
+    async def render_first_page(days: int):
+        pages = await event_utils.event_pages(None, days == 0, days)
+        return await pages.render(0)
+
+    def first_page(days: int) -> Callable:
+        return lambda: loop.run_until_complete(render_first_page(days))
+    results['first page'] = {days: measure(fake, first_page(days), repeat) for days in windows}
+
+    event_utils.EMBED_CACHE = SWRCache(ttl=3600)
+
+    async def cached_first_page(days: int):
+        pages = await event_utils.event_pages(None, days == 0, days)
+        return await pages.get_page(0)
+
+    def cached(days: int) -> Callable:
+        return lambda: loop.run_until_complete(cached_first_page(days))
+    results['cached'] = {days: measure(fake, cached(days), repeat, setup=cached(days))
+                         for days in windows}
+    loop.close()
+    return results
+
+
+def report(results: dict) -> str:
+    lines = [f"{'scenario':<18}{'days':>6}{'p50 ms':>10}{'p95 ms':>10}{'peak KiB':>10}"
+             f"{'HTTP':>7}{'calls':>7}{'KiB':>9}{'failed':>8}"]
+    for scenario, windows in results.items():
+        for window, result in windows.items():
+            lines.append(f"{scenario:<18}{window:>6}{str(result['p50 ms']):>10}"
+                         f"{str(result['p95 ms']):>10}{result['peak KiB']:>10}{result['http']:>7}"
+                         f"{result['calls']:>7}{result['KiB']:>9}{result['failed']:>8}")
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load tests -events against a fake Google "
+                                                 "Calendar")
+    parser.add_argument('--calendars', type=int, default=4)
+    parser.add_argument('--events', type=int, default=2500, help="events in each calendar")
+    parser.add_argument('--days', type=int, default=365, help="days after today the events go to")
+    parser.add_argument('--latency', type=float, default=0.05,
+                        help="seconds the fake waits before answering each request")
+    parser.add_argument('--jitter', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help="chance each request fails with a 503")
+    parser.add_argument('--windows', type=int, nargs='+', default=[0, 3, 14, 90],
+                        help="numbers of days -events is timed with")
+    parser.add_argument('--changes', type=int, default=20,
+                        help="changes made to the calendars before each incremental sync")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs of each")
+    parser.add_argument('--output', help="also save the results here as JSON")
+    args = parser.parse_args(argv)
+
+    fake = FakeProcess(['--calendars', str(args.calendars), '--events', str(args.events),
+                        '--days', str(args.days), '--latency', str(args.latency),
+                        '--jitter', str(args.jitter), '--error-rate', str(args.error_rate)])
+    try:
+        results = run_benchmark(fake, args.windows, args.repeat, args.changes)
+    finally:
+        fake.stop()
+
+    print(f"{args.calendars} calendars of {args.events} events, {args.latency * 1000:g} ms latency"
+          f", {args.error_rate:.0%} errors\n")
+    print(report(results))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'args': vars(args), 'results': results}, file, indent=2)
+            file.write("\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
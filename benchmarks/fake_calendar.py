@@ -0,0 +1,531 @@
+"""
+A stand-in for the Google Calendar v3 API that runs locally, so the calendar code can be tested and
+benchmarked without a network connection or an account.
+
+It serves `calendarList.list` and `events.list` (with paging, `timeMin`/`timeMax`, `orderBy`,
+`fields`, and sync tokens) and the batch endpoint, which is enough for both `gcal_api` (through
+`build_service()`) and `gcal_backend.AiohttpBackend` (with `base_url=server.api_url`). Every request
+can be slowed down by `latency` seconds and failed with a 503 `error_rate` of the time, and every
+request is counted in `stats`.
+
+    server = FakeCalendarServer(generate_calendars(calendars=4, events=2000), latency=0.05)
+    with server:
+        service = server.build_service()
+        ...
+
+It can also be run on its own, e.g. to point a bot at it, and then it is controlled over HTTP:
+GET /_fake/stats, POST /_fake/stats (clears them), POST /_fake/changes?count=10 (makes random
+changes) and POST /_fake/expire (see `expire_sync_tokens()`).
+
+    python benchmarks/fake_calendar.py --calendars 4 --events 2000 --latency 0.05 --port 8080
+"""
+import argparse
+import datetime
+import email.parser
+import json
+import os.path
+import random
+import sys
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple, Union
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+
+sys.path.append(  # import from directory above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from classes.gcal_api import DISCOVERY_LOCATION
+
+TIMEZONE = datetime.timezone(datetime.timedelta(hours=-4))  # the team is in EDT
+EVENTS_PAGE = 250  # Google's default and largest page sizes
+EVENTS_MAX_PAGE = 2500
+CALENDARS_PAGE = 100
+CALENDARS_MAX_PAGE = 250
+
+
+def generate_calendars(calendars: int = 4, events: int = 1000, days: int = 365, seed: int = 5587,
+                       now: datetime.datetime = None) -> List[dict]:
+    """
+    Makes calendars full of made up events, spread out from a week ago through `days` days from
+    now. About a fifth of them are all day events (some a few days long), the rest are timed
+    events between 8:00 and 22:00 with a description some of the time.
+
+    :param calendars: number of calendars
+    :type calendars: int
+    :param events: number of events in each calendar
+    :type events: int
+    :param days: number of days after today the events go through
+    :type days: int
+    :param seed: the same seed always makes the same calendars
+    :type seed: int
+    :param now: naive UTC time the events are around, defaults to now
+    :type now: datetime.datetime
+    :return: {id, summary, events} for each calendar, the events are in Google's format
+    :rtype: List[dict]
+    """
+    rand = random.Random(seed)
+    today = (now or datetime.datetime.utcnow()).date()
+    result = []
+    for c in range(calendars):
+        calendar = {'id': f"calendar{c}@group.calendar.google.com", 'summary': f"Calendar {c}",
+                    'events': []}
+        for e in range(events):
+            day = today + datetime.timedelta(days=rand.randrange(-7, days))
+            event = {'id': f"c{c}e{e}", 'summary': f"Event {e} of calendar {c}"}
+            if rand.random() < 0.2:
+                length = rand.choice((1, 1, 1, 2, 3))
+                event['start'] = {'date': day.isoformat()}
+                event['end'] = {'date': (day + datetime.timedelta(days=length)).isoformat()}
+            else:
+                start = datetime.datetime.combine(day, datetime.time(rand.randrange(8, 20),
+                                                                     rand.choice((0, 15, 30, 45))),
+                                                  TIMEZONE)
+                end = start + datetime.timedelta(minutes=rand.choice((30, 60, 90, 120, 240)))
+                event['start'] = {'dateTime': start.isoformat()}
+                event['end'] = {'dateTime': end.isoformat()}
+                if rand.random() < 0.3:
+                    event['description'] = f"Bring {rand.choice(('tools', 'laptops', 'snacks'))}"
+            calendar['events'].append(event)
+        result.append(calendar)
+    return result
+
+
+def parse_fields(fields: str) -> dict:
+    """
+    Parses a `fields` parameter, e.g. 'nextPageToken,items(id,start)' is
+    {'nextPageToken': None, 'items': {'id': None, 'start': None}}, None means the whole thing
+    """
+    def parse(i: int) -> (dict, int):
+        tree, name = {}, ""
+        while i < len(fields):
+            char = fields[i]
+            if char == "(":
+                tree[name.strip()], i = parse(i + 1)
+                name = ""
+            elif char == ")":
+                break
+            elif char == ",":
+                if name.strip():
+                    tree[name.strip()] = None
+                name = ""
+            else:
+                name += char
+            i += 1
+        if name.strip():
+            tree[name.strip()] = None
+        return tree, i
+
+    return parse(0)[0]
+
+
+def project(value, tree: Union[dict, None]):
+    """
+    Keeps only the parts of `value` that are in `tree` (from `parse_fields()`)
+    """
+    if tree is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, tree) for item in value]
+    return {key: project(value[key], sub_tree) for key, sub_tree in tree.items() if key in value}
+
+
+def build_service(url: str):
+    """
+    Builds a googleapiclient service that talks to the fake at `url` instead of Google, from the
+    same discovery document as `gcal_api.CalendarService`. It has no credentials, and like any
+    httplib2 service it must only be used by one thread at a time.
+
+    :param url: where the fake is, e.g. 'http://127.0.0.1:8080'
+    :type url: str
+    :return: the Google Calendar service
+    :rtype: googleapiclient.discovery.Resource
+    """
+    with open(DISCOVERY_LOCATION) as file:
+        discovery = json.load(file)
+    discovery['rootUrl'] = url + '/'
+    discovery['baseUrl'] = url + '/' + discovery['servicePath']
+    return build_from_document(discovery, http=httplib2.Http())
+
+
+def _timestamp(moment: dict) -> float:
+    """
+    Seconds since the epoch of an event's start or end, all day events are at midnight UTC
+    """
+    if 'dateTime' in moment:
+        return datetime.datetime.fromisoformat(moment['dateTime']).timestamp()
+    day = datetime.date.fromisoformat(moment['date'])
+    return datetime.datetime.combine(day, datetime.time(), datetime.timezone.utc).timestamp()
+
+
+def _rfc3339(value: str) -> float:
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+class FakeCalendarServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, calendars: List[dict] = (), latency: float = 0, jitter: float = 0,
+                 error_rate: float = 0, seed: int = 5587, port: int = 0):
+        """
+        A fake Google Calendar on 127.0.0.1, it runs on its own thread between `start()` and
+        `stop()` (or as a context manager).
+
+        Every change to an event is numbered, a sync token is the number of the last change it has
+        seen, so an incremental sync gets every event that changed after it (deleted ones are
+        'cancelled'). `expire_sync_tokens()` makes every token given out so far get a 410.
+
+        :param calendars: {id, summary, events} for each calendar, see `generate_calendars()`
+        :type calendars: List[dict]
+        :param latency: seconds every HTTP request waits before it is answered
+        :type latency: float
+        :param jitter: up to this many more seconds are added to `latency` at random
+        :type jitter: float
+        :param error_rate: the chance each request (or each part of a batch) fails with a 503
+        :type error_rate: float
+        :param seed: seeds the jitter and the errors
+        :type seed: int
+        :param port: port to listen on, 0 picks a free one
+        :type port: int
+        """
+        super().__init__(('127.0.0.1', port), _Handler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._calendars: Dict[str, dict] = {}  # id -> {summary, events: {id: (change, event)}}
+        self._change = 0
+        self._oldest_sync = 0  # tokens from before this change get a 410
+        self._failures: Dict[str, List[int]] = {}
+        self._thread = None
+        self.stats = Counter()
+        for calendar in calendars:
+            self.add_calendar(calendar['id'], calendar['summary'], calendar['events'])
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    @property
+    def api_url(self) -> str:
+        """
+        The `base_url` for `gcal_backend.AiohttpBackend`
+        """
+        return self.url + '/calendar/v3'
+
+    def start(self) -> 'FakeCalendarServer':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def __enter__(self) -> 'FakeCalendarServer':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def build_service(self):
+        return build_service(self.url)
+
+    # changing the calendars
+
+    def add_calendar(self, calendar_id: str, summary: str, events: List[dict] = ()) -> None:
+        with self._lock:
+            self._calendars[calendar_id] = {'summary': summary, 'events': {}}
+            for event in events:
+                self.put_event(calendar_id, event)
+
+    def put_event(self, calendar_id: str, event: dict) -> None:
+        """
+        Adds `event`, or replaces the event with the same id
+        """
+        with self._lock:
+            self._change += 1
+            event = dict(event, status='confirmed', updated=self._updated())
+            self._calendars[calendar_id]['events'][event['id']] = self._change, event
+
+    def delete_event(self, calendar_id: str, event_id: str) -> None:
+        with self._lock:
+            self._change += 1
+            self._calendars[calendar_id]['events'][event_id] = self._change, {
+                'id': event_id, 'status': 'cancelled', 'updated': self._updated()}
+
+    def get_event(self, calendar_id: str, event_id: str) -> dict:
+        with self._lock:
+            return dict(self._calendars[calendar_id]['events'][event_id][1])
+
+    def event_ids(self, calendar_id: str) -> List[str]:
+        with self._lock:
+            return [event_id for event_id, (_, event)
+                    in self._calendars[calendar_id]['events'].items()
+                    if event['status'] != 'cancelled']
+
+    def expire_sync_tokens(self) -> None:
+        with self._lock:
+            self._oldest_sync = self._change + 1
+
+    def random_changes(self, count: int) -> None:
+        """
+        Makes `count` changes to random events, like people editing the calendars, a third of them
+        are moved a day and renamed, a third are deleted and a third are new
+        """
+        with self._lock:
+            for _ in range(count):
+                calendar_id = self._random.choice(list(self._calendars))
+                event_ids = self.event_ids(calendar_id)
+                kind = self._random.randrange(3)
+                if kind == 2 or not event_ids:
+                    seed = self._random.randrange(2 ** 32)
+                    event = generate_calendars(1, 1, seed=seed)[0]['events'][0]
+                    event['id'] = f"new{self._change}"
+                    self.put_event(calendar_id, event)
+                elif kind == 1:
+                    self.delete_event(calendar_id, self._random.choice(event_ids))
+                else:
+                    event = self.get_event(calendar_id, self._random.choice(event_ids))
+                    event['summary'] += " (moved)"
+                    for moment in (event['start'], event['end']):
+                        for key, value in moment.items():
+                            moved = datetime.datetime.fromisoformat(value) + datetime.timedelta(1)
+                            moment[key] = moved.date().isoformat() if key == 'date' \
+                                else moved.isoformat()
+                    self.put_event(calendar_id, event)
+
+    def fail(self, path: str, statuses: List[int]) -> None:
+        """
+        Makes the next requests for `path` (e.g. '/calendar/v3/users/me/calendarList') fail with
+        `statuses`, one each, before it works again
+        """
+        with self._lock:
+            self._failures.setdefault(path, []).extend(statuses)
+
+    @staticmethod
+    def _updated() -> str:
+        return datetime.datetime.utcnow().isoformat(timespec='milliseconds') + 'Z'
+
+    # answering requests
+
+    def handle_call(self, method: str, path: str, query: Dict[str, str]) -> Tuple[int, dict]:
+        """
+        Answers one API call, on its own or from inside a batch
+
+        :param method: the HTTP method
+        :type method: str
+        :param path: the path, e.g. '/calendar/v3/users/me/calendarList'
+        :type path: str
+        :param query: the query string
+        :type query: Dict[str, str]
+        :return: the status and the JSON body
+        :rtype: Tuple[int, dict]
+        """
+        with self._lock:
+            self.stats['calls'] += 1
+            if self._failures.get(path):
+                return self._error(self._failures[path].pop(0), "Failing on purpose")
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self._error(503, "The service is currently unavailable.")
+
+            parts = path.strip('/').split('/')
+            if method != 'GET' or parts[:2] != ['calendar', 'v3']:
+                return self._error(404, "Not Found")
+            if parts[2:] == ['users', 'me', 'calendarList']:
+                self.stats['calendarList.list'] += 1
+                status, body = self._calendar_list(query)
+            elif len(parts) == 5 and parts[2] == 'calendars' and parts[4] == 'events':
+                self.stats['events.list'] += 1
+                status, body = self._events_list(urllib.parse.unquote(parts[3]), query)
+            else:
+                return self._error(404, "Not Found")
+
+        if status == 200 and 'fields' in query:
+            body = project(body, parse_fields(query['fields']))
+        return status, body
+
+    def _calendar_list(self, query: Dict[str, str]) -> Tuple[int, dict]:
+        size = min(int(query.get('maxResults', CALENDARS_PAGE)), CALENDARS_MAX_PAGE)
+        offset = int(query.get('pageToken', 0))
+        items = [{'kind': 'calendar#calendarListEntry', 'id': calendar_id,
+                  'summary': calendar['summary'], 'accessRole': 'reader'}
+                 for calendar_id, calendar in self._calendars.items()]
+        body = {'kind': 'calendar#calendarList', 'items': items[offset:offset + size]}
+        if offset + size < len(items):
+            body['nextPageToken'] = str(offset + size)
+        return 200, body
+
+    def _events_list(self, calendar_id: str, query: Dict[str, str]) -> Tuple[int, dict]:
+        calendar = self._calendars.get(calendar_id)
+        if calendar is None:
+            return self._error(404, "Not Found")
+        if 'syncToken' in query and {'timeMin', 'timeMax', 'orderBy'} & set(query):
+            return self._error(400, "timeMin, timeMax and orderBy can't be used with syncToken")
+        if query.get('orderBy') == 'startTime' and query.get('singleEvents') != 'true':
+            return self._error(400, "orderBy=startTime needs singleEvents=true")
+
+        # a page token is (where the page starts, the last change when the first page was made),
+        # so every page of one listing ends with the same sync token
+        offset, change = map(int, query.get('pageToken', f"0:{self._change}").split(':'))
+        if 'syncToken' in query:
+            since = int(query['syncToken'])
+            if since < self._oldest_sync:
+                return self._error(410, "Sync token is no longer valid, a full sync is required.")
+            events = [event for event_change, event in calendar['events'].values()
+                      if since < event_change <= change]
+        else:
+            events = [event for event_change, event in calendar['events'].values()
+                      if event_change <= change and event['status'] != 'cancelled']
+            if 'timeMin' in query:
+                time_min = _rfc3339(query['timeMin'])
+                events = [event for event in events if _timestamp(event['end']) > time_min]
+            if 'timeMax' in query:
+                time_max = _rfc3339(query['timeMax'])
+                events = [event for event in events if _timestamp(event['start']) < time_max]
+            if query.get('orderBy') == 'startTime':
+                events.sort(key=lambda event: _timestamp(event['start']))
+
+        size = min(int(query.get('maxResults', EVENTS_PAGE)), EVENTS_MAX_PAGE)
+        body = {'kind': 'calendar#events', 'summary': calendar['summary'],
+                'timeZone': 'America/New_York', 'items': events[offset:offset + size]}
+        if offset + size < len(events):
+            body['nextPageToken'] = f"{offset + size}:{change}"
+        else:
+            body['nextSyncToken'] = str(change)
+        return 200, body
+
+    def _error(self, status: int, message: str) -> Tuple[int, dict]:
+        self.stats['errors'] += 1
+        return status, {'error': {'code': status, 'message': message,
+                                  'errors': [{'domain': 'global', 'message': message}]}}
+
+    def handle_batch(self, content_type: str, body: str) -> str:
+        """
+        Answers every call in a multipart/mixed batch, the same way Google does
+
+        :return: the multipart/mixed response, its boundary is 'batch_response'
+        :rtype: str
+        """
+        message = email.parser.Parser().parsestr(f"Content-Type: {content_type}\r\n\r\n{body}")
+        parts = []
+        for part in message.get_payload():
+            request_line = part.get_payload().lstrip().split('\n', 1)[0]
+            method, target, _ = request_line.split(' ', 2)
+            url = urllib.parse.urlsplit(target)
+            query = dict(urllib.parse.parse_qsl(url.query))
+            status, response = self.handle_call(method, url.path, query)
+            content_id = part['Content-ID']
+            parts.append(
+                "--batch_response\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id[1:]}\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(response)}\r\n")
+        with self._lock:
+            self.stats['batch'] += 1
+        return "".join(parts) + "--batch_response--\r\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keeps connections open, like Google
+    disable_nagle_algorithm = True  # the headers and body are sent separately, don't wait for ACKs
+    server: FakeCalendarServer
+
+    def do_GET(self) -> None:
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/_fake/stats':
+            with self.server._lock:
+                stats = dict(self.server.stats)
+            self._send(200, 'application/json', json.dumps(stats), count=False)
+            return
+        self._wait()
+        status, body = self.server.handle_call('GET', url.path,
+                                               dict(urllib.parse.parse_qsl(url.query)))
+        self._send(status, 'application/json; charset=UTF-8', json.dumps(body))
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        url = urllib.parse.urlsplit(self.path)
+        if url.path.startswith('/_fake/'):
+            self._admin(url.path, dict(urllib.parse.parse_qsl(url.query)))
+            return
+        self._wait()
+        if self.path.rstrip('/') != '/batch/calendar/v3':
+            self._send(404, 'application/json; charset=UTF-8', json.dumps({'error': {'code': 404}}))
+            return
+        self._send(200, 'multipart/mixed; boundary=batch_response',
+                   self.server.handle_batch(self.headers['Content-Type'], body))
+
+    def _admin(self, path: str, query: Dict[str, str]) -> None:
+        server = self.server
+        if path == '/_fake/stats':
+            with server._lock:
+                server.stats.clear()
+        elif path == '/_fake/changes':
+            server.random_changes(int(query.get('count', 1)))
+        elif path == '/_fake/expire':
+            server.expire_sync_tokens()
+        else:
+            self._send(404, 'application/json', json.dumps({'error': {'code': 404}}), count=False)
+            return
+        self._send(200, 'application/json', "{}", count=False)
+
+    def _wait(self) -> None:
+        server = self.server
+        with server._lock:
+            server.stats['http'] += 1
+            delay = server.latency + server._random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+
+    def _send(self, status: int, content_type: str, body: str, count: bool = True) -> None:
+        data = body.encode()
+        if count:
+            with self.server._lock:
+                self.server.stats['bytes'] += len(data)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args) -> None:
+        pass  # a load test would print thousands of lines
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Runs a fake Google Calendar v3 API")
+    parser.add_argument('--calendars', type=int, default=4)
+    parser.add_argument('--events', type=int, default=1000, help="events in each calendar")
+    parser.add_argument('--days', type=int, default=365, help="days after today the events go to")
+    parser.add_argument('--latency', type=float, default=0, help="seconds added to each request")
+    parser.add_argument('--jitter', type=float, default=0, help="up to this many more seconds")
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help="chance each request fails with a 503")
+    parser.add_argument('--seed', type=int, default=5587)
+    parser.add_argument('--port', type=int, default=0, help="0 picks a free one")
+    args = parser.parse_args(argv)
+
+    server = FakeCalendarServer(generate_calendars(args.calendars, args.events, args.days,
+                                                   args.seed),
+                                latency=args.latency, jitter=args.jitter,
+                                error_rate=args.error_rate, seed=args.seed, port=args.port)
+    print(f"Serving on {server.url}", flush=True)  # the first line is read by calendar_bench.py
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
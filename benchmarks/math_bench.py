@@ -0,0 +1,291 @@
+"""
+Benchmarks the stages of the math solver on a corpus of real expressions, with no discord
+connection and no worker pool, so it only measures `math_equ`.
+
+Each stage (organize, check_cost, parse_equ, solve_equ) of each entry is timed on its own and
+reported as min, p50 and p95 latency, then run once more under tracemalloc to get its peak memory.
+Every entry is compared against its own baseline, so one slow entry can't hide a regression in a
+fast one. Only the min time and the peak memory are compared, the tail of 20 runs is mostly noise.
+
+A stage regressed if it is worse than the baseline by more than the tolerance plus `MIN_MS` (or
+`MIN_KB`), so tiny stages need a real slowdown too. Entries that regressed are run again in new
+processes, and only the ones that are worse every time count, then it exits with 1.
+
+    python benchmarks/math_bench.py                     # compare against the baseline
+    python benchmarks/math_bench.py --update-baseline   # save the results as the new baseline
+
+The baseline is the median of a few new processes, since sympy's speed changes from one process to
+the next. It is only meaningful on the machine it was made on, update it before comparing on a new
+one.
+"""
+import argparse
+import gc
+import json
+import multiprocessing as mp
+import os.path
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Tuple
+
+sys.path.append(  # import from directory above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import math_equ
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(HERE, 'math_corpus.json')
+BASELINE_PATH = os.path.join(HERE, 'math_baseline.json')
+STAGES = ('organize', 'check_cost', 'parse_equ', 'solve_equ')
+MIN_MS = 0.5  # added to the allowed slowdown, so small stages aren't failed over noise
+MIN_KB = 64  # same for memory
+GATED = (('min ms', MIN_MS), ('peak KiB', MIN_KB))  # the metrics that are compared
+
+
+def stage_calls(args: List[str]) -> List[Tuple[str, Callable]]:
+    """
+    Splits solving one entry into its stages, each stage is a function that takes the result of the
+    one before it. An entry that `check_cost()` rejects stops there, like it would in the bot.
+
+    :param args: the args for the equation, as the user would type them
+    :type args: List[str]
+    :return: (name of the stage, function) for each stage
+    :rtype: List[Tuple[str, Callable]]
+    """
+    def organize(_):
+        return math_equ.organize(args)
+
+    def check_cost(organized):
+        variable, equation, _ = organized
+        try:
+            return variable, equation, math_equ.check_cost(variable, equation)
+        except math_equ.ComplexityError:
+            return None
+
+    def parse(checked):
+        variable, equation, exact = checked
+        return variable, equation, exact, math_equ.parse_equ(equation, exact)
+
+    def solve(parsed):
+        variable, equation, exact, equ = parsed
+        if not exact:  # parsed without evaluating, mpmath works it out
+            return math_equ.approximate_equ(equation)
+        return math_equ.solve_equ(variable, equ)
+
+    return list(zip(STAGES, (organize, check_cost, parse, solve)))
+
+
+def run_entry(args: List[str], repeat: int) -> (Dict[str, List[float]], Dict[str, float]):
+    """
+    Runs one entry once to warm up, times each stage `repeat` times, then runs it once more to
+    measure peak memory
+
+    :param args: the args for the equation
+    :type args: List[str]
+    :param repeat: number of timed runs
+    :type repeat: int
+    :return: stage -> times (ms), stage -> peak memory (KiB)
+    :rtype: Dict[str, List[float]], Dict[str, float]
+    """
+    times = {stage: [] for stage in STAGES}
+    memory = {}
+    gc.disable()  # a collection landing in one run would be the p95, like `timeit` does
+    try:
+        for run in range(-1, repeat + 1):  # run -1 warms up sympy's caches and isn't kept
+            result = None
+            for stage, func in stage_calls(args):
+                if run == repeat:  # tracemalloc slows everything down, so it gets its own run
+                    tracemalloc.start()
+                    result = func(result)
+                    memory[stage] = tracemalloc.get_traced_memory()[1] / 1024
+                    tracemalloc.stop()
+                else:
+                    start = time.perf_counter()
+                    result = func(result)
+                    if run >= 0:
+                        times[stage].append((time.perf_counter() - start) * 1000)
+                if result is None:  # rejected by `check_cost()`
+                    break
+    finally:
+        gc.enable()
+    return times, memory
+
+
+def percentile(values: List[float], percent: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+
+def summarize(times: List[float], memory: float) -> dict:
+    return {'min ms': round(min(times), 3),
+            'p50 ms': round(percentile(times, 50), 3),
+            'p95 ms': round(percentile(times, 95), 3),
+            'peak KiB': round(memory, 1),
+            'runs': len(times)}
+
+
+def run_corpus(corpus: List[dict], repeat: int) -> dict:
+    """
+    Runs every entry of the corpus and sums up each stage of each entry
+
+    :param corpus: entries from `math_corpus.json`
+    :type corpus: List[dict]
+    :param repeat: number of timed runs per entry
+    :type repeat: int
+    :return: the results, in the same format as the baseline
+    :rtype: dict
+    """
+    entries = {}
+    for entry in corpus:
+        entry_times, entry_memory = run_entry(entry['args'], repeat)
+        entries[entry['name']] = {
+            'category': entry['category'],
+            'stages': {stage: summarize(entry_times[stage], entry_memory.get(stage, 0.0))
+                       for stage in STAGES if entry_times[stage]}  # rejected ones stop early
+        }
+
+    return {
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'entries': entries
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> Dict[str, List[str]]:
+    """
+    Finds the stages of each entry that got slower or use more memory than the same stage of the
+    same entry in the baseline, by more than `tolerance` plus `MIN_MS`/`MIN_KB`
+
+    :param results: from `run_corpus()`
+    :type results: dict
+    :param baseline: the stored baseline
+    :type baseline: dict
+    :param tolerance: allowed increase, 0.5 is 50% worse
+    :type tolerance: float
+    :return: entry -> a description of each of its regressions, only entries that regressed
+    :rtype: Dict[str, List[str]]
+    """
+    regressions = {}
+    for name, old_entry in baseline['entries'].items():
+        new_entry = results['entries'].get(name)
+        if new_entry is None:
+            continue
+        for stage, old in old_entry['stages'].items():
+            new = new_entry['stages'].get(stage)
+            if new is None:
+                continue
+            for metric, floor in GATED:
+                if new[metric] > old[metric] * (1 + tolerance) + floor:
+                    regressions.setdefault(name, []).append(
+                        f"{name} {stage} {metric}: {old[metric]} -> {new[metric]}")
+    return regressions
+
+
+def confirm(corpus: List[dict], regressions: Dict[str, List[str]], baseline: dict,
+            tolerance: float, repeat: int, retries: int) -> Dict[str, List[str]]:
+    """
+    Runs the entries that regressed again, each time in a new python process because how fast
+    sympy is changes from one process to the next more than from one run to the next. A slowdown
+    has to happen every time to count.
+
+    :return: the regressions that happened every time
+    :rtype: Dict[str, List[str]]
+    """
+    for _ in range(retries):
+        if not regressions:
+            break
+        entries = [entry for entry in corpus if entry['name'] in regressions]
+        regressions = compare(run_fresh(entries, repeat), baseline, tolerance)
+    return regressions
+
+
+def run_fresh(corpus: List[dict], repeat: int) -> dict:
+    """
+    `run_corpus()` in a new python process
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context('spawn')) as executor:
+        return executor.submit(run_corpus, corpus, repeat).result()
+
+
+def make_baseline(corpus: List[dict], repeat: int, processes: int) -> dict:
+    """
+    Runs the corpus in `processes` new python processes and takes the median of each number, so
+    the baseline is what a typical process gets rather than a lucky or unlucky one
+
+    :return: the baseline, in the same format as `run_corpus()`
+    :rtype: dict
+    """
+    runs = [run_fresh(corpus, repeat) for _ in range(processes)]
+    baseline = runs[0]
+    for name, entry in baseline['entries'].items():
+        for stage, result in entry['stages'].items():
+            for metric in result:
+                result[metric] = statistics.median(run['entries'][name]['stages'][stage][metric]
+                                                   for run in runs)
+    return baseline
+
+
+def report(results: dict, baseline: dict = None) -> str:
+    lines = [f"{'entry':<24}{'stage':<12}{'min ms':>10}{'p50 ms':>10}{'p95 ms':>10}"
+             f"{'peak KiB':>10}{'base min':>10}"]
+    for name, entry in sorted(results['entries'].items(),
+                              key=lambda item: -sum(stage['p50 ms']
+                                                    for stage in item[1]['stages'].values())):
+        old_stages = baseline['entries'].get(name, {}).get('stages', {}) if baseline else {}
+        for stage, result in entry['stages'].items():
+            old = old_stages.get(stage, {})
+            lines.append(f"{name:<24}{stage:<12}{result['min ms']:>10}{result['p50 ms']:>10}"
+                         f"{result['p95 ms']:>10}{result['peak KiB']:>10}"
+                         f"{old.get('min ms', '-'):>10}")
+    return "\n".join(lines)
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the stages of the math solver")
+    parser.add_argument('--repeat', type=int, default=20, help="timed runs per entry")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="allowed slowdown before failing, 0.5 is 50%% slower")
+    parser.add_argument('--processes', type=int, default=5,
+                        help="new processes the baseline is the median of")
+    parser.add_argument('--retries', type=int, default=2,
+                        help="times an entry that looks worse is run again, in a new process")
+    parser.add_argument('--corpus', default=CORPUS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="save the results as the new baseline instead of comparing")
+    args = parser.parse_args(argv)
+
+    with open(args.corpus) as file:
+        corpus = json.load(file)
+
+    if args.update_baseline or not os.path.exists(args.baseline):
+        results = make_baseline(corpus, args.repeat, args.processes)
+        with open(args.baseline, 'w') as file:
+            json.dump(results, file, indent=2)
+            file.write("\n")
+        print(report(results))
+        print(f"\nSaved the baseline to {args.baseline}")
+        return 0
+
+    results = run_corpus(corpus, args.repeat)
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    print(report(results, baseline))
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\nRunning {len(regressions)} entries that look worse again...")
+        regressions = confirm(corpus, regressions, baseline, args.tolerance, args.repeat,
+                              args.retries)
+    if regressions:
+        lines = [line for entry_lines in regressions.values() for line in entry_lines]
+        print("\nRegressions:\n" + "\n".join(lines))
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -13,7 +13,9 @@ import event_utils
 import extras
 from tokens import read_discord_token
 import bot_commands
+import math_utils
 from classes import poll
+from classes.alarms import REPEATS
 
 START_TIME = datetime.datetime.now()
 
@@ -41,7 +43,8 @@ async def test(ctx, user_args: List[str]):
     """
     seconds = int((datetime.datetime.now() - START_TIME).total_seconds())
     await ctx.channel.send(f"Local time: {datetime.datetime.now().strftime('%H:%M')}\n"
-                           f"Uptime: {int(seconds / 60 ** 2)}:{int(seconds / 60) % 60}:{seconds % 60} ")
+                           f"Uptime: {int(seconds / 60 ** 2)}:{int(seconds / 60) % 60}:"
+                           f"{seconds % 60} ")
 
 
 @command_group.new_command(name="Die", description="Kills the bot", syntax="-die", dev_command=True,
@@ -79,7 +82,7 @@ async def events(ctx, user_args: List[Union[int, float, str]]):
     """
     Calls the calendar api and read the calendar and gets the events happening within the amount of
     days specified,
-    sends them within an embed
+    sends them within an embed, a long range is split into pages that are turned with reactions
 
     Permissions needed: None
 
@@ -90,10 +93,11 @@ async def events(ctx, user_args: List[Union[int, float, str]]):
     """
     await ctx.channel.trigger_typing()
     if len(user_args) == 1:
-        embed = await event_utils.manage_events(bot, days=user_args[0], auto=False)
+        pages = await event_utils.event_pages(bot, days=user_args[0])
     else:  # len(user_args) == 0:
-        embed = await event_utils.manage_events(bot, today=True, auto=False)
-    await ctx.channel.send(embed=embed)
+        pages = await event_utils.event_pages(bot, today=True)
+    await pages.start(ctx.channel)
+    bot.loop.create_task(pages.loop())
 
 
 @command_group.new_command(name="Channels", description='Lists which channels are subscribed to the'
@@ -127,13 +131,23 @@ async def setup(ctx, user_args):
 
 @command_group.new_command(name='Math', description="Solves math equations/expressions. Use the "
                                                     "flag '-v' to specify the variable that you "
-                                                    "want to solve for",
-                           syntax='-math <expression/equation> O: [-v <variable to solve for>]',
+                                                    "want to solve for, and '-d' to specify how "
+                                                    "many digits you want. A quick answer is sent "
+                                                    "first and then edited as better ones come in. "
+                                                    "Separate equations with ';' or put them on "
+                                                    "their own lines to solve them all at once. "
+                                                    "Separate equations with ',' and use more than "
+                                                    "one '-v' to solve them as a system. "
+                                                    "Save a variable with '-math -set k = 3.2' and "
+                                                    "use it later, see them with '-vars'",
+                           syntax='-math <expression/equation> O: [, <equation>...] '
+                                  'O: [-v <variable to solve for>...] O: [-d <digits>] '
+                                  'O: [; <expression/equation>...]',
                            min_args=1)
 async def math(ctx, user_args: List[str]):
     """
-    Solves either a math equation or expression. It can hang if the expression is too complex, e.g.
-    5587^5587^5587
+    Solves either a math equation or expression. It runs in a worker process, so if the expression
+    is too complex, e.g. 5587^5587^5587, it gets killed after the timeout instead of hanging the bot
 
     Permissions needed: None
 
@@ -145,18 +159,75 @@ async def math(ctx, user_args: List[str]):
     await bot_commands.math(ctx, user_args)
 
 
+@command_group.new_command(name='Vars', description="Shows the variables you saved with -math, "
+                                                    "they are forgotten after an hour of not "
+                                                    "using -math. Use 'clear' to forget them now",
+                           syntax='-vars O: [clear]', max_args=1)
+async def variables(ctx, user_args: List[str]):
+    """
+    Shows or clears the user's math session variables
+
+    Permissions needed: None
+
+    :param ctx: context object for the message
+    :type ctx: Object
+    :param user_args: args that the user passed in
+    :type: List[str]
+    """
+    await math_utils.variables(ctx, user_args)
+
+
+@command_group.new_command(name='Table', description="Makes a table of the values of an "
+                                                     "expression from start to stop. Use the flag "
+                                                     "'-v' to specify the variable that changes. "
+                                                     "Big tables are sent as a CSV file",
+                           syntax='-table <expression> -r <start> <stop> <step> '
+                                  'O: [-v <variable>]',
+                           min_args=5)
+async def table(ctx, user_args: List[str]):
+    """
+    Evaluates an expression over a range of values all at once, e.g. a motor curve
+
+    Permissions needed: None
+
+    :param ctx: context object for the message
+    :type ctx: Object
+    :param user_args: args that the user passed in
+    :type: List[str]
+    """
+    await bot_commands.table(ctx, user_args)
+
+
+@command_group.new_command(name="MathStats", description="Shows the math worker pool, answer "
+                                                         "cache and session counters",
+                           syntax="-mathstats", dev_command=True, max_args=0)
+async def math_stats(ctx, user_args: List[str]):
+    """
+    Debugging command, sends the counters for the math worker pool, answer cache and sessions
+
+    Permissions needed: being a dev
+
+    :param ctx: context object for the message
+    :type ctx: Object
+    """
+    await math_utils.stats(ctx)
+
+
 @command_group.new_command(name="SetAlarm",
                            description="Sets an alarm to happen at the time specified by '-t' "
                                        "(HH:MM, 24 hour clock) and pings anyone in your message. "
-                                       "You can add an optional message\n"
+                                       "You can add an optional message, a day with '-d' "
+                                       "(YYYY-MM-DD, otherwise it is the next time the clock says "
+                                       "HH:MM) and make it repeat with '-r' (daily or weekly)\n"
                                        "Please note that 12am, which would be 24:00, is "
                                        "expressed as 00:00",
-                           syntax="-setalarm -t <HH:MM> <O: @mention...> <O: message>", min_args=4)
+                           syntax="-setalarm -t <HH:MM> <O: -d YYYY-MM-DD> <O: -r daily|weekly> "
+                                  "<O: @mention...> <O: message>", min_args=2)
 async def setalarm(ctx, user_args: List[str]):
-    """TODO make this function better
-    Creates and alarm that pings people specified at the time (24hr clock) specified. Currently only
-    works for the
-    current day (it can't do any days in advance)
+    """
+    Creates an alarm that pings people specified at the time (24hr clock) specified, on the day
+    given with '-d' or the next time it is that time. It is saved, so it still rings if the bot
+    restarts before then.
 
     Permissions needed: None
 
@@ -165,25 +236,68 @@ async def setalarm(ctx, user_args: List[str]):
     :param user_args: args that the user passed in
     :type: List[Union[int, float, str]]
     """
+    options = {}
+    for flag, name in (('-t', 'time'), ('-d', 'day'), ('-r', 'repeat')):
+        if flag in user_args:
+            index = user_args.index(flag)
+            if index + 1 >= len(user_args):
+                return await extras.command_error(ctx, '505', missing_args=f"the value of {flag}")
+            options[name] = user_args[index + 1]
+            del user_args[index:index + 2]
+
+    if 'time' not in options:
+        return await extras.command_error(ctx, '505', missing_args='-t')
     try:
-        t = user_args.index('-t')
-    except IndexError:
-        await extras.command_error(ctx, '505', missing_args='-t')
-        raise
-
-    try:
-        time = datetime.datetime.strptime(user_args[t + 1], "%H:%M").time()
-    except TypeError:
-        await extras.command_error(ctx, '707', extra="'-t' arg must be in format: HH:MM")
-        raise
-    del user_args[t:t+2]
+        time = datetime.datetime.strptime(options['time'], "%H:%M").time()
+        day = datetime.datetime.strptime(options['day'], "%Y-%m-%d").date() \
+            if 'day' in options else None
+    except ValueError:
+        return await extras.command_error(ctx, '707', extra="'-t' arg must be in format: HH:MM, "
+                                                            "'-d' arg in YYYY-MM-DD")
+    repeat = options.get('repeat')
+    if repeat is not None and repeat.lower() not in REPEATS:
+        return await extras.command_error(ctx, '707', extra="'-r' arg must be daily or weekly")
+
+    when = event_utils.ALARMS.resolve(time, day)
+    if when <= datetime.datetime.now(datetime.timezone.utc):
+        return await extras.command_error(ctx, '707', extra="That time already passed")
 
     message = " ".join(user_args)
+    pings = " ".join(re.findall(r"<@[!&]?\d+>", message))
+    message = re.sub(r"<@[!&]?\d+>", "", message).strip()
+
+    await event_utils.set_alarm(ctx, bot, when, message, pings, repeat and repeat.lower())
 
-    pings = " ".join(re.findall(r"<@.*>", message))
-    message = re.sub(r"<@.*>", message, "")
 
-    bot.loop.create_task(event_utils.alarm(time, message, ctx, pings))
+@command_group.new_command(name="Alarms", description="Lists the alarms in this channel",
+                           syntax="-alarms", max_args=0)
+async def alarms(ctx, user_args: List[str]):
+    """
+    Sends the alarms in the channel, with the numbers to cancel them by
+
+    Permissions needed: None
+
+    :param ctx: context object for the message
+    :type ctx: Object
+    """
+    await event_utils.list_alarms(ctx)
+
+
+@command_group.new_command(name="CancelAlarm",
+                           description="Cancels an alarm, get its number from -alarms",
+                           syntax="-cancelalarm <alarm number>", min_args=1, max_args=1, types=int)
+async def cancelalarm(ctx, user_args: List[int]):
+    """
+    Cancels an alarm in the channel
+
+    Permissions needed: setting the alarm, or being a dev
+
+    :param ctx: context object for the message
+    :type ctx: Object
+    :param user_args: the alarm number
+    :type user_args: List[int]
+    """
+    await event_utils.cancel_alarm(ctx, user_args[0])
 
 
 @command_group.new_command(name="help", description="Help command", syntax="-help <O: command>",
@@ -257,6 +371,7 @@ async def game_presence() -> None:
 
 def run():
     extras.make_cache()
+    math_utils.MATH_POOL.start()
 
     logger = logging.getLogger('discord')
     logger.setLevel(logging.ERROR)
@@ -266,8 +381,14 @@ def run():
 
     bot.loop.create_task(game_presence())
     bot.loop.create_task(server_list())
+    bot.loop.create_task(event_utils.SCHEDULER.run())
     bot.loop.create_task(event_utils.auto_announcements(bot))
+    bot.loop.create_task(event_utils.load_alarms(bot))
+    bot.loop.create_task(event_utils.refresh_calendar(bot))
+    bot.loop.create_task(event_utils.sync_calendars(bot))
     bot.loop.create_task(poll.PollBase.runall(bot))
+    bot.loop.create_task(math_utils.expire_sessions(bot))
+    bot.loop.create_task(math_utils.write_cache(bot))
 
     bot.run(token)
 
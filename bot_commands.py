@@ -1,13 +1,15 @@
-import discord
-
-from math_equ import math_main
-from extras import SYSTEM_CONFIG
+import event_utils
+import math_utils
+from classes.math_pool import WorkerTimeout
+from extras import SYSTEM_CONFIG, command_error
+from math_equ import ComplexityError, split_batch
 import classes.reaction_role_poll as rrp
 
 
 async def channels(ctx, bot):
     """
-    Just for debugging, sends a list of the channel IDs and names stored in channels.txt
+    Just for debugging, sends a list of the channel IDs and names stored in channels.txt, and how
+    the last announcement went
 
     :param ctx: context for message
     :type ctx: Object
@@ -15,8 +17,11 @@ async def channels(ctx, bot):
     :type bot: Object
     """
     if SYSTEM_CONFIG['channels']:
-        await ctx.channel.send(
-            "\n".join([bot.get_channel(c).mention for c in SYSTEM_CONFIG['channels']]))
+        lines = [bot.get_channel(c).mention if bot.get_channel(c) else f"{c} (not found)"
+                 for c in SYSTEM_CONFIG['channels']]
+        if event_utils.ANNOUNCER.last_report is not None:
+            lines.append(f"```{event_utils.ANNOUNCER.last_report}```")
+        await ctx.channel.send("\n".join(lines))
 
     else:
         await ctx.channel.send("No channels are subscribed to announcements")
@@ -48,12 +53,38 @@ async def math(ctx, user_args):
 
     await ctx.channel.trigger_typing()
     try:
-        answers, equ = math_main(user_args)
-        math_embed = discord.Embed(
-            title=f"`{equ}`",
-            color=discord.Color.from_rgb(67, 0, 255),
-            description=f"```\n{''.join(answers)}\n```"
-        )
-        await ctx.channel.send(content=None, embed=math_embed)
+        session = math_utils.SESSIONS.get(ctx.author.id)
+        batch = split_batch(ctx.message.content.split(maxsplit=1)[1])
+        if len(batch) > 1:
+            await ctx.channel.send(content=None,
+                                   embed=await math_utils.solve_batch(batch, session))
+            return
+
+        message = None
+        async for math_embed in math_utils.solve_progressive(user_args, session):
+            if message is None:
+                message = await ctx.channel.send(content=None, embed=math_embed)
+            else:
+                await message.edit(embed=math_embed)
+    except ComplexityError as e:
+        await command_error(ctx, '606', extra=str(e))
+    except WorkerTimeout:
+        await command_error(ctx, '606', extra=f"Gave up after {math_utils.MATH_POOL.timeout} "
+                                              f"seconds")
+    except Exception as e:
+        await ctx.channel.send(f"Well, You did something wrong\n`{e}`")
+
+
+async def table(ctx, user_args):
+
+    await ctx.channel.trigger_typing()
+    try:
+        content, file = await math_utils.table(user_args)
+        await ctx.channel.send(content=content, file=file)
+    except ComplexityError as e:
+        await command_error(ctx, '606', extra=str(e))
+    except WorkerTimeout:
+        await command_error(ctx, '606', extra=f"Gave up after {math_utils.MATH_POOL.timeout} "
+                                              f"seconds")
     except Exception as e:
-        await ctx.channel.send(f"Well, You did something wrong\n`{e}`")
\ No newline at end of file
+        await ctx.channel.send(f"Well, You did something wrong\n`{e}`")
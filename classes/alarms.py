@@ -0,0 +1,212 @@
+import datetime
+import json
+import os
+import os.path
+from typing import Dict, Iterator, List, Union
+
+import pytz
+
+REPEATS = {'daily': 1, 'weekly': 7}  # days between alarms
+
+
+class Alarm:
+    def __init__(self, alarm_id: int, channel_id: int, when: datetime.datetime, message: str,
+                 pings: str, author_id: int, author: str, repeat: Union[str, None] = None):
+        """
+        One alarm, it rings in `channel_id` at `when`
+
+        :param alarm_id: number the alarm is listed and cancelled by
+        :type alarm_id: int
+        :param channel_id: where it rings
+        :type channel_id: int
+        :param when: when it rings next, timezone aware
+        :type when: datetime.datetime
+        :param message: what it says
+        :type message: str
+        :param pings: space separated mentions
+        :type pings: str
+        :param author_id: ID of the user that set it
+        :type author_id: int
+        :param author: name of the user that set it
+        :type author: str
+        :param repeat: None, or a key of `REPEATS`
+        :type repeat: Union[str, None]
+        """
+        self.id = alarm_id
+        self.channel_id = channel_id
+        self.when = when
+        self.message = message
+        self.pings = pings
+        self.author_id = author_id
+        self.author = author
+        self.repeat = repeat
+
+    def to_json(self) -> dict:
+        return {'id': self.id, 'channel': self.channel_id, 'when': self.when.isoformat(),
+                'message': self.message, 'pings': self.pings, 'author id': self.author_id,
+                'author': self.author, 'repeat': self.repeat}
+
+    @classmethod
+    def from_json(cls, data: dict, timezone) -> "Alarm":
+        when = datetime.datetime.fromisoformat(data['when']).astimezone(timezone)
+        return cls(data['id'], data['channel'], when, data['message'], data['pings'],
+                   data['author id'], data['author'], data['repeat'])
+
+
+class AlarmBook:
+    def __init__(self, path: Union[str, None], timezone: str):
+        """
+        Keeps every alarm that hasn't rung yet, and writes each change to a journal file as it
+        happens so no alarms are lost when the bot restarts. The journal is a line of JSON for each
+        change, it is rewritten with just the alarms that are left once it gets too long.
+
+        Nothing here waits for the alarms, `event_utils` puts them in the scheduler.
+
+        :param path: the journal, None to only keep the alarms in memory
+        :type path: Union[str, None]
+        :param timezone: the timezone the times people type are in, e.g. 'America/New_York'
+        :type timezone: str
+        """
+        self.path = path
+        self.timezone = pytz.timezone(timezone)
+        self._alarms: Dict[int, Alarm] = {}
+        self._next_id = 1
+        self._lines = 0  # lines in the journal
+        self.load()
+
+    def load(self) -> None:
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:  # the bot stopped halfway through writing it
+                    continue
+                self._lines += 1
+                if entry['op'] == 'set':
+                    alarm = Alarm.from_json(entry['alarm'], self.timezone)
+                    self._alarms[alarm.id] = alarm
+                    self._next_id = max(self._next_id, alarm.id + 1)
+                elif entry['op'] == 'remove':
+                    self._alarms.pop(entry['id'], None)
+        self.compact()
+
+    def _write(self, entry: dict) -> None:
+        if self.path is None:
+            return
+        with open(self.path, 'a') as file:
+            file.write(json.dumps(entry) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        self._lines += 1
+        if self._lines > 2 * len(self._alarms) + 100:
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Rewrites the journal with only the alarms that are left
+        """
+        if self.path is None or self._lines <= len(self._alarms):
+            return
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as file:
+            for alarm in self._alarms.values():
+                file.write(json.dumps({'op': 'set', 'alarm': alarm.to_json()}) + "\n")
+        os.replace(temp_path, self.path)  # never leaves half of the file behind
+        self._lines = len(self._alarms)
+
+    def resolve(self, time: datetime.time, day: datetime.date = None,
+                now: datetime.datetime = None) -> datetime.datetime:
+        """
+        Turns the time (and day) someone typed into when the alarm rings, without a day it is the
+        next time the clock shows `time`, so today or tomorrow
+
+        :param time: the time in `timezone`
+        :type time: datetime.time
+        :param day: the day in `timezone`
+        :type day: datetime.date
+        :param now: timezone aware, defaults to right now
+        :type now: datetime.datetime
+        :return: when the alarm rings, timezone aware
+        :rtype: datetime.datetime
+        """
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        if day is not None:
+            return self.timezone.localize(datetime.datetime.combine(day, time))
+        day = now.astimezone(self.timezone).date()
+        when = self.timezone.localize(datetime.datetime.combine(day, time))
+        if when <= now:
+            when = self.timezone.localize(
+                datetime.datetime.combine(day + datetime.timedelta(days=1), time))
+        return when
+
+    def add(self, channel_id: int, when: datetime.datetime, message: str, pings: str,
+            author_id: int, author: str, repeat: str = None) -> Alarm:
+        """
+        Saves a new alarm
+
+        :return: the alarm
+        :rtype: Alarm
+        """
+        alarm = Alarm(self._next_id, channel_id, when.astimezone(self.timezone), message, pings,
+                      author_id, author, repeat)
+        self._next_id += 1
+        self._alarms[alarm.id] = alarm
+        self._write({'op': 'set', 'alarm': alarm.to_json()})
+        return alarm
+
+    def remove(self, alarm_id: int) -> Union[Alarm, None]:
+        """
+        :return: the alarm that was removed, None if there wasn't one
+        :rtype: Union[Alarm, None]
+        """
+        alarm = self._alarms.pop(alarm_id, None)
+        if alarm is not None:
+            self._write({'op': 'remove', 'id': alarm_id})
+        return alarm
+
+    def rang(self, alarm_id: int, now: datetime.datetime = None) -> Union[Alarm, None]:
+        """
+        Call when an alarm rings. One that repeats is moved to the next time it rings after `now`,
+        on the same time of the day even when daylight saving time starts or ends, the rest are
+        removed.
+
+        :param alarm_id: the alarm
+        :type alarm_id: int
+        :param now: timezone aware, defaults to right now
+        :type now: datetime.datetime
+        :return: the alarm if it rings again, otherwise None
+        :rtype: Union[Alarm, None]
+        """
+        alarm = self._alarms.get(alarm_id)
+        if alarm is None or alarm.repeat is None:
+            self.remove(alarm_id)
+            return None
+
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        local = alarm.when.astimezone(self.timezone).replace(tzinfo=None)
+        while True:
+            local += datetime.timedelta(days=REPEATS[alarm.repeat])
+            alarm.when = self.timezone.localize(local)
+            if alarm.when > now:  # skips the ones missed while the bot was off
+                break
+        self._write({'op': 'set', 'alarm': alarm.to_json()})
+        return alarm
+
+    def get(self, alarm_id: int) -> Union[Alarm, None]:
+        return self._alarms.get(alarm_id)
+
+    def in_channel(self, channel_id: int) -> List[Alarm]:
+        """
+        :return: the channel's alarms, the next one to ring first
+        :rtype: List[Alarm]
+        """
+        return sorted((alarm for alarm in self._alarms.values() if alarm.channel_id == channel_id),
+                      key=lambda alarm: alarm.when)
+
+    def __iter__(self) -> Iterator[Alarm]:
+        return iter(list(self._alarms.values()))
+
+    def __len__(self) -> int:
+        return len(self._alarms)
@@ -0,0 +1,108 @@
+import datetime
+import json
+import os
+import os.path
+from typing import Dict, Iterable, List, Union
+
+import pytz
+
+
+def parse_time(text: str) -> datetime.time:
+    return datetime.datetime.strptime(text, '%H:%M').time()
+
+
+class AnnouncementSchedule:
+    def __init__(self, path: Union[str, None], timezone: str, default_time: str,
+                 channel_times: Dict[str, str] = None, grace: float = 3600):
+        """
+        Works out when each channel gets its next auto-announcement, and remembers which day each
+        channel last got one, so restarting the bot never sends a day's announcement twice.
+
+        If the bot was off when an announcement was due, it is still sent when the bot starts as
+        long as that is less than `grace` seconds late, otherwise that day is skipped.
+
+        :param path: where the days that were announced are saved, None to only keep them in memory
+        :type path: Union[str, None]
+        :param timezone: the timezone the times are in, e.g. 'America/New_York'
+        :type timezone: str
+        :param default_time: when channels get the announcement, e.g. '09:30'
+        :type default_time: str
+        :param channel_times: channel id -> time, for channels that want it at a different time
+        :type channel_times: Dict[str, str]
+        :param grace: seconds late an announcement can be and still be sent
+        :type grace: float
+        """
+        self.path = path
+        self.timezone = pytz.timezone(timezone)
+        self.default_time = parse_time(default_time)
+        self.channel_times = {int(channel_id): parse_time(time)
+                              for channel_id, time in (channel_times or {}).items()}
+        self.grace = datetime.timedelta(seconds=grace)
+        self._announced: Dict[int, datetime.date] = {}  # channel id -> last day announced
+        self.load()
+
+    def load(self) -> None:
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path) as file:
+            self._announced = {int(channel_id): datetime.date.fromisoformat(day)
+                               for channel_id, day in json.load(file).items()}
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({str(channel_id): day.isoformat()
+                       for channel_id, day in self._announced.items()}, file)
+        os.replace(temp_path, self.path)  # never leaves half of the file behind
+
+    def time_for(self, channel_id: int) -> datetime.time:
+        return self.channel_times.get(channel_id, self.default_time)
+
+    def local_day(self, moment: datetime.datetime) -> datetime.date:
+        return moment.astimezone(self.timezone).date()
+
+    def next_deadline(self, channel_id: int, now: datetime.datetime) -> datetime.datetime:
+        """
+        :param channel_id: the channel
+        :type channel_id: int
+        :param now: timezone aware
+        :type now: datetime.datetime
+        :return: when the channel's next announcement is due, it can be a little in the past if
+        one was missed less than `grace` ago
+        :rtype: datetime.datetime
+        """
+        day = self.local_day(now)
+        announced = self._announced.get(channel_id)
+        if announced is not None and announced >= day:
+            day = announced + datetime.timedelta(days=1)
+        while True:
+            # pytz picks the right UTC offset for the day, daylight saving time included
+            deadline = self.timezone.localize(datetime.datetime.combine(day,
+                                                                        self.time_for(channel_id)))
+            if deadline + self.grace >= now:
+                return deadline
+            day += datetime.timedelta(days=1)
+
+    def deadlines(self, channel_ids: Iterable[int],
+                  now: datetime.datetime) -> Dict[datetime.datetime, List[int]]:
+        """
+        The next deadline of every channel, channels that are due at the same time are together so
+        they can be sent at once
+
+        :return: deadline -> channel ids
+        :rtype: Dict[datetime.datetime, List[int]]
+        """
+        deadlines = {}
+        for channel_id in channel_ids:
+            deadlines.setdefault(self.next_deadline(channel_id, now), []).append(channel_id)
+        return deadlines
+
+    def announced(self, channel_ids: Iterable[int], day: datetime.date) -> None:
+        """
+        Remembers that the channels got the announcement for `day`, and saves it
+        """
+        for channel_id in channel_ids:
+            self._announced[channel_id] = day
+        self.save()
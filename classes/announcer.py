@@ -0,0 +1,144 @@
+import asyncio
+import random
+import time
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+import aiohttp
+import discord
+
+RETRY_STATUSES = {500, 502, 503, 504}  # discord.py waits out 429s by itself
+GLOBAL_RATE = (45, 1)  # Discord allows a bot 50 requests a second, this leaves some for commands
+CHANNEL_RATE = (5, 5)  # and 5 messages every 5 seconds in each channel
+
+
+class RateLimiter:
+    def __init__(self, rate: int, per: float):
+        """
+        A token bucket for each route, each one lets `rate` requests through every `per` seconds
+        and makes the rest wait until they can go
+
+        :param rate: requests allowed at once
+        :type rate: int
+        :param per: seconds it takes to get all of them back
+        :type per: float
+        """
+        self.rate = rate
+        self.per = per
+        self._buckets: Dict[Hashable, Tuple[float, float]] = {}  # route -> (tokens, last refill)
+
+    async def acquire(self, route: Hashable = None) -> None:
+        while True:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(route, (self.rate, now))
+            tokens = min(self.rate, tokens + (now - last) * self.rate / self.per)
+            if tokens >= 1:
+                self._buckets[route] = tokens - 1, now
+                return
+            self._buckets[route] = tokens, now
+            await asyncio.sleep((1 - tokens) * self.per / self.rate)
+
+
+class DeliveryReport:
+    def __init__(self, channels: int):
+        """
+        How sending one announcement went
+
+        :param channels: number of channels it was sent to
+        :type channels: int
+        """
+        self.channels = channels
+        self.delivered: Dict[int, float] = {}  # channel id -> seconds from the start until it sent
+        self.failed: Dict[int, str] = {}  # channel id -> why
+        self.retries = 0
+        self.elapsed = 0.0
+
+    def latency(self, percent: float) -> float:
+        times = sorted(self.delivered.values())
+        if not times:
+            return 0.0
+        return times[min(len(times) - 1, int(round(percent / 100 * (len(times) - 1))))]
+
+    def __str__(self) -> str:
+        lines = [f"Announced to {len(self.delivered)}/{self.channels} channels in "
+                 f"{self.elapsed:.2f}s (p50 {self.latency(50):.2f}s, p95 {self.latency(95):.2f}s), "
+                 f"{self.retries} retries"]
+        lines += [f"  {channel_id}: {error}" for channel_id, error in self.failed.items()]
+        return "\n".join(lines)
+
+
+class Announcer:
+    def __init__(self, concurrency: int = 10, retries: int = 3, backoff: float = 1):
+        """
+        Sends a message to a lot of channels at once. At most `concurrency` sends are out at once,
+        and they are held back to stay under Discord's rate limits (`GLOBAL_RATE` for the whole bot
+        and `CHANNEL_RATE` for each channel). A channel that fails doesn't stop the rest, sends that
+        fail with a server error or a dropped connection are tried again after a random wait that
+        doubles each time, anything else (e.g. the channel was deleted, or the bot isn't allowed to
+        talk in it) fails right away.
+
+        :param concurrency: most messages being sent at once
+        :type concurrency: int
+        :param retries: times a message is tried again before giving up
+        :type retries: int
+        :param backoff: seconds of the longest wait before the first retry
+        :type backoff: float
+        """
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.global_limit = RateLimiter(*GLOBAL_RATE)
+        self.channel_limit = RateLimiter(*CHANNEL_RATE)
+        self.last_report = None
+
+    async def announce(self, bot, channel_ids: Iterable[int], **message) -> DeliveryReport:
+        """
+        Sends the message to every channel
+
+        :param bot: client connection to discord
+        :type bot: Object
+        :param channel_ids: IDs of the channels
+        :type channel_ids: Iterable[int]
+        :param message: what is sent, the same as `channel.send()` takes
+        :return: what got delivered, how long it took, and what failed
+        :rtype: DeliveryReport
+        """
+        channel_ids: List[int] = list(dict.fromkeys(channel_ids))  # no one gets it twice
+        report = DeliveryReport(len(channel_ids))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = time.monotonic()
+        await asyncio.gather(*[self._deliver(bot, channel_id, message, semaphore, report, start)
+                               for channel_id in channel_ids])
+        report.elapsed = time.monotonic() - start
+        self.last_report = report
+        print(report)
+        return report
+
+    async def _deliver(self, bot, channel_id: int, message: dict, semaphore: asyncio.Semaphore,
+                       report: DeliveryReport, start: float) -> None:
+        channel = bot.get_channel(channel_id)
+        if channel is None:
+            report.failed[channel_id] = "channel not found"
+            return
+
+        attempt = 0
+        async with semaphore:
+            while True:
+                await self.global_limit.acquire()
+                await self.channel_limit.acquire(channel_id)
+                try:
+                    await channel.send(**message)
+                    report.delivered[channel_id] = time.monotonic() - start
+                    return
+                except discord.HTTPException as e:
+                    error, retry = f"{e.status} {e.text}", e.status in RETRY_STATUSES
+                except (aiohttp.ClientConnectionError, OSError) as e:
+                    error, retry = f"{type(e).__name__}: {e}", True
+                except Exception as e:  # the other channels still get it
+                    error, retry = f"{type(e).__name__}: {e}", False
+
+                if not retry or attempt >= self.retries:
+                    report.failed[channel_id] = error
+                    return
+                await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+                attempt += 1
+                report.retries += 1
@@ -0,0 +1,123 @@
+import datetime
+from typing import Dict, Iterable, List
+
+import numpy
+
+from classes.gcal_event import Event
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def _utc_seconds(moment: datetime.datetime) -> float:
+    """
+    Seconds from the epoch to `moment`, naive times are UTC (like `event_store._ends_after()`)
+    """
+    if moment.tzinfo is not None:
+        return moment.timestamp()
+    return (moment - EPOCH).total_seconds()
+
+
+class EventBatch:
+    def __init__(self, events: Iterable[Event] = ()):
+        """
+        A lot of events, with everything that filtering and sorting them needs copied into numpy
+        arrays (one per column), so that is done for all of them at once instead of one event at a
+        time. Days are date ordinals, times of day are seconds on the event's own clock (the same
+        way `Event.start_date` and `Event.start_time` see them), and ends are UTC timestamps.
+        Calendar names are kept once each and referred to by number.
+
+        A batch can't be changed once it is made, `EventIndex` is for events that change.
+
+        :param events: the events, ties when sorting keep this order
+        :type events: Iterable[Event]
+        """
+        self.events = list(events)
+        calendars: Dict[str, int] = {}
+        columns = [[] for _ in range(6)]
+        for event in self.events:
+            start = event.start
+            for column, value in zip(columns, (
+                    event.start_date.toordinal(), event.last_date.toordinal(), event.has_time,
+                    (start.hour * 60 + start.minute) * 60 + start.second + start.microsecond / 1e6,
+                    _utc_seconds(event.end),
+                    calendars.setdefault(event.calendar_name, len(calendars)))):
+                column.append(value)
+
+        self.calendar_names = list(calendars)
+        self.first_day = numpy.array(columns[0], dtype=numpy.int32)
+        self.last_day = numpy.array(columns[1], dtype=numpy.int32)
+        self.has_time = numpy.array(columns[2], dtype=bool)
+        self.start_time = numpy.array(columns[3], dtype=numpy.float64)
+        self.end = numpy.array(columns[4], dtype=numpy.float64)
+        self.calendar = numpy.array(columns[5], dtype=numpy.int32)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes used by the columns, not counting the events
+        """
+        columns = (self.first_day, self.last_day, self.has_time, self.start_time, self.end,
+                   self.calendar)
+        return sum(column.nbytes for column in columns)
+
+    def overlapping(self, start: datetime.date, end: datetime.date,
+                    after: datetime.datetime = None, calendars: Iterable[str] = None
+                    ) -> numpy.ndarray:
+        """
+        Finds every event that is on any day from `start` through `end` (see
+        `EventIndex.overlapping()`)
+
+        :param start: the first day
+        :type start: datetime.date
+        :param end: the last day
+        :type end: datetime.date
+        :param after: naive UTC time, events that ended before this are left out, None to keep them
+        :type after: datetime.datetime
+        :param calendars: only events from these calendars are found, None for every calendar
+        :type calendars: Iterable[str]
+        :return: positions of the events in `events`, in order
+        :rtype: numpy.ndarray
+        """
+        mask = (self.first_day <= end.toordinal()) & (self.last_day >= start.toordinal())
+        if after is not None:
+            mask &= self.end > _utc_seconds(after)
+        if calendars is not None:
+            calendars = set(calendars)
+            codes = [code for code, name in enumerate(self.calendar_names) if name in calendars]
+            mask &= numpy.isin(self.calendar, codes)
+        return numpy.flatnonzero(mask)
+
+    def days(self, start: datetime.date, end: datetime.date, after: datetime.datetime = None,
+             calendars: Iterable[str] = None) -> List[List[Event]]:
+        """
+        Groups the events from `start` through `end` by day, the same way as `EventIndex.days()`
+
+        :param start: the first day
+        :type start: datetime.date
+        :param end: the last day
+        :type end: datetime.date
+        :param after: naive UTC time, events that ended before this are left out, None to keep them
+        :type after: datetime.datetime
+        :param calendars: only events from these calendars are kept, None for every calendar
+        :type calendars: Iterable[str]
+        :return: a list of events for each day, all day events come first and then by start time
+        :rtype: List[List[Event]]
+        """
+        found = self.overlapping(start, end, after, calendars)
+        first_day = self.first_day[found]
+        bucket = numpy.maximum(first_day, start.toordinal()) - start.toordinal()
+        # by bucket and then by `Event.sort_key`, lexsort sorts by the last key first
+        order = numpy.lexsort((self.start_time[found], self.has_time[found], first_day, bucket))
+
+        buckets = [[] for _ in range((end - start).days + 1)]
+        bucket, found = bucket.tolist(), found.tolist()
+        for i in order.tolist():
+            buckets[bucket[i]].append(self.events[found[i]])
+        for i, events in enumerate(buckets):
+            if not events:
+                day = datetime.datetime.combine(start + datetime.timedelta(days=i), datetime.time())
+                events.append(Event.make_empty(day))
+        return buckets
@@ -0,0 +1,106 @@
+import datetime
+import itertools
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Set, Tuple
+
+from classes.gcal_event import Event
+
+
+def first_day(event: Event) -> datetime.date:
+    return event.start_date
+
+
+def last_day(event: Event) -> datetime.date:
+    return event.last_date
+
+
+class EventIndex:
+    def __init__(self, events: Iterable[Tuple[Hashable, Event]] = ()):
+        """
+        An index of events by the days they are on. Each event is put under every day it covers,
+        so finding the events on a range of days only looks at those days, no matter how long the
+        longest event is or how many events there are.
+
+        Events are added and removed by key (e.g. their Google event ID), adding an event with a key
+        that is already there replaces it.
+
+        :param events: (key, event) for each event to start with
+        :type events: Iterable[Tuple[Hashable, Event]]
+        """
+        self._days: Dict[datetime.date, Set[Hashable]] = {}  # day -> keys of the events on it
+        self._events: Dict[Hashable, Tuple[tuple, Event]] = {}  # key -> ((first day, order), event)
+        self._order = itertools.count()  # breaks ties between events on the same day
+        for key, event in events:
+            self.add(key, event)
+
+    @staticmethod
+    def _covers(event: Event) -> Iterator[datetime.date]:
+        day = first_day(event)
+        while day <= last_day(event):
+            yield day
+            day += datetime.timedelta(days=1)
+
+    def add(self, key: Hashable, event: Event) -> None:
+        if key in self._events:
+            self.remove(key)
+        self._events[key] = (first_day(event), next(self._order)), event
+        for day in self._covers(event):
+            self._days.setdefault(day, set()).add(key)
+
+    def remove(self, key: Hashable) -> None:
+        _, event = self._events.pop(key)
+        for day in self._covers(event):
+            keys = self._days[day]
+            keys.discard(key)
+            if not keys:
+                del self._days[day]
+
+    def overlapping(self, start: datetime.date, end: datetime.date) -> List[Event]:
+        """
+        Finds every event that is on any day from `start` through `end`, including ones that
+        started before `start` and are still going
+
+        :param start: the first day
+        :type start: datetime.date
+        :param end: the last day
+        :type end: datetime.date
+        :return: the events, sorted by the day they start on
+        :rtype: List[Event]
+        """
+        keys = set()
+        for offset in range((end - start).days + 1):
+            keys.update(self._days.get(start + datetime.timedelta(days=offset), ()))
+        return [self._events[key][1] for key in sorted(keys, key=lambda key: self._events[key][0])]
+
+    def days(self, start: datetime.date, end: datetime.date,
+             keep: Callable[[Event], bool] = None) -> List[List[Event]]:
+        """
+        Groups the events from `start` through `end` by day, events that started before `start` go
+        on the first day, and days without any events get an empty event
+
+        :param start: the first day
+        :type start: datetime.date
+        :param end: the last day
+        :type end: datetime.date
+        :param keep: only events this returns True for are kept, None to keep all of them
+        :type keep: Callable[[Event], bool]
+        :return: a list of events for each day, all day events come first and then by start time
+        :rtype: List[List[Event]]
+        """
+        buckets = [[] for _ in range((end - start).days + 1)]
+        for event in self.overlapping(start, end):
+            if keep is None or keep(event):
+                buckets[(max(first_day(event), start) - start).days].append(event)
+
+        for i, bucket in enumerate(buckets):
+            if bucket:
+                bucket.sort(key=lambda event: event.sort_key)
+            else:
+                day = datetime.datetime.combine(start + datetime.timedelta(days=i), datetime.time())
+                bucket.append(Event.make_empty(day))
+        return buckets
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._events
@@ -0,0 +1,208 @@
+import asyncio
+import datetime
+from typing import Awaitable, Callable, Hashable, List, Tuple, Union
+
+import discord
+
+from classes.gcal_event import Event
+from classes.reaction_router import ROUTER
+
+MAX_FIELDS = 25  # Discord's limits for one embed
+MAX_CHARACTERS = 6000
+MAX_FIELD_VALUE = 1024
+FOOTER_ROOM = 64  # saved for the footer, which is written after the fields
+
+
+def day_field(day: datetime.date, events: List[Event], today: datetime.date) -> Tuple[str, str]:
+    """
+    The name and value of the embed field for one day, a value that is longer than Discord allows is
+    cut short
+
+    :param day: the day
+    :type day: datetime.date
+    :param events: the events on the day
+    :type events: List[Event]
+    :param today: the day that is called "Today"
+    :type today: datetime.date
+    :return: the name and the value
+    :rtype: Tuple[str, str]
+    """
+    name = "**Today**" if day == today else f"**{day.strftime('%A')} ({day.strftime('%m/%d')})**"
+    value = "\n".join([event.str() for event in events])
+    if len(value) > MAX_FIELD_VALUE:
+        value = value[:MAX_FIELD_VALUE - 1] + "…"
+    return name, value
+
+
+def add_days(embed: discord.Embed, days: List[List[Event]], first_day: datetime.date,
+             today: datetime.date) -> int:
+    """
+    Adds a field for each day to the embed, until it has as many fields or characters as Discord
+    allows in one embed (leaving `FOOTER_ROOM` for the footer). There is always at least one day.
+
+    :param embed: the embed, it gets changed
+    :type embed: discord.Embed
+    :param days: the events on each day
+    :type days: List[List[Event]]
+    :param first_day: the day of `days[0]`
+    :type first_day: datetime.date
+    :param today: the day that is called "Today"
+    :type today: datetime.date
+    :return: the number of days that fit
+    :rtype: int
+    """
+    characters = len(embed.title or "") + len(embed.description or "") + FOOTER_ROOM
+    added = 0
+    for i, events in enumerate(days[:MAX_FIELDS - len(embed.fields)]):
+        name, value = day_field(first_day + datetime.timedelta(days=i), events, today)
+        if added and characters + len(name) + len(value) > MAX_CHARACTERS:
+            break
+        embed.add_field(name=name, value=value, inline=False)
+        characters += len(name) + len(value)
+        added += 1
+    return added
+
+
+class EventPages:
+    PREVIOUS = "⬅️"
+    NEXT = "➡️"
+
+    def __init__(self, bot, embed: discord.Embed,
+                 get_days: Callable[[int, int], Awaitable[List[List[Event]]]], days: int,
+                 today: datetime.date, timeout: float = 300, cache=None, key: Hashable = (),
+                 version: Callable[[], Hashable] = lambda: None):
+        """
+        `-events` split into pages that are turned with reactions. A page has as many days as fit
+        in one embed, and only the page someone is looking at is made, from `get_days`. The pages
+        don't keep any events or embeds, just the day each page that was looked at starts on, so a
+        year of events costs the same to show as a week.
+
+        :param bot: client connection to discord
+        :type bot: Object
+        :param embed: the title and color of every page, it isn't changed
+        :type embed: discord.Embed
+        :param get_days: get_days(first, count) gets `count` days of events, starting `first` days
+        after today
+        :type get_days: Callable[[int, int], Awaitable[List[List[Event]]]]
+        :param days: number of days after today that are shown
+        :type days: int
+        :param today: the first day
+        :type today: datetime.date
+        :param timeout: seconds without anyone turning the page before the reactions are removed
+        :type timeout: float
+        :param cache: where the pages are kept so they don't have to be made again, None to always
+        make them
+        :type cache: classes.swr_cache.SWRCache
+        :param key: what the pages are for, each page is cached under `key + (start,)`
+        :type key: Hashable
+        :param version: gets the version of the events the pages are made from
+        :type version: Callable[[], Hashable]
+        """
+        self.bot = bot
+        self.embed = embed
+        self.get_days = get_days
+        self.days = days
+        self.today = today
+        self.timeout = timeout
+        self.cache = cache
+        self.key = key
+        self.version = version
+        self.starts = [0]  # the day each page that has been made starts on
+        self.page = 0
+        self.next_start = None  # the day the next page starts on, None on the last page
+        self.message = None
+        self._clicks = asyncio.Queue()
+        self._remove_clicks = True  # False if the bot isn't allowed to remove reactions
+
+    async def render(self, start: int) -> Tuple[discord.Embed, Union[int, None]]:
+        """
+        Makes the page that starts `start` days after today
+
+        :param start: the first day of the page
+        :type start: int
+        :return: the page, and the day the next page starts on (None if this is the last page)
+        :rtype: Tuple[discord.Embed, Union[int, None]]
+        """
+        embed = self.embed.copy()
+        days = await self.get_days(start, min(MAX_FIELDS, self.days + 1 - start))
+        add_days(embed, days, self.today + datetime.timedelta(days=start), self.today)
+
+        end = start + len(embed.fields)  # the day after the last one on this page
+        next_start = end if end <= self.days else None
+        if start > 0 or next_start is not None:
+            embed.set_footer(text=f"Days {start + 1}-{end} of {self.days + 1}, "
+                                  f"react with {self.PREVIOUS} or {self.NEXT} to turn the page")
+        return embed, next_start
+
+    async def get_page(self, start: int) -> Tuple[discord.Embed, Union[int, None]]:
+        """
+        `render()` through the cache, if there is one. The embed can be shared, so it must not be
+        changed.
+        """
+        if self.cache is None:
+            return await self.render(start)
+        return await self.cache.get(self.key + (start,), self.version(),
+                                    lambda: self.render(start))
+
+    async def start(self, channel) -> discord.Message:
+        """
+        Sends the first page, and if there is more than one page adds the reactions that turn them
+        and starts listening for them (see `loop()`)
+        """
+        embed, self.next_start = await self.get_page(0)
+        self.message = await channel.send(embed=embed)
+        if self.next_start is not None:
+            for emoji in (self.PREVIOUS, self.NEXT):
+                await self.message.add_reaction(emoji)
+            ROUTER.register(self.bot, self.message.id, self.reaction_add_listener,
+                            self.reaction_remove_listener)
+        return self.message
+
+    async def loop(self) -> None:
+        """
+        Turns the page every time someone clicks a reaction, until nobody has for `timeout`
+        seconds, then the reactions are taken off
+        """
+        if self.next_start is None:
+            return
+        try:
+            while True:
+                try:
+                    emoji = await asyncio.wait_for(self._clicks.get(), self.timeout)
+                except asyncio.TimeoutError:
+                    break
+                await self.turn(emoji)
+        finally:
+            ROUTER.unregister(self.message.id)
+            try:
+                await self.message.clear_reactions()
+            except discord.HTTPException:  # not allowed to, so at least take the bot's off
+                for emoji in (self.PREVIOUS, self.NEXT):
+                    await self.message.remove_reaction(emoji, self.bot.user)
+
+    async def turn(self, emoji: str) -> None:
+        if emoji == self.NEXT and self.next_start is not None:
+            self.page += 1
+            if self.page == len(self.starts):
+                self.starts.append(self.next_start)
+        elif emoji == self.PREVIOUS and self.page > 0:
+            self.page -= 1
+        else:
+            return
+        embed, self.next_start = await self.get_page(self.starts[self.page])
+        await self.message.edit(embed=embed)
+
+    async def reaction_add_listener(self, payload: discord.RawReactionActionEvent):  # listener
+        if payload.user_id == self.bot.user.id:  # only this message gets routed here
+            return
+        if self._remove_clicks:  # so the same reaction can be clicked again
+            try:
+                await self.message.remove_reaction(payload.emoji, discord.Object(payload.user_id))
+            except discord.Forbidden:
+                self._remove_clicks = False
+        self._clicks.put_nowait(str(payload.emoji))
+
+    async def reaction_remove_listener(self, payload: discord.RawReactionActionEvent):  # listener
+        # without permission to remove reactions, taking one off is a click too
+        if payload.user_id != self.bot.user.id and not self._remove_clicks:
+            self._clicks.put_nowait(str(payload.emoji))
@@ -0,0 +1,249 @@
+import datetime
+import json
+import os
+import os.path
+import threading
+from typing import Dict, List, Tuple, Union
+
+from googleapiclient.errors import HttpError
+
+from classes.event_index import EventIndex
+from classes.gcal_api import SYNC_FIELDS, execute_batch, list_calendars, make_event
+from classes.gcal_event import Event
+
+KEEP_PAST = datetime.timedelta(days=1)  # events that ended longer ago than this are dropped
+
+
+def _ends_after(event: Event, moment: datetime.datetime) -> bool:
+    """
+    Whether the event ends after `moment` (naive UTC), the same way that Google's `timeMin` works
+    """
+    end = event.end
+    if end.tzinfo is not None:
+        end = end.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return end > moment
+
+
+class EventStore:
+    def __init__(self, path: Union[str, None] = None, max_age: Union[float, None] = None):
+        """
+        A local copy of every calendar's events, kept up to date with Google's sync tokens. The
+        first sync of a calendar downloads all of it from a day ago onwards, every sync after that
+        only gets the events that were made, changed or deleted since the last one. If Google throws
+        a sync token away (410 Gone) that calendar is downloaded from scratch again.
+
+        Everything is saved to `path` as JSON after every sync, so a restart doesn't need a full
+        sync. The events are also kept in an `EventIndex`, which is only changed where the sync
+        changed something. Syncing happens on a background thread and reading happens on the event
+        loop, so they share a lock.
+
+        What was saved isn't trusted on its own, the store is only `ready` once a sync worked since
+        it was made, and stops being ready if syncing keeps failing for longer than `max_age`.
+
+        :param path: where the store is saved, None to only keep it in memory
+        :type path: Union[str, None]
+        :param max_age: seconds since the last sync that worked before the events are too old to
+        use, None to use them no matter how old they are
+        :type max_age: Union[float, None]
+        """
+        self.path = path
+        self.max_age = None if max_age is None else datetime.timedelta(seconds=max_age)
+        self._calendars: Dict[str, dict] = {}  # id -> {summary, sync token, events: {id: event}}
+        self.index = EventIndex()  # keyed by (calendar id, event id)
+        self.version = 0  # goes up every time a sync changes something
+        self._lock = threading.Lock()
+        self.last_sync = None
+        self.synced = False  # whether a sync has worked since the store was made
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.resyncs = 0
+        self.load()
+
+    @property
+    def ready(self) -> bool:
+        if not self.synced:
+            return False
+        return self.max_age is None or datetime.datetime.utcnow() - self.last_sync <= self.max_age
+
+    def load(self) -> None:
+        if self.path is None or not os.path.exists(self.path):
+            return
+        with open(self.path) as file:
+            data = json.load(file)
+        self._calendars = data['calendars']
+        self.last_sync = datetime.datetime.fromisoformat(data['last sync'])
+        for calendar_id, calendar in self._calendars.items():
+            for event_id, event in calendar['events'].items():
+                self.index.add((calendar_id, event_id), make_event(calendar['summary'], event))
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        with self._lock:
+            data = json.dumps({'last sync': self.last_sync.isoformat(),
+                               'calendars': self._calendars})
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as file:
+            file.write(data)
+        os.replace(temp_path, self.path)  # never leaves half of a store behind
+
+    def sync(self, service) -> None:
+        """
+        Brings every calendar up to date, all of the calendars are synced in one batch request per
+        page. Calendars the bot is no longer subscribed to are dropped.
+
+        :param service: the Google Calendar service
+        :type service: googleapiclient.discovery.Resource
+        :raises googleapiclient.errors.HttpError: if a calendar couldn't be synced
+        """
+        working = self._working_copy(list_calendars(service))
+        time_min = (datetime.datetime.utcnow() - KEEP_PAST).isoformat() + 'Z'
+
+        page_tokens = {calendar_id: None for calendar_id in working}
+        while page_tokens:
+            calendar_ids = list(page_tokens)
+            responses = execute_batch(service, [
+                self._list_request(service, calendar_id, working[calendar_id],
+                                   page_tokens[calendar_id], time_min)
+                for calendar_id in calendar_ids], return_exceptions=True)
+            page_tokens = {}
+            for calendar_id, response in zip(calendar_ids, responses):
+                more, page_token = self._apply(working[calendar_id], response)
+                if more:
+                    page_tokens[calendar_id] = page_token
+
+        cutoff = datetime.datetime.utcnow() - KEEP_PAST
+        for state in working.values():
+            state['sync token'] = state.pop('next sync token', None)
+            state['events'] = {event_id: event for event_id, event in state['events'].items()
+                               if _ends_after(make_event(state['summary'], event), cutoff)}
+
+        with self._lock:
+            self._update_index(working)
+            self._calendars = working
+            self.last_sync = datetime.datetime.utcnow()
+            self.synced = True
+        self.save()
+
+    def _working_copy(self, calendar_ids: List[str]) -> Dict[str, dict]:
+        """
+        Copies the calendars that are going to be synced, so reading can carry on from the old ones
+        until the sync is done
+        """
+        with self._lock:
+            working = {}
+            for calendar_id in calendar_ids:
+                old = self._calendars.get(calendar_id)
+                working[calendar_id] = {
+                    'summary': old['summary'] if old else "",
+                    'sync token': old['sync token'] if old else None,
+                    'events': dict(old['events']) if old else {}
+                }
+
+        for state in working.values():
+            if state['sync token'] is None:
+                self.full_syncs += 1
+            else:
+                self.incremental_syncs += 1
+        return working
+
+    @staticmethod
+    def _list_request(service, calendar_id: str, state: dict, page_token: Union[str, None],
+                      time_min: str):
+        """
+        A full sync only gets events that end after `time_min`, Google doesn't allow `timeMin`
+        with a sync token, the sync token already remembers it
+        """
+        full = state['sync token'] is None
+        return service.events().list(calendarId=calendar_id, singleEvents=True, fields=SYNC_FIELDS,
+                                     syncToken=state['sync token'], pageToken=page_token,
+                                     timeMin=time_min if full else None)
+
+    def _apply(self, state: dict,
+               response: Union[dict, Exception]) -> Tuple[bool, Union[str, None]]:
+        """
+        Applies one page of a calendar's changes to its working copy
+
+        :param state: the calendar's working copy
+        :type state: dict
+        :param response: the page, or the error Google sent back for it
+        :type response: Union[dict, Exception]
+        :raises googleapiclient.errors.HttpError: if the calendar couldn't be synced
+        :return: whether there is another page to get, and its page token (None to start the
+        calendar over from the first page)
+        :rtype: Tuple[bool, Union[str, None]]
+        """
+        if isinstance(response, HttpError) and response.resp.status == 410:
+            # the sync token expired, start this calendar over from scratch
+            state['sync token'], state['events'] = None, {}
+            self.resyncs += 1
+            return True, None
+        if isinstance(response, Exception):
+            raise response
+
+        state['summary'] = response.get('summary', state['summary'])
+        for event in response.get('items', []):
+            if event.get('status') == 'cancelled':
+                state['events'].pop(event['id'], None)
+            else:
+                state['events'][event['id']] = event
+        if response.get('nextPageToken'):
+            return True, response['nextPageToken']
+        state['next sync token'] = response.get('nextSyncToken')
+        return False, None
+
+    def _update_index(self, calendars: Dict[str, dict]) -> None:
+        changes = 0
+        for calendar_id, calendar in self._calendars.items():
+            for event_id in calendar['events']:
+                if event_id not in calendars.get(calendar_id, {'events': {}})['events']:
+                    self.index.remove((calendar_id, event_id))
+                    changes += 1
+
+        for calendar_id, calendar in calendars.items():
+            old = self._calendars.get(calendar_id, {'summary': None, 'events': {}})
+            renamed = old['summary'] != calendar['summary']
+            for event_id, event in calendar['events'].items():
+                if renamed or old['events'].get(event_id) != event:  # only changes are indexed
+                    self.index.add((calendar_id, event_id), make_event(calendar['summary'], event))
+                    changes += 1
+        if changes:
+            self.version += 1
+
+    def events_until(self, start: datetime.datetime, end: datetime.date) -> List[Event]:
+        """
+        Gets the events that end after `start` and are on any day through `end`, this never touches
+        the network
+
+        :param start: naive UTC time, events that ended before this are left out
+        :type start: datetime.datetime
+        :param end: the last day
+        :type end: datetime.date
+        :return: the events, sorted by the day they start on
+        :rtype: List[Event]
+        """
+        with self._lock:
+            events = self.index.overlapping(start.date(), end)
+        return [event for event in events if _ends_after(event, start)]
+
+    def days(self, start: datetime.datetime, days: int, first: int = 0) -> List[List[Event]]:
+        """
+        `events_until()` grouped by day, with an empty event on days without any events
+
+        :param start: naive UTC time, events that ended before this are left out
+        :type start: datetime.datetime
+        :param days: number of days after `start`
+        :type days: int
+        :param first: number of days after `start` to start at, events that started earlier and
+        are still going go on this day
+        :type first: int
+        :return: the events on each day
+        :rtype: List[List[Event]]
+        """
+        first_day = start.date() + datetime.timedelta(days=first)
+        end = (start + datetime.timedelta(days=days)).date()
+        with self._lock:
+            return self.index.days(first_day, end, keep=lambda event: _ends_after(event, start))
+
+    def __len__(self) -> int:
+        return len(self.index)
@@ -1,77 +1,305 @@
+import asyncio
 import datetime
+import os.path
 import pickle
-from typing import List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterator, List, Tuple
 
-from googleapiclient.discovery import build
+import google_auth_httplib2
+import httplib2
+from googleapiclient.discovery import build_from_document
 from google.auth.transport.requests import Request
 
+from classes.event_batch import EventBatch
 from classes.gcal_event import Event
 import tokens
 
 SCOPES = ['https://www.googleapis.com/auth/calendar.readonly']
 TOKEN_LOCATION = 'tokens/calendar-token.pickle'
 CREDS_LOCATION = 'tokens/calendar-credentials.json'
+# the Calendar v3 discovery document, bundled so `build()` doesn't have to download it every time
+DISCOVERY_LOCATION = os.path.join(os.path.dirname(__file__), 'gcal_discovery.json')
+REFRESH_MARGIN = datetime.timedelta(minutes=5)  # credentials are refreshed this long before expiry
+BATCH_SIZE = 50  # most requests Google Calendar allows in one batch
+# only the parts of the responses that are used, everything else is left out by Google
+EVENT_FIELDS = 'nextPageToken,summary,items(summary,description,start,end)'
+CALENDAR_LIST_FIELDS = 'nextPageToken,items(id)'
+SYNC_FIELDS = 'nextPageToken,nextSyncToken,summary,items(id,status,summary,description,start,end)'
+
+
+class CalendarService:
+    def __init__(self, token_location: str = TOKEN_LOCATION,
+                 discovery_location: str = DISCOVERY_LOCATION, service=None):
+        """
+        Holds one Google Calendar service for the whole life of the bot. The credentials are read
+        from `token_location` once and then kept in memory, the service is built once from the
+        bundled discovery document, and its HTTP connections are kept open and reused.
+
+        Credentials are refreshed before they expire (see `refresh_calendar()` in `event_utils`),
+        and the new token is written back to `token_location` on a background thread.
+
+        The service's httplib2 connection isn't thread safe, so anything that uses it has to go
+        through `run()`, which does one thing at a time on the service's own thread.
+
+        :param token_location: where the pickled credentials are kept
+        :type token_location: str
+        :param discovery_location: where the discovery document is kept
+        :type discovery_location: str
+        :param service: a service that is already built, it is used as is and never refreshed, this
+        is only given for tests
+        :type service: googleapiclient.discovery.Resource
+        """
+        self.token_location = token_location
+        self.discovery_location = discovery_location
+        self.credentials = None
+        self._service = service
+        self._request = None
+        self._lock = threading.RLock()
+        self._writer = ThreadPoolExecutor(max_workers=1)
+        self._worker = ThreadPoolExecutor(max_workers=1)  # the only thread that uses the service
+        self.builds = 0
+        self.refreshes = 0
+
+    def get(self):
+        """
+        Gets the service, this is free unless it is the first call or the credentials are about to
+        expire and nothing has refreshed them yet
+
+        :return: the Google Calendar service
+        :rtype: googleapiclient.discovery.Resource
+        """
+        service = self._service
+        if service is not None and not self.needs_refresh():
+            return service
+        with self._lock:
+            if self._service is None:
+                self._build()
+            if self.needs_refresh():
+                self.refresh()
+            return self._service
+
+    def _build(self) -> None:
+        creds = tokens.read_google_token()
+        if not creds or not (creds.valid or creds.refresh_token):  # let the user log in
+            flow = tokens.read_calendar_credentials(SCOPES)
+            creds = flow.run_local_server()
+            self._save(pickle.dumps(creds))
+        self.credentials = creds
+
+        with open(self.discovery_location) as file:
+            discovery = file.read()
+        http = google_auth_httplib2.AuthorizedHttp(creds, http=httplib2.Http())
+        self._service = build_from_document(discovery, http=http)
+        self.builds += 1
+
+    async def run(self, func: Callable, *args) -> Any:
+        """
+        Runs `func(service, *args)` on the service's own thread, after anything that was already
+        waiting to use it
+
+        :param func: what uses the service
+        :type func: Callable
+        :return: what `func` returns
+        :rtype: Any
+        """
+        return await self.call(lambda: func(self.get(), *args))
+
+    async def call(self, func: Callable, *args) -> Any:
+        """
+        Runs `func(*args)` on the service's own thread, for things like refreshing the credentials
+        that change what the service uses
+
+        :param func: the function
+        :type func: Callable
+        :return: what `func` returns
+        :rtype: Any
+        """
+        return await asyncio.get_event_loop().run_in_executor(self._worker, func, *args)
+
+    def needs_refresh(self) -> bool:
+        if self.credentials is None:
+            return self._service is None  # one that was given doesn't have credentials
+        return not self.credentials.valid or self.seconds_until_refresh() <= 0
+
+    def seconds_until_refresh(self) -> float:
+        """
+        :return: seconds until the credentials should be refreshed, 0 if they should be now
+        :rtype: float
+        """
+        if self.credentials is None:
+            return 0
+        if self.credentials.expiry is None:  # never expires
+            return float('inf')
+        refresh_at = self.credentials.expiry - REFRESH_MARGIN
+        return max((refresh_at - datetime.datetime.utcnow()).total_seconds(), 0)
+
+    def refresh(self) -> None:
+        """
+        Refreshes the credentials now, the service picks up the new token right away because it
+        shares the credentials object, then the token is saved in the background
+        """
+        with self._lock:
+            if self._service is None:
+                self._build()
+            if self._request is None:
+                self._request = Request()  # keeps its own session open for the next refresh
+            self.credentials.refresh(self._request)
+            self.refreshes += 1
+            token = pickle.dumps(self.credentials)
+        self._writer.submit(self._save, token)
+
+    def _save(self, token: bytes) -> None:
+        temp_location = self.token_location + '.tmp'
+        with open(temp_location, 'wb') as file:
+            file.write(token)
+        os.replace(temp_location, self.token_location)  # never leaves a half written token
+
+
+SERVICE = CalendarService()
 
 
 def get_service():
     """
-    Starts the Google Calendar API.
-    The file token.pickle stores the user's access and refresh tokens, and is
-    created automatically when the authorization flow completes for the first
-    time.
+    Gets the Google Calendar API service, it is only made once (see `CalendarService`)
     """
-    creds = tokens.read_google_token()
+    return SERVICE.get()
 
-    # If there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
 
-        else:
-            flow = tokens.read_calendar_credentials(SCOPES)
-            creds = flow.run_local_server()
+def execute_batch(service, requests: list, return_exceptions: bool = False) -> List[dict]:
+    """
+    Runs the requests with Google's batch endpoint, so it takes the same number of round trips no
+    matter how many requests there are (one for every `BATCH_SIZE`)
+
+    :param service: the Google Calendar service
+    :type service: googleapiclient.discovery.Resource
+    :param requests: requests from the service, e.g. `service.events().list(...)`
+    :type requests: List[googleapiclient.http.HttpRequest]
+    :param return_exceptions: return the exception of a request that failed instead of raising it
+    :type return_exceptions: bool
+    :raises googleapiclient.errors.HttpError: if any of the requests failed
+    :return: the response to each request, in the same order as `requests`
+    :rtype: List[dict]
+    """
+    responses, errors = {}, []
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            errors.append(exception)
+            response = exception
+        responses[int(request_id)] = response
+
+    for offset in range(0, len(requests), BATCH_SIZE):
+        batch = service.new_batch_http_request(callback=callback)
+        for i, request in enumerate(requests[offset:offset + BATCH_SIZE], offset):
+            batch.add(request, request_id=str(i))
+        batch.execute()
+
+    if errors and not return_exceptions:
+        raise errors[0]
+    return [responses[i] for i in range(len(requests))]
+
+
+def list_calendars(service) -> List[str]:
+    """
+    :return: IDs of every calendar the bot's account is subscribed to, from every page
+    :rtype: List[str]
+    """
+    calendar_ids, page_token = [], None
+    while True:
+        response = service.calendarList().list(fields=CALENDAR_LIST_FIELDS,
+                                               pageToken=page_token).execute()
+        calendar_ids += [calendar.get('id') for calendar in response.get('items', [])]
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return calendar_ids
 
-        with open(TOKEN_LOCATION, 'wb+') as token:  # Save the credentials for the next run
-            pickle.dump(creds, token)
 
-    return build('calendar', 'v3', credentials=creds)
+def iter_events(service, calendar_ids: List[str], start: datetime.datetime,
+                end: datetime.date) -> Iterator[Tuple[str, dict]]:
+    """
+    Goes through the events of every calendar from `start` to the end of `end`, one page at a time.
+    The first page of every calendar is fetched in one batch, then the next page of every calendar
+    that has one, and so on. A calendar stops being fetched once one of its events is past `end`,
+    and if the loop that uses this stops early then no more pages are fetched.
+
+    Only the fields that `make_event()` needs are asked for (see `EVENT_FIELDS`).
+
+    :param service: the Google Calendar service
+    :type service: googleapiclient.discovery.Resource
+    :param calendar_ids: IDs of the calendars
+    :type calendar_ids: List[str]
+    :param start: only events after this are returned
+    :type start: datetime.datetime
+    :param end: only events on or before this day are returned
+    :type end: datetime.date
+    :return: (name of the calendar, event) for each event, each calendar's are in order
+    :rtype: Iterator[Tuple[str, dict]]
+    """
+    time_min = start.isoformat() + 'Z'
+    # a day later than `end` so events late in the day in timezones behind UTC still come back,
+    # they are checked against `end` exactly below
+    time_max = (end + datetime.timedelta(days=2)).isoformat() + 'T00:00:00Z'
+    last_day = end.isoformat()
+    page_tokens = {calendar_id: None for calendar_id in calendar_ids}
+
+    while page_tokens:
+        calendar_ids = list(page_tokens)
+        responses = execute_batch(service, [
+            service.events().list(calendarId=calendar_id, timeMin=time_min, timeMax=time_max,
+                                  singleEvents=True, orderBy='startTime', fields=EVENT_FIELDS,
+                                  pageToken=page_tokens[calendar_id])
+            for calendar_id in calendar_ids])
+
+        page_tokens = {}
+        for calendar_id, response in zip(calendar_ids, responses):
+            past_end = False
+            for event in response.get('items', []):
+                day = event['start'].get('dateTime', event['start'].get('date'))[:10]
+                if day > last_day:  # ISO dates sort the same as strings
+                    past_end = True
+                    break
+                yield response['summary'], event
+            if response.get('nextPageToken') and not past_end:
+                page_tokens[calendar_id] = response['nextPageToken']
+
+
+def make_event(calendar_name: str, event: dict) -> Event:
+    has_time = event['start'].get("dateTime") is not None
+    key = 'dateTime' if has_time else 'date'
+    return Event(
+        calendar_name=calendar_name,
+        event_name=event['summary'],
+        start=datetime.datetime.fromisoformat(event['start'][key]),
+        end=datetime.datetime.fromisoformat(event['end'][key]),
+        has_time=has_time,
+        description=event.get('description', "")
+    )
 
 
 def get_all_events_until(service, days=0):
     start = datetime.datetime.utcnow()
     end = (start + datetime.timedelta(days=days)).date()
-    grouped_events = []
-
-    for calendar_raw in service.calendarList().list().execute().get('items'):
-        calendar = service.events().list(calendarId=calendar_raw.get('id'),
-                                         timeMin=start.isoformat() + 'Z',
-                                         singleEvents=True,
-                                         orderBy='startTime').execute()
-        for event in calendar['items']:
-            event: dict
-            has_time = event['start'].get("dateTime") is not None
-            event_d = Event(
-                calendar_name=calendar["summary"],
-                event_name=event['summary'],
-                start=datetime.datetime.fromisoformat(event['start']['dateTime'] if has_time else event['start']['date']),
-                end=datetime.datetime.fromisoformat(event['end']['dateTime'] if has_time else event['end']['date']),
-                has_time=has_time,
-                description=event.get('description', "")
-            )
-            if event_d.start_date <= end:
-                if len(grouped_events) == 0:
-                    grouped_events.append([event_d])
-                elif event_d.start_date == grouped_events[-1][0].start_date:
-                    grouped_events[-1].append(event_d)
-                else:
-                    grouped_events.append([event_d])
-    return sorted([sorted(e, key=lambda x: x.start_date) for e in add_empties(grouped_events, start, days)], key=lambda x: x[0].start_date)
-
-
-def add_empties(grouped_events: List[List[Event]], start: datetime.datetime, days: int):
-    empties = [[Event.make_empty(start + datetime.timedelta(days=i))] for i in range(days + 1)]
-    for i, empt in enumerate(empties):
-        events = list(filter(lambda x: x[0].start_date == empt[0].start_date, grouped_events))
-        if events:
-            empties[i] = events[0]
-    return empties
+
+    all_events = [make_event(calendar_name, event)
+                  for calendar_name, event in iter_events(service, list_calendars(service), start,
+                                                          end)]
+    return group_events(all_events, start, days)
+
+
+def group_events(all_events: List[Event], start: datetime.datetime, days: int):
+    """
+    Groups events by day, from `start` through `days` days after it, days without any events get an
+    empty event (see `EventBatch.days()`)
+
+    :param all_events: the events, from any number of calendars in any order
+    :type all_events: List[Event]
+    :param start: the first day
+    :type start: datetime.datetime
+    :param days: number of days after `start`
+    :type days: int
+    :return: the events on each day
+    :rtype: List[List[Event]]
+    """
+    batch = EventBatch(all_events)
+    return batch.days(start.date(), (start + datetime.timedelta(days=days)).date())
@@ -0,0 +1,226 @@
+import abc
+import asyncio
+import datetime
+import random
+import urllib.parse
+from typing import List, Tuple, Union
+
+import aiohttp
+
+from classes.gcal_api import (CALENDAR_LIST_FIELDS, EVENT_FIELDS, SERVICE, CalendarService,
+                              get_all_events_until, group_events, make_event)
+from classes.gcal_event import Event
+
+API_URL = 'https://www.googleapis.com/calendar/v3'
+RETRY_STATUSES = {429, 500, 502, 503, 504}  # Google says to back off and try these again
+
+
+class CalendarBackend(abc.ABC):
+    """
+    The interface for getting events from Google Calendar, every backend gives back the same thing
+    """
+    @abc.abstractmethod
+    async def get_all_events_until(self, days: int = 0) -> List[List[Event]]:
+        """
+        Gets the events from now through `days` days from now, grouped by day (see
+        `gcal_api.group_events()`)
+
+        :param days: number of days after today
+        :type days: int
+        :return: the events on each day
+        :rtype: List[List[Event]]
+        """
+
+    async def close(self) -> None:
+        """
+        Closes anything the backend keeps open, backends that don't keep anything open don't need
+        to change it
+        """
+
+
+class GoogleApiBackend(CalendarBackend):
+    """
+    The googleapiclient version, `gcal_api.get_all_events_until()` on the service's own thread (see
+    `CalendarService.run()`) so it doesn't block the event loop
+    """
+    def __init__(self, service: CalendarService = SERVICE):
+        """
+        :param service: where the Google Calendar service comes from, this is only changed for
+        tests
+        :type service: CalendarService
+        """
+        self.service = service
+
+    async def get_all_events_until(self, days: int = 0) -> List[List[Event]]:
+        return await self.service.run(get_all_events_until, days)
+
+
+class CalendarRequestError(Exception):
+    """
+    Raised when Google Calendar keeps failing after every retry, or fails in a way that retrying
+    won't fix
+    """
+    def __init__(self, status: Union[int, None], message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class AiohttpBackend(CalendarBackend):
+    def __init__(self, credentials: CalendarService = SERVICE, base_url: str = API_URL,
+                 timeout: float = 10, retries: int = 3, backoff: float = 0.5,
+                 concurrency: int = 8):
+        """
+        Talks to the Google Calendar REST API with aiohttp, so nothing blocks the event loop. It
+        keeps one session, so connections are pooled, and never has more than `concurrency`
+        requests out at once. Requests that time out or fail with a status in `RETRY_STATUSES` are
+        tried again after a random wait that doubles each time (full jitter).
+
+        Credentials come from `credentials`, refreshing them happens on its thread.
+
+        :param credentials: where the credentials come from
+        :type credentials: CalendarService
+        :param base_url: the Calendar API, this is only changed for tests
+        :type base_url: str
+        :param timeout: seconds each request is allowed to take
+        :type timeout: float
+        :param retries: times a request is tried again before giving up
+        :type retries: int
+        :param backoff: seconds of the longest wait before the first retry
+        :type backoff: float
+        :param concurrency: most requests at once
+        :type concurrency: int
+        """
+        self.credentials = credentials
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.concurrency = concurrency
+        self._session = None
+        self._semaphore = None
+        self.requests = 0
+        self.retried = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:  # made lazily so it is on the right loop
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency),
+                timeout=aiohttp.ClientTimeout(total=self.timeout))
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _token(self, force_refresh: bool = False) -> str:
+        # on the service's thread, so the credentials never change while it is using them
+        if force_refresh:
+            await self.credentials.call(self.credentials.refresh)
+        elif self.credentials.needs_refresh():
+            await self.credentials.call(self.credentials.get)
+        return self.credentials.credentials.token
+
+    async def request(self, path: str, params: dict) -> dict:
+        """
+        GETs `path` from the API, retrying when Google says to
+
+        :param path: e.g. '/users/me/calendarList'
+        :type path: str
+        :param params: the query string, None values are left out
+        :type params: dict
+        :raises CalendarRequestError: if it failed after every retry, or with a status that can't
+        be retried
+        :return: the JSON response
+        :rtype: dict
+        """
+        params = {key: str(value).lower() if isinstance(value, bool) else value
+                  for key, value in params.items() if value is not None}
+        session = self.session
+        refreshed = False
+        attempt = 0
+        while True:
+            token = await self._token()
+            status, message = None, ""
+            try:
+                async with self._semaphore:
+                    self.requests += 1
+                    async with session.get(self.base_url + path, params=params,
+                                           headers={'Authorization': f"Bearer {token}"}) as resp:
+                        if resp.status == 200:
+                            return await resp.json()
+                        status, message = resp.status, await resp.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                message = f"{type(e).__name__}: {e}"
+
+            if status == 401 and not refreshed:  # the token was revoked or expired early
+                await self._token(force_refresh=True)
+                refreshed = True
+                continue
+            if (status is not None and status not in RETRY_STATUSES) or attempt >= self.retries:
+                raise CalendarRequestError(status, message[:200])
+            await asyncio.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+            attempt += 1
+            self.retried += 1
+
+    async def list_calendars(self) -> List[str]:
+        calendar_ids, page_token = [], None
+        while True:
+            response = await self.request('/users/me/calendarList',
+                                          {'fields': CALENDAR_LIST_FIELDS, 'pageToken': page_token})
+            calendar_ids += [calendar.get('id') for calendar in response.get('items', [])]
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return calendar_ids
+
+    async def calendar_events(self, calendar_id: str, start: datetime.datetime,
+                              end: datetime.date) -> List[Tuple[str, dict]]:
+        """
+        `gcal_api.iter_events()` for one calendar, pages are fetched until one is past `end`
+
+        :return: (name of the calendar, event) for each event
+        :rtype: List[Tuple[str, dict]]
+        """
+        events, page_token = [], None
+        last_day = end.isoformat()
+        params = {
+            'timeMin': start.isoformat() + 'Z',
+            'timeMax': (end + datetime.timedelta(days=2)).isoformat() + 'T00:00:00Z',
+            'singleEvents': True,
+            'orderBy': 'startTime',
+            'fields': EVENT_FIELDS
+        }
+        path = f"/calendars/{urllib.parse.quote(calendar_id, safe='')}/events"
+        while True:
+            response = await self.request(path, dict(params, pageToken=page_token))
+            for event in response.get('items', []):
+                if event['start'].get('dateTime', event['start'].get('date'))[:10] > last_day:
+                    return events
+                events.append((response['summary'], event))
+            page_token = response.get('nextPageToken')
+            if not page_token:
+                return events
+
+    async def get_all_events_until(self, days: int = 0) -> List[List[Event]]:
+        start = datetime.datetime.utcnow()
+        end = (start + datetime.timedelta(days=days)).date()
+        calendars = await asyncio.gather(*[self.calendar_events(calendar_id, start, end)
+                                           for calendar_id in await self.list_calendars()])
+        return group_events([make_event(calendar_name, event)
+                             for events in calendars for calendar_name, event in events],
+                            start, days)
+
+
+def make_backend(name: str) -> CalendarBackend:
+    """
+    :param name: 'aiohttp' or 'googleapiclient', from the `calendar backend` config
+    :type name: str
+    :return: the backend
+    :rtype: CalendarBackend
+    """
+    backends = {'aiohttp': AiohttpBackend, 'googleapiclient': GoogleApiBackend}
+    if name not in backends:
+        raise ValueError(f"Unknown calendar backend `{name}`, use one of {list(backends)}")
+    return backends[name]()
@@ -1,7 +1,11 @@
 import datetime
+import sys
 
 
 class Event:
+    __slots__ = ('calendar_name', 'title', 'start', 'end', 'has_time', 'description',
+                 '_start_date', '_last_date', '_sort_key', '_start_day')
+
     def __init__(self,
                  calendar_name: str,
                  event_name: str,
@@ -13,15 +17,24 @@ class Event:
         Represents an individual event in a calendar, once make_better() is called it
         organizes all of the dat for easy access
 
+        There can be a year of these from every calendar at once, so they have slots instead of a
+        `__dict__` and calendar names are interned. The dates and sort key that grouping and sorting
+        use are worked out the first time they are asked for and then kept, so don't change `start`
+        or `end` afterwards, make a new event instead.
+
         :param calendar_name: The name of the calendar this event was from
         :type calendar_name: str
         """
-        self.calendar_name = calendar_name
+        self.calendar_name = sys.intern(calendar_name)
         self.title = event_name
         self.start = start
         self.end = end
         self.has_time = has_time
         self.description = description
+        self._start_date = None
+        self._last_date = None
+        self._sort_key = None
+        self._start_day = None
 
     @classmethod
     def make_empty(cls, date_time: datetime.datetime):
@@ -30,7 +43,9 @@ class Event:
 
     @property
     def start_day(self) -> str:
-        return self.start_date.strftime("%A")
+        if self._start_day is None:  # strftime is slow, and this is asked for for every day
+            self._start_day = self.start_date.strftime("%A")
+        return self._start_day
 
     @property
     def end_day(self) -> str:
@@ -38,18 +53,43 @@ class Event:
 
     @property
     def start_date(self) -> datetime.date:
-        return self.start.date()
+        if self._start_date is None:
+            self._start_date = self.start.date()
+        return self._start_date
+
+    @property
+    def last_date(self) -> datetime.date:
+        """
+        The last day the event is on, Google's end times are exclusive, so an all day event on the
+        3rd ends on the 4th at 00:00
+        """
+        if self._last_date is None:
+            if self.end <= self.start:
+                self._last_date = self.start_date
+            else:
+                self._last_date = max((self.end - datetime.timedelta(microseconds=1)).date(),
+                                      self.start_date)
+        return self._last_date
+
+    @property
+    def sort_key(self) -> tuple:
+        """
+        Events on the same day are sorted by this, all day events come first, then by start time
+        """
+        if self._sort_key is None:
+            self._sort_key = (self.start_date, self.has_time, self.start.time())
+        return self._sort_key
 
     @property
-    def start_time(self):
+    def start_time(self) -> datetime.time:
         return self.start.time()
 
     @property
-    def end_date(self):
+    def end_date(self) -> datetime.date:
         return self.end.date()
 
     @property
-    def end_time(self):
+    def end_time(self) -> datetime.time:
         return self.end.time()
 
     def str(self) -> str:
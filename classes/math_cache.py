@@ -0,0 +1,153 @@
+import shelve
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Union
+
+
+class MathCache:
+    def __init__(self, size: int = 256, path: Union[str, None] = None, version: int = 1):
+        """
+        Two tier cache for math answers, a bounded LRU in memory and an optional shelf on disk that
+        survives restarts. Anything found on disk gets pulled back into memory.
+
+        New answers aren't written to disk right away, they wait to be taken with `take_pending()`
+        and written with `write()` in an executor every so often, so the event loop never waits on
+        the disk. While answers are being written, `get()` skips the disk instead of waiting.
+
+        :param size: max number of answers kept in memory
+        :type size: int
+        :param path: where to keep the on-disk shelf, None to only cache in memory
+        :type path: Union[str, None]
+        :param version: format of the answers, keys on disk include it so answers saved in an older
+        format are never read back
+        :type version: int
+        """
+        self.size = size
+        self.path = path
+        self.version = version
+        self._memory = OrderedDict()
+        self._disk = None
+        self._pending = {}  # answers that haven't been written to disk yet
+        self._lock = threading.Lock()  # held while the disk is being used
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def disk(self) -> Union[shelve.Shelf, None]:
+        if self._disk is None and self.path is not None:
+            self._disk = shelve.open(self.path)
+        return self._disk
+
+    def get(self, key: str) -> Any:
+        """
+        Looks for `key` in memory, then on disk
+
+        :param key: key made by `math_equ.canonical_key()`
+        :type key: str
+        :return: the cached value, None if it isn't cached
+        :rtype: Any
+        """
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        value = self._pending.get(key)
+        if value is None and self.path is not None and self._lock.acquire(blocking=False):
+            try:  # while answers are being written, it is a miss rather than waiting for the disk
+                value = self.disk.get(self._disk_key(key))
+            except Exception:  # saved by a version of the bot that can't be unpickled anymore
+                value = None
+            finally:
+                self._lock.release()
+        if value is not None:
+            self.disk_hits += 1
+            self._remember(key, value)
+            return value
+
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        self._remember(key, value)
+        if self.path is not None:
+            self._pending[key] = value
+
+    def _disk_key(self, key: str) -> str:
+        return f"v{self.version}:{key}"
+
+    def take_pending(self) -> Dict[str, Any]:
+        """
+        Takes the answers that were put since the last time, call it on the event loop and pass
+        what it returns to `write()` in an executor
+
+        :return: key -> answer
+        :rtype: Dict[str, Any]
+        """
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def write(self, answers: Dict[str, Any]) -> None:
+        """
+        Writes answers to disk, this blocks on the disk so don't call it on the event loop
+
+        :param answers: from `take_pending()`
+        :type answers: Dict[str, Any]
+        """
+        if not answers:
+            return
+        with self._lock:
+            for key, value in answers.items():
+                self.disk[self._disk_key(key)] = value
+            self.disk.sync()
+
+    def flush(self) -> None:
+        """
+        Writes everything that is waiting to disk right now, for when the event loop isn't running
+        """
+        self.write(self.take_pending())
+
+    def _remember(self, key: str, value: Any) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._memory.clear()
+        self._pending.clear()
+        if self.path is not None:
+            with self._lock:
+                self.disk.clear()
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+
+    def _disk_size(self) -> Union[int, str]:
+        if self.path is None:
+            return "disabled"
+        if not self._lock.acquire(blocking=False):
+            return "writing"
+        try:
+            return len(self.disk)
+        finally:
+            self._lock.release()
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "size": f"{len(self._memory)}/{self.size}",
+            "on disk": self._disk_size(),
+            "waiting to be written": len(self._pending),
+            "hits": self.hits,
+            "disk hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
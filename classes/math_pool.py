@@ -0,0 +1,153 @@
+import asyncio
+import multiprocessing
+from typing import Any, Callable, List
+
+
+class WorkerTimeout(TimeoutError):
+    """
+    Raised when a job takes longer than its budget, the worker that was running it has already been
+    killed and replaced by the time this is raised
+    """
+    pass
+
+
+class WorkerDied(RuntimeError):
+    """
+    Raised when a worker process exits while running a job (e.g. it ran out of memory)
+    """
+    pass
+
+
+def _worker_main(conn) -> None:
+    """
+    The loop that runs inside of each worker process, it receives `(func, args)` jobs through the
+    pipe, runs them and sends back `(True, result)` or `(False, exception)`
+
+    :param conn: the worker's end of the pipe
+    :type conn: multiprocessing.connection.Connection
+    """
+    while True:
+        try:
+            func, args = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            return
+
+        try:
+            result = (True, func(*args))
+        except Exception as e:
+            result = (False, e)
+
+        try:
+            conn.send(result)
+        except Exception as e:  # the result or exception couldn't be pickled
+            conn.send((False, RuntimeError(f"{type(e).__name__}: {e}")))
+
+
+class Worker:
+    def __init__(self, context):
+        """
+        A single worker process and the parent's end of the pipe used to talk to it
+
+        :param context: multiprocessing context used to make the process and pipe
+        :type context: multiprocessing.context.BaseContext
+        """
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        """
+        Kills the process right away, there is no way to stop sympy politely
+        """
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class MathPool:
+    def __init__(self, workers: int = 2, timeout: float = 10):
+        """
+        A pool of worker processes that runs the math solver off of the event loop. Each job gets a
+        wall-clock budget, if it goes over that then the worker running it is killed and a fresh
+        one takes its place, so one hostile expression can't take down the bot
+
+        :param workers: number of worker processes, this is how many jobs can run at once
+        :type workers: int
+        :param timeout: default number of seconds a job is allowed to run for
+        :type timeout: float
+        """
+        self.workers = workers
+        self.timeout = timeout
+        self.context = multiprocessing.get_context()
+        self._all: List[Worker] = []
+        self._idle = None
+        self.completed = 0
+        self.timeouts = 0
+        self.respawns = 0
+
+    def start(self) -> "MathPool":
+        """
+        Starts the worker processes, this should be called before the bot connects so the workers
+        are forked from a quiet process. If it isn't called the workers start on the first job.
+        """
+        while len(self._all) < self.workers:
+            self._all.append(Worker(self.context))
+        return self
+
+    def close(self) -> None:
+        for worker in self._all:
+            worker.kill()
+        self._all, self._idle = [], None
+
+    def _respawn(self, worker: Worker) -> Worker:
+        worker.kill()
+        new_worker = Worker(self.context)
+        self._all[self._all.index(worker)] = new_worker
+        self.respawns += 1
+        return new_worker
+
+    async def run(self, func: Callable, *args, timeout: float = None) -> Any:
+        """
+        Runs `func(*args)` in a worker process and returns the result. `func` and `args` must be
+        picklable, so `func` has to be a module level function.
+
+        :param func: function to run in the worker
+        :type func: Callable
+        :param timeout: seconds the job is allowed to take, defaults to `self.timeout`
+        :type timeout: float
+        :raises WorkerTimeout: when the job goes over its budget
+        :raises WorkerDied: when the worker exits without answering
+        :return: whatever `func` returns, if `func` raised then that exception is raised here
+        :rtype: Any
+        """
+        if self._idle is None:
+            self.start()
+            self._idle = asyncio.Queue()
+            for worker in self._all:
+                self._idle.put_nowait(worker)
+
+        timeout = self.timeout if timeout is None else timeout
+        worker = await self._idle.get()
+        finished = False
+        try:
+            try:
+                worker.conn.send((func, args))
+                ready = await asyncio.get_event_loop().run_in_executor(None, worker.conn.poll,
+                                                                       timeout)
+                if not ready:
+                    self.timeouts += 1
+                    raise WorkerTimeout(f"Took longer than {timeout} seconds")
+                success, result = worker.conn.recv()
+            except (EOFError, BrokenPipeError, ConnectionResetError) as e:
+                raise WorkerDied(f"Math worker exited with code {worker.process.exitcode}") from e
+            finished = True
+        finally:
+            if not finished:  # still busy or dead, either way it has to be replaced
+                worker = self._respawn(worker)
+            self._idle.put_nowait(worker)
+
+        self.completed += 1
+        if not success:
+            raise result
+        return result
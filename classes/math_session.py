@@ -0,0 +1,155 @@
+import pickle
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Union
+
+PICKLE_PROTOCOL = 4  # sizes are measured with the same protocol on every python version
+
+
+class SessionFull(ValueError):
+    """
+    Raised when a variable can't fit in a session even after all of its parsed equations are dropped
+    """
+    pass
+
+
+class MathSession:
+    def __init__(self, user_id: int, max_bytes: int):
+        """
+        Holds one user's math variables and the equations they have already had parsed, so that
+        they can be reused instead of being parsed again. The memory it uses is estimated from the
+        pickled size of everything in it, and kept under `max_bytes`.
+
+        :param user_id: discord ID of the user
+        :type user_id: int
+        :param max_bytes: most (estimated) bytes the session can use
+        :type max_bytes: int
+        """
+        self.user_id = user_id
+        self.max_bytes = max_bytes
+        self.variables: Dict[str, Any] = {}
+        self._variable_sizes: Dict[str, int] = {}
+        self._parsed = OrderedDict()  # key -> (value, size)
+        self.last_used = time.monotonic()
+
+    @property
+    def size(self) -> int:
+        return sum(self._variable_sizes.values()) + sum(size for _, size in self._parsed.values())
+
+    def set_variable(self, name: str, value: Any) -> None:
+        """
+        Saves a variable, dropping the oldest parsed equations if there isn't room for it
+
+        :param name: name of the variable
+        :type name: str
+        :param value: the parsed value of the variable
+        :type value: Any
+        :raises SessionFull: if it doesn't fit even with every parsed equation dropped
+        """
+        size = len(pickle.dumps(value, protocol=PICKLE_PROTOCOL))
+        others = sum(s for n, s in self._variable_sizes.items() if n != name)
+        if others + size > self.max_bytes:
+            raise SessionFull(f"There isn't room for `{name}`, clear your variables with "
+                              f"`-vars clear`")
+        self.variables[name] = value
+        self._variable_sizes[name] = size
+        self._shrink()
+
+    def get_parsed(self, key: Hashable) -> Any:
+        if key not in self._parsed:
+            return None
+        self._parsed.move_to_end(key)
+        return self._parsed[key][0]
+
+    def add_parsed(self, key: Hashable, value: Any) -> None:
+        self._parsed[key] = (value, len(pickle.dumps(value, protocol=PICKLE_PROTOCOL)))
+        self._parsed.move_to_end(key)
+        self._shrink()
+
+    def _shrink(self) -> None:
+        while self._parsed and self.size > self.max_bytes:
+            self._parsed.popitem(last=False)
+
+    def clear(self) -> None:
+        self.variables.clear()
+        self._variable_sizes.clear()
+        self._parsed.clear()
+
+    @property
+    def parsed_count(self) -> int:
+        return len(self._parsed)
+
+
+class SessionStore:
+    def __init__(self, max_sessions: int = 100, ttl: float = 3600, max_bytes: int = 65536):
+        """
+        Keeps a `MathSession` for each user, sessions that haven't been used for `ttl` seconds are
+        dropped, and if there are too many then the least recently used ones are dropped
+
+        :param max_sessions: most sessions kept at once
+        :type max_sessions: int
+        :param ttl: seconds a session can go unused before it is dropped
+        :type ttl: float
+        :param max_bytes: most (estimated) bytes each session can use
+        :type max_bytes: int
+        """
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sessions: Dict[int, MathSession] = OrderedDict()
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, user_id: int, create: bool = True) -> Union[MathSession, None]:
+        """
+        Gets a user's session, making one if they don't have one
+
+        :param user_id: discord ID of the user
+        :type user_id: int
+        :param create: whether to make a session if there isn't one
+        :type create: bool
+        :return: the session, None if there isn't one and `create` is False
+        :rtype: Union[MathSession, None]
+        """
+        self.expire()
+        session = self._sessions.get(user_id)
+        if session is None:
+            if not create:
+                return None
+            session = self._sessions[user_id] = MathSession(user_id, self.max_bytes)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        self._sessions.move_to_end(user_id)
+        session.last_used = time.monotonic()
+        return session
+
+    def expire(self) -> List[int]:
+        """
+        Drops every session that hasn't been used for `ttl` seconds, since sessions are kept in
+        order of use this only has to look at the oldest ones
+
+        :return: IDs of the users whose sessions were dropped
+        :rtype: List[int]
+        """
+        cutoff = time.monotonic() - self.ttl
+        expired = []
+        for user_id, session in list(self._sessions.items()):
+            if session.last_used > cutoff:
+                break
+            del self._sessions[user_id]
+            expired.append(user_id)
+        self.expired += len(expired)
+        return expired
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "sessions": f"{len(self._sessions)}/{self.max_sessions}",
+            "memory": f"{sum(s.size for s in self._sessions.values())} bytes",
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
@@ -1,11 +1,11 @@
 import pickle
 from typing import List
-from queue import Queue
 import os
 import asyncio
 
 import discord
 
+from classes.reaction_router import ROUTER
 from extras import Colors, SYSTEM_CONFIG
 
 
@@ -34,8 +34,7 @@ class PollBase:
         self.title = title
         self.message = None
         self.bot = bot
-        self.add_reaction_q = None
-        self.remove_reaction_q = None
+        self.reactions = None  # (added, emoji, user_id), made in `load_context_data()`
         self.stop_emoji = "❌"
         self.save_data = {}
         self.file_number = None
@@ -84,26 +83,22 @@ class PollBase:
     async def loop(self):
         """
         Loop, when someone reacts to the message it removes all of their other reactions and gives
-        them the corresponding role
+        them the corresponding role. It sleeps until a reaction comes in, and handles them in the
+        order they were added and removed
         """
-        self.bot.add_listener(self.reaction_add_listener, name="on_raw_reaction_add")
-        self.bot.add_listener(self.reaction_remove_listener, name="on_raw_reaction_remove")
+        ROUTER.register(self.bot, self.message.id, self.reaction_add_listener,
+                        self.reaction_remove_listener)
 
         while True:
-            await asyncio.sleep(0.1)
-            if not self.add_reaction_q.empty():
-                emoji, user_id = self.add_reaction_q.get()
-                if self.stop_condition(emoji, user_id):
-                    break
-                else:
-                    await self.on_reaction_add(emoji, user_id)
-
-            if not self.remove_reaction_q.empty():
-                emoji, user_id = self.remove_reaction_q.get()
+            added, emoji, user_id = await self.reactions.get()
+            if not added:
                 await self.on_reaction_remove(emoji, user_id)
+            elif self.stop_condition(emoji, user_id):
+                break
+            else:
+                await self.on_reaction_add(emoji, user_id)
 
-        self.bot.remove_listener(self.reaction_add_listener, name="on_raw_reaction_add")
-        self.bot.remove_listener(self.reaction_remove_listener, name="on_raw_reaction_remove")
+        ROUTER.unregister(self.message.id)
         await self.end()
 
     async def add_reactions(self):
@@ -127,15 +122,16 @@ class PollBase:
         return embed
 
     def stop_condition(self, emoji: str, user_id: int):
-        return (emoji == self.stop_emoji) and (user_id in [self.author.id, *SYSTEM_CONFIG['devs'].values()])
+        return (emoji == self.stop_emoji) and (user_id in [self.author.id,
+                                                           *SYSTEM_CONFIG['devs'].values()])
 
     async def reaction_add_listener(self, payload: discord.RawReactionActionEvent):  # listener
-        if payload.message_id == self.message.id and payload.user_id != self.message.author.id:
-            self.add_reaction_q.put((str(payload.emoji), payload.user_id))
+        if payload.user_id != self.message.author.id:  # only this message gets routed here
+            self.reactions.put_nowait((True, str(payload.emoji), payload.user_id))
 
     async def reaction_remove_listener(self, payload: discord.RawReactionActionEvent):  # listener
-        if payload.message_id == self.message.id and payload.user_id != self.message.author.id:
-            self.remove_reaction_q.put((str(payload.emoji), payload.user_id))
+        if payload.user_id != self.message.author.id:
+            self.reactions.put_nowait((False, str(payload.emoji), payload.user_id))
 
     @staticmethod
     async def loadall(bot) -> List["PollBase"]:
@@ -212,8 +208,7 @@ class PollBase:
         pass
 
     async def load_context_data(self):
-        self.remove_reaction_q = Queue()
-        self.add_reaction_q = Queue()
+        self.reactions = asyncio.Queue()
 
         channel = self.bot.get_channel(self.save_data["channel_id"])
         self.message = await channel.fetch_message(self.save_data["message_id"])
@@ -227,6 +222,7 @@ class PollBase:
         })
         self.message = None
         self.author = None
+        self.reactions = None  # can't be pickled
 
     async def init(self):
         pass
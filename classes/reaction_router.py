@@ -0,0 +1,77 @@
+from typing import Awaitable, Callable, Dict, List, Tuple, Union
+
+Handler = Callable[..., Awaitable]  # takes a discord.RawReactionActionEvent
+
+
+class ReactionRouter:
+    def __init__(self):
+        """
+        Listens to every reaction the bot sees once, and hands each one straight to whatever is
+        waiting on that message (a poll, or the pages of -events), found by message ID in a dict.
+        Reactions on any other message are dropped right away, so it doesn't matter how many polls
+        are running.
+        """
+        self._routes: Dict[int, Tuple[Handler, Union[Handler, None]]] = {}  # message id -> handlers
+        self._bots: List[object] = []  # the bots it is listening to
+        self.routed = 0
+        self.dropped = 0
+
+    def attach(self, bot) -> None:
+        """
+        Starts listening to `bot`'s reactions, it only does it once for each bot
+
+        :param bot: client connection to discord
+        :type bot: Object
+        """
+        if any(attached is bot for attached in self._bots):
+            return
+        bot.add_listener(self.on_raw_reaction_add, name="on_raw_reaction_add")
+        bot.add_listener(self.on_raw_reaction_remove, name="on_raw_reaction_remove")
+        self._bots.append(bot)
+
+    def register(self, bot, message_id: int, on_add: Handler, on_remove: Handler = None) -> None:
+        """
+        Sends the reactions on the message to the handlers until `unregister()` is called, a
+        message only has one set of handlers, registering it again replaces them
+
+        :param bot: client connection to discord
+        :type bot: Object
+        :param message_id: the message
+        :type message_id: int
+        :param on_add: awaited with the payload when someone reacts
+        :type on_add: Handler
+        :param on_remove: awaited with the payload when someone takes a reaction off
+        :type on_remove: Handler
+        """
+        self.attach(bot)
+        self._routes[message_id] = on_add, on_remove
+
+    def unregister(self, message_id: int) -> bool:
+        """
+        :return: whether the message had handlers
+        :rtype: bool
+        """
+        return self._routes.pop(message_id, None) is not None
+
+    def __contains__(self, message_id: int) -> bool:
+        return message_id in self._routes
+
+    def __len__(self) -> int:
+        return len(self._routes)
+
+    async def _route(self, payload, index: int) -> None:
+        route = self._routes.get(payload.message_id)
+        if route is None or route[index] is None:
+            self.dropped += 1
+            return
+        self.routed += 1
+        await route[index](payload)
+
+    async def on_raw_reaction_add(self, payload) -> None:  # listener
+        await self._route(payload, 0)
+
+    async def on_raw_reaction_remove(self, payload) -> None:  # listener
+        await self._route(payload, 1)
+
+
+ROUTER = ReactionRouter()
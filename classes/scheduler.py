@@ -0,0 +1,101 @@
+import asyncio
+import datetime
+import heapq
+import itertools
+from typing import Awaitable, Callable, Dict, Hashable, List, Tuple, Union
+
+
+class Scheduler:
+    def __init__(self):
+        """
+        Runs jobs at set times with one task, the jobs are kept in a heap ordered by when they are
+        due, and `run()` sleeps until the first one is. Nothing happens in between, a job that is
+        added in front of the first one wakes it up so it can sleep for less.
+
+        Jobs have a key, scheduling a job with a key that is already there replaces it. Cancelled
+        and replaced jobs are left in the heap and skipped when they get to the top, so adding and
+        cancelling are both O(log n).
+        """
+        self._heap: List[Tuple[float, int, Hashable]] = []  # (due timestamp, order, key)
+        self._jobs: Dict[Hashable, Tuple[int, datetime.datetime, Callable]] = {}
+        self._order = itertools.count()
+        self._wakeup = None  # made in `run()` so it is on the right loop
+        self.fired = 0
+
+    def schedule(self, key: Hashable, when: datetime.datetime,
+                 callback: Callable[[], Awaitable]) -> None:
+        """
+        :param key: names the job, e.g. to cancel it
+        :type key: Hashable
+        :param when: when the job is due, timezone aware, a time that already passed is due now
+        :type when: datetime.datetime
+        :param callback: the job, it is called with no arguments and awaited in its own task
+        :type callback: Callable[[], Awaitable]
+        """
+        order = next(self._order)
+        self._jobs[key] = order, when, callback
+        heapq.heappush(self._heap, (when.timestamp(), order, key))
+        if self._wakeup is not None and self._heap[0][1] == order:  # it is the first one now
+            self._wakeup.set()
+
+    def cancel(self, key: Hashable) -> bool:
+        """
+        :return: whether there was a job with `key`
+        :rtype: bool
+        """
+        return self._jobs.pop(key, None) is not None
+
+    def when(self, key: Hashable) -> Union[datetime.datetime, None]:
+        job = self._jobs.get(key)
+        return job[1] if job else None
+
+    def keys(self) -> List[Hashable]:
+        return list(self._jobs)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._jobs
+
+    def _first(self) -> Union[Tuple[float, int, Hashable], None]:
+        while self._heap:
+            timestamp, order, key = self._heap[0]
+            job = self._jobs.get(key)
+            if job is not None and job[0] == order:
+                return self._heap[0]
+            heapq.heappop(self._heap)  # cancelled or replaced
+        return None
+
+    async def run(self) -> None:
+        """
+        Runs the jobs when they are due, for the rest of time
+        """
+        self._wakeup = asyncio.Event()
+        while True:
+            self._wakeup.clear()
+            first = self._first()
+            if first is None:
+                await self._wakeup.wait()
+                continue
+
+            timestamp, _, key = first
+            delay = timestamp - datetime.datetime.now(datetime.timezone.utc).timestamp()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue  # something was added, or it is time, either way look again
+
+            heapq.heappop(self._heap)
+            _, _, callback = self._jobs.pop(key)
+            self.fired += 1
+            asyncio.ensure_future(self._fire(key, callback))
+
+    @staticmethod
+    async def _fire(key: Hashable, callback: Callable[[], Awaitable]) -> None:
+        try:
+            await callback()
+        except Exception as e:  # one job failing doesn't stop the others
+            print(f"Scheduler job {key} Exception: {type(e).__name__}: {e}")
@@ -11,6 +11,13 @@ class SetupPoll(PollBase):
         self.stop_emoji = ""
         self.stop = False
 
+    def plan_announcements(self):
+        """
+        Plans the auto-announcements again so the change counts right away
+        """
+        import event_utils  # here because event_utils imports this file
+        event_utils.plan_announcements(self.bot)
+
     async def unsubscribe(self):
         """
         It removes the channel from the config, if it hasn't been already
@@ -23,6 +30,7 @@ class SetupPoll(PollBase):
                 if channel_id == self.message.channel.id:
                     del SYSTEM_CONFIG['channels'][index]
                     SYSTEM_CONFIG.write()
+                    self.plan_announcements()
                     await self.message.channel.send("This channel has now been unsubscribed from "
                                                     "the announcements")
         self.stop = True
@@ -37,6 +45,7 @@ class SetupPoll(PollBase):
         else:
             SYSTEM_CONFIG['channels'].append(self.message.channel.id)
             SYSTEM_CONFIG.write()
+            self.plan_announcements()
             await self.message.channel.send("This channel is now subscribed to the announcements")
         self.stop = True
 
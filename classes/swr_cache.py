@@ -0,0 +1,82 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SWRCache:
+    def __init__(self, ttl: float = 60, size: int = 32):
+        """
+        A stale-while-revalidate cache. A value that is older than `ttl` is still given out right
+        away, but it gets rebuilt in the background so the next call gets a fresh one. A value made
+        from an older version of the data is never given out, it is rebuilt first.
+
+        :param ttl: seconds a value is fresh for
+        :type ttl: float
+        :param size: most values kept, the ones made longest ago are dropped first
+        :type size: int
+        """
+        self.ttl = ttl
+        self.size = size
+        self._entries: Dict[Hashable, tuple] = {}  # key -> (value, version, time made)
+        self._building: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def get(self, key: Hashable, version: Hashable,
+                  build: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Gets the value for `key`, building it with `build()` if there isn't one for `version`
+
+        :param key: what the value is for
+        :type key: Hashable
+        :param version: version of the data the value is made from, when it changes the old
+        value is thrown away
+        :type version: Hashable
+        :param build: makes the value, it is only called once at a time for each key
+        :type build: Callable[[], Awaitable[Any]]
+        :return: the value
+        :rtype: Any
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] == version:
+            value, _, made = entry
+            if time.monotonic() - made <= self.ttl:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                if key not in self._building:
+                    asyncio.ensure_future(self._refresh(key, version, build))
+            return value
+
+        self.misses += 1
+        return await self._build(key, version, build)
+
+    async def _build(self, key: Hashable, version: Hashable,
+                     build: Callable[[], Awaitable[Any]]) -> Any:
+        if key in self._building:  # someone is already building it, wait for theirs
+            return await asyncio.shield(self._building[key])
+
+        future = self._building[key] = asyncio.ensure_future(build())
+        try:
+            value = await asyncio.shield(future)  # someone giving up doesn't stop the others
+        finally:
+            del self._building[key]
+        self._entries.pop(key, None)  # so it is the newest
+        self._entries[key] = value, version, time.monotonic()
+        while len(self._entries) > self.size:
+            del self._entries[next(iter(self._entries))]
+        return value
+
+    async def _refresh(self, key: Hashable, version: Hashable,
+                       build: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            await self._build(key, version, build)
+        except Exception as e:  # the stale value stays until the next try
+            print(f"SWRCache refresh Exception: {e}")
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
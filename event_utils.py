@@ -4,16 +4,39 @@ logic
 """
 import datetime
 import asyncio
-from typing import List, Union
+from typing import List
 
 import discord
 
 import extras
+from classes.alarms import Alarm, AlarmBook
+from classes.announcement_schedule import AnnouncementSchedule
+from classes.announcer import Announcer, DeliveryReport
+from classes.event_pages import EventPages, add_days
 from classes.setup_poll import SetupPoll
+from classes.swr_cache import SWRCache
 # from classes.calendar_api import CalendarAPI
 # from classes.calendar import EventCalendar
-from classes.gcal_api import get_all_events_until, get_service
+from classes.event_store import EventStore
+from classes.gcal_api import SERVICE
+from classes.gcal_backend import make_backend
 from classes.gcal_event import Event
+from classes.scheduler import Scheduler
+
+# too old to use once 3 syncs in a row have failed
+EVENT_STORE = EventStore('cache/events.json',
+                         max_age=3 * extras.SYSTEM_CONFIG['calendar sync interval'])
+EMBED_CACHE = SWRCache(ttl=extras.SYSTEM_CONFIG['events embed ttl'])
+CALENDAR_BACKEND = make_backend(extras.SYSTEM_CONFIG['calendar backend'])
+ANNOUNCER = Announcer(concurrency=extras.SYSTEM_CONFIG['announcement concurrency'],
+                      retries=extras.SYSTEM_CONFIG['announcement retries'])
+SCHEDULER = Scheduler()
+ANNOUNCEMENTS = AnnouncementSchedule('cache/announcements.json',
+                                     extras.SYSTEM_CONFIG['announcement timezone'],
+                                     extras.SYSTEM_CONFIG['announcement time'],
+                                     extras.SYSTEM_CONFIG['channel announcement times'],
+                                     grace=extras.SYSTEM_CONFIG['announcement grace'])
+ALARMS = AlarmBook('cache/alarms.jsonl', extras.SYSTEM_CONFIG['alarm timezone'])
 
 
 # when this method is completed it with write the channel id to channels.txt
@@ -32,40 +55,138 @@ async def setup(ctx, bot) -> None:
     await setup_poll.loop()
 
 
-async def alarm(time: datetime.time, content: str, ctx, pings: str):
+def schedule_alarm(bot, alarm: Alarm) -> None:
     """
-    This method is called inside of a loop, and it will continue to loop until the destination time
-    is reached, then it
-    will send out the alarm message (embed) and stop
+    Puts the alarm in `SCHEDULER` so it rings at `alarm.when`
 
-    this gets looped to inside of an event loop
+    :param bot: client connection to discord
+    :type bot: Object
+    :param alarm: the alarm
+    :type alarm: Alarm
+    """
+    async def callback():
+        await ring_alarm(bot, alarm.id)
+
+    SCHEDULER.schedule(('alarm', alarm.id), alarm.when, callback)
+
+
+async def ring_alarm(bot, alarm_id: int) -> None:
+    """
+    Sends the alarm's pings and embed to its channel, then schedules it again if it repeats
+
+    :param bot: client connection to discord
+    :type bot: Object
+    :param alarm_id: the alarm
+    :type alarm_id: int
+    """
+    alarm = ALARMS.get(alarm_id)
+    if alarm is None:
+        return
+    try:
+        channel = bot.get_channel(alarm.channel_id)
+        if channel is None:  # the channel was deleted
+            ALARMS.remove(alarm_id)
+            return
+        alarm_embed = discord.Embed(
+            title=f"Alarm at {alarm.when.strftime('%H:%M')}",
+            description=alarm.message,
+            color=extras.Colors.purple)
+        alarm_embed.set_footer(text=f"Scheduled by: {alarm.author}")
+        if alarm.pings:
+            await channel.send(alarm.pings)
+        await channel.send(content=None, embed=alarm_embed)
+    finally:
+        # even if it failed, so one broken alarm doesn't ring over and over
+        alarm = ALARMS.rang(alarm_id)
+        if alarm is not None:
+            schedule_alarm(bot, alarm)
+
+
+async def load_alarms(bot) -> None:
+    """
+    Schedules the alarms that were saved before the bot restarted, ones that should have rung while
+    it was off ring right away
+
+    :param bot: client connection to discord
+    :type bot: Object
+    """
+    await bot.wait_until_ready()
+    for alarm in ALARMS:
+        schedule_alarm(bot, alarm)
+
+
+def describe_alarm(alarm: Alarm) -> str:
+    repeat = f", {alarm.repeat}" if alarm.repeat else ""
+    return f"{alarm.when.strftime('%a %b %d %H:%M %Z')}{repeat}"
+
+
+async def set_alarm(ctx, bot, when: datetime.datetime, message: str, pings: str,
+                    repeat: str = None) -> None:
+    """
+    Saves an alarm for the channel and schedules it
 
-    :param time: time that the alarm with go off
-    :type time: datetime.time object
-    :param content: content of the message
-    :type content: str
     :param ctx: context object for the message
     :type ctx: Object
-    :param pings: comma separated list of pings
+    :param bot: client connection to discord
+    :type bot: Object
+    :param when: when it rings, timezone aware
+    :type when: datetime.datetime
+    :param message: what it says
+    :type message: str
+    :param pings: space separated mentions
     :type pings: str
+    :param repeat: None, 'daily' or 'weekly'
+    :type repeat: str
     """
-    await ctx.channel.send("Alarm set!")
-    while True:
-        # checks if time is within 5 secs of scheduled time
-        if time <= datetime.datetime.now().time() <= \
-                datetime.time(time.hour, time.minute + 5, time.second):
-            break
-        else:
-            await asyncio.sleep(30)
-    alarm_embed = discord.Embed(  # creates embed
-        title=f"Alarm at {time.strftime('%H:%M')}",
-        description=f"{content}",
-        color=discord.Color.from_rgb(67, 0, 255))
-    alarm_embed.set_footer(text=f"Scheduled by: {ctx.message.author.nick}")
-    await ctx.channel.send(pings)
+    alarm = ALARMS.add(ctx.channel.id, when, message, pings, ctx.message.author.id,
+                       ctx.message.author.display_name, repeat)
+    schedule_alarm(bot, alarm)
+    await ctx.channel.send(f"Alarm #{alarm.id} set for {describe_alarm(alarm)}")
+
+
+async def list_alarms(ctx) -> None:
+    """
+    Sends an embed with the alarms in the channel
+
+    :param ctx: context object for the message
+    :type ctx: Object
+    """
+    alarms = ALARMS.in_channel(ctx.channel.id)
+    alarm_embed = discord.Embed(
+        title="Alarms",
+        description="" if alarms else "There are no alarms in this channel",
+        color=extras.Colors.purple)
+    for alarm in alarms[:25]:  # the most fields an embed can have
+        value = f"{alarm.message or '(no message)'}\nBy {alarm.author}"
+        alarm_embed.add_field(name=f"#{alarm.id}: {describe_alarm(alarm)}", value=value[:1024],
+                              inline=False)
+    if len(alarms) > 25:
+        alarm_embed.set_footer(text=f"and {len(alarms) - 25} more")
     await ctx.channel.send(content=None, embed=alarm_embed)
 
 
+async def cancel_alarm(ctx, alarm_id: int) -> None:
+    """
+    Cancels an alarm in the channel, only the person that set it or a dev can
+
+    :param ctx: context object for the message
+    :type ctx: Object
+    :param alarm_id: the alarm
+    :type alarm_id: int
+    """
+    alarm = ALARMS.get(alarm_id)
+    if alarm is None or alarm.channel_id != ctx.channel.id:
+        await extras.command_error(ctx, '707', extra=f"There is no alarm #{alarm_id} in this "
+                                                     f"channel, check -alarms")
+        return
+    if ctx.message.author.id not in (alarm.author_id, *extras.SYSTEM_CONFIG['devs'].values()):
+        await extras.command_error(ctx, '303', missing_permissions="setting the alarm")
+        return
+    ALARMS.remove(alarm_id)
+    SCHEDULER.cancel(('alarm', alarm_id))
+    await ctx.channel.send(f"Alarm #{alarm_id} cancelled")
+
+
 def create_event_embed(is_today: bool, num_days: int = None) -> discord.Embed:
     """
     Creates the correct embed depending on the values for is_today and events_exist
@@ -100,23 +221,24 @@ def create_event_embed(is_today: bool, num_days: int = None) -> discord.Embed:
     return embed
 
 
-def get_events(days: int) -> List[List[Event]]:
+async def get_events(days: int) -> List[List[Event]]:
     """
-    First it sets up the api, then it gets the events from it, organizes the events by date, indexes
-    the calendar by date, returns the events that are happening in the next `days` days, if you want
-    events for today `days` should equal 0
+    Gets the events from the local copy of the calendars (see `sync_calendars()`), organizes the
+    events by date, returns the events that are happening in the next `days` days, if you want
+    events for today `days` should equal 0. Until the first sync is done it asks Google directly,
+    through `CALENDAR_BACKEND`.
 
     :param days: number of days the events cover
     :type days: int
     :return: list of events within the days specified
     :rtype: List[List[Event]]
     """
-    service = get_service()
-    events = get_all_events_until(service, days)
-    return events
+    if not EVENT_STORE.ready:
+        return await CALENDAR_BACKEND.get_all_events_until(days)
+    return EVENT_STORE.days(datetime.datetime.utcnow(), days)
 
 
-def events_by_day(days: int) -> (discord.Embed, List[List[Event]]):
+async def events_by_day(days: int) -> (discord.Embed, List[List[Event]]):
     """
    Gets the events for the next `days` days and generates the correct embed.
 
@@ -126,44 +248,105 @@ def events_by_day(days: int) -> (discord.Embed, List[List[Event]]):
     :rtype: discord.Embed, List[List[Event]]
     """
     if days == 0:
-        return events_today()
-    event_list = get_events(days)
+        return await events_today()
+    event_list = await get_events(days)
     event_embed = create_event_embed(False, num_days=days)
     return event_embed, event_list
 
 
-def events_today() -> (discord.Embed, List[List[Event]]):
+async def events_today() -> (discord.Embed, List[List[Event]]):
     """
     Gets the events for today and generates the embed that is correct
 
     :return: embed for events, list of events
     :rtype: discord.Embed, List[List[Event]]
     """
-    event_list = get_events(0)
+    event_list = await get_events(0)
     event_embed = create_event_embed(True)
     return event_embed, event_list
 
 
-def WHAT_TIME_IS_IT(question_mark: str) -> bool:
+async def build_events_embed(today: bool, days: int) -> discord.Embed:
     """
-    Checks if it is 9:30, returns True if it is, it is at 13:30 because it runs on a Heroku server
-    that is in a timezone 4 hours behind EST
+    Gets basic embed then either appends the events to it or leaves it empty saying that there are
+    no events happening
 
-    :param question_mark: literally just exists so when its called there is a question mark
-    :type question_mark: str (useless)
-    :return: whether its 9:30
-    :rtype: bool
+    :param today: if True then the embed only contains today's events
+    :type today: bool
+    :param days: amount of days the data is for
+    :type days: int
+    :return: the embed
+    :rtype: discord.Embed
     """
-    return datetime.datetime.strptime('13:30', '%H:%M').time() <= datetime.datetime.now().time() \
-           <= datetime.datetime.strptime('13:36', '%H:%M').time()
+    if today:  # get events for today
+        event_embed, event_list = await events_today()
+    else:  # gets events for the next week
+        event_embed, event_list = await events_by_day(days)
 
+    first_day = datetime.datetime.utcnow().date()
+    added = add_days(event_embed, event_list, first_day, first_day)
+    if added < len(event_list):  # the rest don't fit in one embed
+        event_embed.set_footer(text=f"{len(event_list) - added} more days, see them with "
+                                    f"-events {days}")
+    return event_embed
 
-async def manage_events(bot, today: bool = False, days: int = 14, auto: bool = True,
-                        channels: List[int] = None) -> Union[discord.Embed, None]:
+
+async def events_embed(today: bool, days: int) -> discord.Embed:
     """
-    Gets basic embed then either appends the events to it and sends it or sends an empty one saying
-    that there are no events happening, it then iterates through all of the channels, creating the
-    channel object from the channel ids and sends them to all of the channels saved in channels.txt
+    Gets the embed from `EMBED_CACHE`, it is rebuilt when the calendars change or the day changes,
+    and in the background once it is older than `events embed ttl`. The embed is shared, so it must
+    not be changed.
+
+    :param today: if True then the embed only contains today's events
+    :type today: bool
+    :param days: amount of days the data is for
+    :type days: int
+    :return: the embed
+    :rtype: discord.Embed
+    """
+    key = (datetime.datetime.utcnow().date(), today, 0 if today else days)
+    version = (EVENT_STORE.ready, EVENT_STORE.version)
+    return await EMBED_CACHE.get(key, version, lambda: build_events_embed(today, days))
+
+
+async def event_pages(bot, today: bool = False, days: int = 14) -> EventPages:
+    """
+    Makes the pages for `-events`, the days on each page come from the local copy of the calendars
+    when it has been synced, otherwise Google is asked once for all of them. The pages are kept in
+    `EMBED_CACHE` like the announcement embeds, see `events_embed()`.
+
+    :param bot: client connection to discord
+    :type bot: Object
+    :param today: if True then there is only today
+    :type today: bool
+    :param days: amount of days the events are for
+    :type days: int
+    :return: the pages, nothing is sent yet
+    :rtype: EventPages
+    """
+    start = datetime.datetime.utcnow()
+    days = 0 if today else days
+    fetched = []  # Google is only asked if a page isn't cached
+
+    async def get_days(first: int, count: int) -> List[List[Event]]:
+        if EVENT_STORE.ready:
+            return EVENT_STORE.days(start, first + count - 1, first=first)
+        if not fetched:
+            fetched.append(await CALENDAR_BACKEND.get_all_events_until(days))
+        return fetched[0][first:first + count]
+
+    return EventPages(bot, create_event_embed(today, num_days=days), get_days, days, start.date(),
+                      timeout=extras.SYSTEM_CONFIG['events page timeout'], cache=EMBED_CACHE,
+                      key=('page', start.date(), today, days),
+                      version=lambda: (EVENT_STORE.ready, EVENT_STORE.version))
+
+
+async def manage_events(bot, today: bool = False, days: int = 14,
+                        channels: List[int] = None) -> DeliveryReport:
+    """
+    Gets the events embed (see `events_embed()`) and sends it to all of the channels saved in
+    channels.txt at once through `ANNOUNCER`, a channel that was deleted or fails doesn't stop the
+    others from getting it
 
     :param today: if True then it send an embed that only contains today's events
     :type today: bool
@@ -173,57 +356,104 @@ async def manage_events(bot, today: bool = False, days: int = 14, auto: bool = T
     :type bot: Object
     :param days: amount of days the data is for
     :type days: str (int)
-    :param auto: True if this is being called by the auto-announcements
-    :type auto: bool
+    :return: what was delivered and what failed
+    :rtype: DeliveryReport
     """
-    if today:  # get events for today
-        event_embed, event_list = events_today()
-    else:  # gets events for the next week
-        event_embed, event_list = events_by_day(days)
+    event_embed = await events_embed(today, days)
+    return await ANNOUNCER.announce(bot, channels, content=None, embed=event_embed)
+
+
+def plan_announcements(bot) -> None:
+    """
+    Schedules the next auto-announcement of every channel in `SCHEDULER`, channels that are due at
+    the same time are sent together. Run it again whenever the channels change, it replaces the
+    announcements that were planned before.
+
+    :param bot: client connection to discord
+    :type bot: Object
+    """
+    for key in SCHEDULER.keys():
+        if key[0] == 'announcement':
+            SCHEDULER.cancel(key)
 
-    for events in event_list:  # iteratively adds events to embed
-        event_embed: discord.Embed
-        event_embed.add_field(
-            name=f"**{events[0].start_day} ({events[0].start_date.strftime('%m/%d')})**",
-            value="\n".join([event.str() for event in events]),
-            inline=False)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    for deadline, channel_ids in ANNOUNCEMENTS.deadlines(extras.SYSTEM_CONFIG['channels'],
+                                                         now).items():
+        async def callback(deadline=deadline, channel_ids=channel_ids):
+            await announce(bot, deadline, channel_ids)
 
-    event_embed.set_field_at(0, name="**Today**", value=event_embed.fields[0].value, inline=False)
+        SCHEDULER.schedule(('announcement', deadline), deadline, callback)
+
+
+async def announce(bot, deadline: datetime.datetime, channel_ids: List[int]) -> None:
+    """
+    Sends the auto-announcement that was due at `deadline`, on sundays it covers the next 2 weeks,
+    on any other day it covers the next 3 days. Then it plans the next one.
 
-    if not auto:
-        return event_embed
-    for channel in channels:
-        channel = bot.get_channel(channel)
-        await channel.send(content=None, embed=event_embed)
+    :param bot: client connection to discord
+    :type bot: Object
+    :param deadline: when it was due
+    :type deadline: datetime.datetime
+    :param channel_ids: the channels it is for
+    :type channel_ids: List[int]
+    """
+    day = ANNOUNCEMENTS.local_day(deadline)
+    try:
+        if day.weekday() == 6:  # sunday
+            await manage_events(bot, today=False, channels=channel_ids)
+        else:
+            await manage_events(bot, days=3, channels=channel_ids)
+    finally:
+        # even if it failed, so a broken calendar doesn't make it try over and over
+        ANNOUNCEMENTS.announced(channel_ids, day)
+        plan_announcements(bot)
 
 
-async def auto_announcements(bot):
+async def auto_announcements(bot) -> None:
     """
-    Loops inside of event loop, first it checks if it is 9:00 and if it is, it checks is it is
-    sunday, on sundays it sends out a message covering events for the whole week, if is is just any
-    other day, it will send out the message only covering that day. It will also create the channel
-    cache if it does not already exist.
+    Plans the auto-announcements once the bot is connected, `SCHEDULER` sends them when they are
+    due, so nothing has to check the time every minute. They go out at `announcement time` in
+    `announcement timezone`, or at the channel's time in `channel announcement times`. If the bot
+    was off when one was due, it is sent when it comes back as long as it is less than
+    `announcement grace` seconds late.
 
     :param bot: client connection to discord
     :type bot: Object
     """
-    last_day = datetime.datetime.today() + datetime.timedelta(days=-1)
-    # creates a variable representing yesterday
-    last_day = last_day.weekday()
     await bot.wait_until_ready()
-    while not bot.is_closed():  # loops as long as the bot is connected to discord
-        if WHAT_TIME_IS_IT('?'):  # True if it is 9:30
-            this_day = datetime.datetime.today().weekday()
-            try:
-                # if it is sunday and it hasn't already sent a message
-                if datetime.datetime.today().weekday() == 6 and this_day != last_day:
-                    await manage_events(bot, today=False, channels=extras.SYSTEM_CONFIG['channels'])
-                    last_day = this_day
-                    await asyncio.sleep(9999)
-                elif this_day != last_day:  # if it is not sunday and hasn't already sent a message
-                    await manage_events(bot, days=3, channels=extras.SYSTEM_CONFIG['channels'])
-                    last_day = this_day
-                    await asyncio.sleep(9999)
-            except ValueError:
-                continue
-        await asyncio.sleep(60)
+    plan_announcements(bot)
+
+
+async def refresh_calendar(bot) -> None:
+    """
+    Keeps the Google Calendar credentials fresh, it wakes up a little before they expire and
+    refreshes them off of the event loop, so `-events` and the auto-announcements never have to
+
+    :param bot: client connection to discord
+    :type bot: Object
+    """
+    while not bot.is_closed():
+        try:
+            await SERVICE.call(SERVICE.get)  # builds or refreshes when it needs to
+        except Exception as e:
+            print(f"refresh_calendar Exception: {e}")
+            await asyncio.sleep(60)
+            continue
+        await asyncio.sleep(min(max(SERVICE.seconds_until_refresh(), 1), 3600))
+
+
+async def sync_calendars(bot) -> None:
+    """
+    Keeps the local copy of the calendars up to date, every `calendar sync interval` seconds it
+    gets the changes from Google on `SERVICE`'s thread
+    This loops for the rest of time
+
+    :param bot: client connection to discord
+    :type bot: Object
+    """
+    while not bot.is_closed():
+        try:
+            await SERVICE.run(EVENT_STORE.sync)
+        except Exception as e:
+            print(f"sync_calendars Exception: {e}")
+        await asyncio.sleep(extras.SYSTEM_CONFIG['calendar sync interval'])
@@ -1,8 +1,78 @@
-from typing import List, Union
+import ast
+import hashlib
+import itertools
+import math
+import re
+from collections import namedtuple
+from typing import Any, Dict, Iterator, List, Tuple, Union
 
 import mpmath as mp
+import numpy
 import sympy
 import sympy.parsing.sympy_parser as sympy_parser
+from sympy.core.evaluate import evaluate as sympy_evaluate
+
+TRANSFORMATIONS = sympy_parser.standard_transformations + (sympy_parser.implicit_multiplication,)
+SYMPY_NAMES = {}  # made once and shared, otherwise `parse_expr()` re-imports sympy every call
+exec('from sympy import *', SYMPY_NAMES)
+
+MAX_LITERAL_DIGITS = 1000  # longest number that can be typed in
+MAX_POW_DEPTH = 3  # most exponents that can be stacked, 2^3^4^5 is 3
+MAX_DEGREE = 500  # highest polynomial degree
+MAX_SYMBOLS = 10  # most variables in one equation
+MAX_EXACT_DIGITS = 10 ** 5  # biggest number (in digits) that is worked out exactly
+MAX_NUMERIC_DIGITS = 10 ** 15  # biggest number (in digits) that is approximated with mpmath
+
+NEWTON_STEPS = 3  # steps used to clean up roots from numpy, more are added for more digits
+FLOAT_DIGITS = 15  # digits in a float64, this is what the quick answer is given to
+MAX_DIGITS = 1000  # most digits that can be asked for
+MAX_BATCH = 10  # most equations that can be solved in one message
+MAX_NSOLVE_VARIABLES = 4  # most variables in a nonlinear system that is solved numerically
+NSOLVE_STARTS = (1, -1, 3)  # every combination of these is tried as a starting point
+MAX_TABLE_POINTS = 100000  # most points in a table
+TABLE_ROWS = 50  # most rows in a table before it gets sent as a CSV file instead
+FINDROOT_WINDOW = (-10, 10)  # where `solve_findroot()` looks for brackets
+FINDROOT_STEPS = 200  # number of grid steps across the window
+FINDROOT_STARTS = (0, 1, -1, 5, -5)  # starting points for roots that don't cross 0
+MAX_NUMERIC_ROOTS = 10  # most roots `solve_findroot()` returns, periodic functions have infinite
+ASSIGNMENT = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*)=([^=].*)$")  # `-set k = 3.2` saves k
+
+ENGINE_POLYNOMIAL = "numpy (companion matrix)"
+ENGINE_FINDROOT = f"mpmath findroot (real roots, {FINDROOT_WINDOW[0]} to {FINDROOT_WINDOW[1]})"
+ENGINE_SYMPY = "sympy"
+ENGINE_MPMATH = "mpmath"
+ENGINE_LINALG = "numpy linalg.solve"
+ENGINE_LSTSQ = "numpy least squares"
+ENGINE_MP_LINALG = "mpmath lu_solve"
+ENGINE_MP_LSTSQ = "mpmath least squares"
+ENGINE_NSOLVE = "mpmath findroot (multidimensional)"
+
+Cost = namedtuple('Cost', ['pow_depth', 'digits', 'degree', 'symbols'])
+
+
+class ComplexityError(ValueError):
+    """
+    Raised when an equation is too expensive to even try solving
+    """
+    pass
+
+
+def split_batch(text: str) -> List[List[str]]:
+    """
+    Splits a message with more than one equation into one list of args per equation, equations are
+    separated by `;` or new lines, and code blocks are allowed
+
+    :param text: the message, without the command
+    :type text: str
+    :raises ValueError: if there are more than `MAX_BATCH` equations
+    :return: the args for each equation
+    :rtype: List[List[str]]
+    """
+    text = re.sub(r"```([a-zA-Z]+\n)?", "\n", text)
+    batch = [line.split() for line in re.split(r"[;\n]", text) if line.strip()]
+    if len(batch) > MAX_BATCH:
+        raise ValueError(f"There are {len(batch)} equations, the most is {MAX_BATCH}")
+    return batch
 
 
 def organize(equation_list: List[str]) -> (Union[sympy.Symbol, None], str):
@@ -26,47 +96,940 @@ def organize(equation_list: List[str]) -> (Union[sympy.Symbol, None], str):
         elif element != ignore:
             equation_str += element
     equation_str_copy = equation_str
-    if '=' in equation_str:
-        equation_str = f"({equation_str})".replace('=', ')-(')
-    equation_str = equation_str.replace("^", "**").replace("e", str(mp.e))
-    return variable, equation_str, equation_str_copy
+    return variable, _to_zero(equation_str), equation_str_copy
+
 
+def _to_zero(equation: str) -> str:
+    """
+    Sets an equation equal to 0 and swaps the math notation for python notation
+    """
+    if '=' in equation:
+        equation = f"({equation})".replace('=', ')-(')
+    return equation.replace("^", "**").replace("e", str(mp.e))
+
+
+def split_equations(equation: str) -> List[str]:
+    """
+    Splits a system of equations on the commas between them, commas inside of brackets (like in
+    `log(8, 2)`) are left alone
 
-def parse_equ(equation: str) -> sympy.Add:
+    :param equation: the equations, e.g. `2x+y=3,x-y=0`
+    :type equation: str
+    :return: each equation
+    :rtype: List[str]
+    """
+    equations, depth, current = [], 0, ""
+    for char in equation:
+        depth += (char in "([{") - (char in ")]}")
+        if char == ',' and depth == 0:
+            equations.append(current)
+            current = ""
+        else:
+            current += char
+    return [e for e in equations + [current] if e]
+
+
+def is_system(equation_list: List[str]) -> bool:
+    """
+    Whether the args are for a system of equations, meaning more than one equation or more than one
+    variable to solve for
+
+    :param equation_list: the list containing elements that describe the equation to process
+    :type equation_list: List[str]
+    :return: whether it is a system
+    :rtype: bool
+    """
+    return equation_list.count('-v') > 1 or len(split_equations("".join(equation_list))) > 1
+
+
+def organize_system(equation_list: List[str]) -> (List[sympy.Symbol], List[str], str):
+    """
+    The same as `organize()` but for systems of equations, there can be more than one `-v` and the
+    equations are separated by commas
+
+    :param equation_list: the list containing elements that describe the equations to process
+    :type equation_list: List[str]
+    :raises ValueError: if a `-v` doesn't have a variable after it
+    :return: variables (can be empty), string of each equation, original equations
+    :rtype: List[sympy.Symbol], List[str], str
+    """
+    variables, parts = [], []
+    elements = iter(equation_list)
+    for element in elements:
+        if element == '-v':
+            variable = next(elements, None)
+            if variable is None:
+                raise ValueError("`-v` needs 1 value(s) after it")
+            variables.append(sympy.Symbol(variable))
+        else:
+            parts.append(element)
+    copy = "".join(parts)
+    return variables, [_to_zero(equation) for equation in split_equations(copy)], copy
+
+
+def split_assignment(equation_list: List[str]) -> Union[Tuple[str, str, str], None]:
+    """
+    Checks if the args save a variable to the user's session, like `-set k = 3.2`, rather than
+    being an equation to solve. Only args with the `-set` flag are assignments, so an equation like
+    `y = 2x+1` still gets solved.
+
+    :param equation_list: the list containing elements that describe the equation to process
+    :type equation_list: List[str]
+    :raises ValueError: if `-set` isn't followed by a name and a value, or the name has an `e` in
+    it, that gets swapped for Euler's number
+    :return: name of the variable, organized value, original assignment. None if it isn't one
+    :rtype: Union[Tuple[str, str, str], None]
+    """
+    if '-set' not in equation_list:
+        return None
+    equation_list = [element for element in equation_list if element != '-set']
+    copy = "".join(equation_list)
+    match = ASSIGNMENT.match(copy)
+    if match is None or '-v' in equation_list:
+        raise ValueError("`-set` needs a variable and its value, like `-set k = 3.2`")
+    name, value = match.groups()
+    if 'e' in name:
+        raise ValueError(f"`{name}` can't be a variable, `e` is saved for Euler's number")
+    return name, _to_zero(value), copy
+
+
+def _literal(node: ast.AST) -> Union[int, float, str, None]:
+    """
+    Gets the value out of a literal node, python 3.7 makes `ast.Num`/`ast.Str` nodes while newer
+    versions make `ast.Constant` nodes
+
+    :param node: node of the parsed python code
+    :type node: ast.AST
+    :return: the value, None if it isn't a literal
+    :rtype: Union[int, float, str, None]
+    """
+    if isinstance(node, ast.Constant):
+        return node.value
+    if type(node).__name__ == 'Num':
+        return node.n
+    if type(node).__name__ == 'Str':
+        return node.s
+    return None
+
+
+class _CostEstimator:
+    def __init__(self):
+        """
+        Walks the python code that sympy would run to build an equation and estimates how expensive
+        it is without building anything. Numbers are tracked by their (base 10) log, so a power
+        tower only ever costs a couple of float multiplications to measure.
+        """
+        self.symbols = set()
+        self.digits = 0.0
+
+    @staticmethod
+    def _pow10(x: float) -> float:
+        return 10 ** x if x < 300 else math.inf
+
+    def visit(self, node) -> (Union[float, None], Union[float, None], int):
+        """
+        Estimates the cost of a node
+
+        :param node: node of the parsed python code
+        :type node: ast.AST
+        :return: log10 of the biggest value the node could have (None if it has a symbol in it),
+        polynomial degree (None if it isn't a polynomial), exponent nesting depth
+        :rtype: Union[float, None], Union[float, None], int
+        """
+        log, degree, depth = self._visit(node)
+        if log is not None:
+            self.digits = max(self.digits, log)
+        return log, degree, depth
+
+    def _visit(self, node) -> (Union[float, None], Union[float, None], int):
+        if isinstance(node, ast.Expression):
+            return self.visit(node.body)
+
+        literal = _literal(node)
+        if isinstance(literal, (int, float)):
+            value = abs(literal)
+            return (math.log10(value) if 0 < value < math.inf else 0.0), 0, 0
+
+        if isinstance(node, ast.Name):  # constants like pi and I
+            return 1.0, 0, 0
+
+        if isinstance(node, ast.UnaryOp):
+            return self.visit(node.operand)
+
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            return self._visit_call(node.func.id, node.args)
+
+        if isinstance(node, ast.BinOp):
+            return self._visit_binop(node)
+
+        # anything else (comparisons, tuples, lambdas...) just gets the worst of its children
+        logs, depth = [], 0
+        for child in ast.iter_child_nodes(node):
+            log, _, child_depth = self.visit(child)
+            logs.append(log)
+            depth = max(depth, child_depth)
+        return (None if None in logs else max(logs, default=0.0)), None, depth
+
+    def _visit_binop(self, node: ast.BinOp) -> (Union[float, None], Union[float, None], int):
+        left_log, left_degree, left_depth = self.visit(node.left)
+        right_log, right_degree, right_depth = self.visit(node.right)
+
+        if isinstance(node.op, ast.Pow):
+            depth = max(left_depth, right_depth + 1)
+            if right_log is None:  # symbol in the exponent
+                return None, None, depth
+            if left_log is None:
+                exponent = self._pow10(right_log)
+                degree = None if left_degree is None else left_degree * exponent
+                return None, degree, depth
+            return left_log * self._pow10(right_log), 0, depth
+
+        return (self._binop_log(node.op, left_log, right_log),
+                self._binop_degree(node.op, left_degree, right_degree),
+                max(left_depth, right_depth))
+
+    @staticmethod
+    def _binop_log(op: ast.operator, left: Union[float, None],
+                   right: Union[float, None]) -> Union[float, None]:
+        if None in (left, right):
+            return None
+        if isinstance(op, ast.Mult):
+            return left + right
+        if isinstance(op, ast.Div):
+            return left
+        return max(left, right) + math.log10(2)
+
+    @staticmethod
+    def _binop_degree(op: ast.operator, left: Union[float, None],
+                      right: Union[float, None]) -> Union[float, None]:
+        if None in (left, right):
+            return None
+        if isinstance(op, ast.Mult):
+            return left + right
+        if isinstance(op, ast.Div):
+            return left if right == 0 else None
+        return max(left, right)
+
+    def _visit_call(self, name: str,
+                    args: List[ast.AST]) -> (Union[float, None], Union[float, None], int):
+        if name == 'Symbol':
+            self.symbols.add(_literal(args[0]))
+            return None, 1, 0
+
+        if name in ('Integer', 'Float', 'Rational') and args:
+            value = _literal(args[0])
+            if isinstance(value, str):  # Float('1.5')
+                value = abs(float(value))
+                return (math.log10(value) if 0 < value < math.inf else 0.0), 0, 0
+
+        results = [self.visit(arg) for arg in args]
+        logs = [log for log, _, _ in results]
+        depth = max([d for _, _, d in results], default=0)
+        if None in logs:
+            return None, None, depth
+        if name in ('Integer', 'Float', 'Rational', 'sqrt', 'Abs'):
+            return max(logs, default=0.0), 0, depth
+        if name == 'factorial':
+            n = self._pow10(logs[0])
+            return (n * math.log10(n) if n > 1 else 0.0), 0, depth
+        if name == 'exp':
+            return self._pow10(logs[0]) * math.log10(math.e), 0, depth
+        return max(logs, default=0.0), 0, depth
+
+
+def estimate_cost(equation: str) -> Cost:
+    """
+    Estimates how expensive an organized equation is to parse and solve, without parsing it, by
+    going over the code that sympy would run to make it
+
+    :param equation: the organized equation
+    :type equation: str
+    :raises ComplexityError: if there is a number that is too long to even look at
+    :return: exponent nesting depth, digits in the biggest number, polynomial degree (None if it
+    isn't a polynomial), number of symbols
+    :rtype: Cost
+    """
+    longest = max([len(number) for number in re.findall(r'\d+', equation)], default=0)
+    if longest > MAX_LITERAL_DIGITS:
+        raise ComplexityError(f"There is a number with {longest} digits, the most is "
+                              f"{MAX_LITERAL_DIGITS}")
+
+    code = sympy_parser.stringify_expr(equation, {}, SYMPY_NAMES, TRANSFORMATIONS)
+    estimator = _CostEstimator()
+    _, degree, depth = estimator.visit(ast.parse(code.strip(), mode='eval'))
+    return Cost(depth, estimator.digits, degree, len(estimator.symbols))
+
+
+def check_cost(variable: Union[sympy.Symbol, None], equation: str) -> bool:
+    """
+    Decides whether an equation should be worked out exactly, approximated, or not tried at all
+
+    :param variable: the variable being solved for, None if it is an expression
+    :type variable: Union[sympy.Symbol, None]
+    :param equation: the organized equation
+    :type equation: str
+    :raises ComplexityError: if the equation is too expensive to solve
+    :return: True if it should be worked out exactly, False if it should only be approximated
+    :rtype: bool
+    """
+    cost = estimate_cost(equation)
+    if cost.pow_depth > MAX_POW_DEPTH:
+        raise ComplexityError(f"The exponents are stacked {cost.pow_depth} deep, the most is "
+                              f"{MAX_POW_DEPTH}")
+    if cost.symbols > MAX_SYMBOLS:
+        raise ComplexityError(f"There are {cost.symbols} variables, the most is {MAX_SYMBOLS}")
+    if cost.degree is not None and cost.degree > MAX_DEGREE:
+        raise ComplexityError(f"The polynomial is degree {cost.degree:g}, the most is "
+                              f"{MAX_DEGREE}")
+    if cost.digits > MAX_NUMERIC_DIGITS:
+        raise ComplexityError(f"There is a number with about 10^{math.log10(cost.digits):.0f} "
+                              f"digits, that is too big even to approximate")
+    if cost.digits > MAX_EXACT_DIGITS:
+        if variable is not None:
+            raise ComplexityError(f"There is a number with about {cost.digits:.3g} digits, that "
+                                  f"is too big to solve for `{variable}`")
+        return False
+    return True
+
+
+def parse_equ(equation: str, exact: bool = True) -> sympy.Add:
     """
     This parses the string form of the equation and returns something that is more usable to sympy
 
     :param equation: The equation to be parsed
     :type equation: str
+    :param exact: whether to work out the numbers, if False then everything stays unevaluated so it
+    can be approximated later
+    :type exact: bool
     :return: The parsed equation
     :rtype: sympy.Add
     """
-    return sympy_parser.parse_expr(
-        equation,
-        transformations=sympy_parser.standard_transformations +
-        (sympy_parser.implicit_multiplication,))
+    if exact:
+        return sympy_parser.parse_expr(equation, global_dict=SYMPY_NAMES,
+                                       transformations=TRANSFORMATIONS)
+    with sympy_evaluate(False):
+        return sympy_parser.parse_expr(equation, global_dict=SYMPY_NAMES,
+                                       transformations=TRANSFORMATIONS)
+
+
+def canonical_key(variable: Union[sympy.Symbol, None], equation: sympy.Basic) -> str:
+    """
+    Makes a key for the answer cache out of the parsed equation and the variable, because it is made
+    from the parsed equation things like `2x+1=5` and `2*x + 1 = 5` get the same key
+
+    :param variable: the variable being solved for, None if it is an expression
+    :type variable: Union[sympy.Symbol, None]
+    :param equation: the parsed equation
+    :type equation: sympy.Basic
+    :return: hex digest of the canonical form
+    :rtype: str
+    """
+    canonical = f"{variable}|{sympy.srepr(sympy.sympify(equation))}"
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+
+def prepare_equ(variable: Union[sympy.Symbol, None], equation: str, exact: bool = True,
+                values: Dict[str, sympy.Basic] = None) -> (Union[sympy.Basic, None], str):
+    """
+    Parses the equation and makes its cache key, this is the part of solving that happens before the
+    cache is checked
+
+    The parsed equation is only returned when `exact` is True, unpickling an unevaluated equation
+    evaluates it, so those have to stay in the worker (see `approximate_equ()`)
+
+    :param variable: the variable being solved for, None if it is an expression
+    :type variable: Union[sympy.Symbol, None]
+    :param equation: the organized equation
+    :type equation: str
+    :param exact: passed to `parse_equ()`, this should come from `check_cost()`
+    :type exact: bool
+    :param values: session variables that `approximate_equ()` will put in when not `exact`, so
+    they are part of the key. Exact equations get them from `substitute_equ()` instead.
+    :type values: Dict[str, sympy.Basic]
+    :return: the parsed equation (None if not `exact`), cache key
+    :rtype: Union[sympy.Basic, None], str
+    """
+    parsed = parse_equ(equation, exact)
+    if not exact:
+        parsed = _put_values(parsed, values)
+    return (parsed if exact else None), canonical_key(variable, parsed)
+
+
+def _put_values(equation: sympy.Basic, values: Union[Dict[str, sympy.Basic], None]) -> sympy.Basic:
+    """
+    Puts session variables into an unevaluated equation without evaluating it
+    """
+    if not values:
+        return equation
+    with sympy_evaluate(False):
+        return equation.xreplace({sympy.Symbol(name): value for name, value in values.items()})
+
+
+def substitute_equ(variable: Union[sympy.Symbol, Tuple[sympy.Symbol, ...], None],
+                   equation: sympy.Basic, values: Dict[str, sympy.Basic]) -> (sympy.Basic, str):
+    """
+    Puts the user's session variables into an already parsed equation, so it doesn't have to be
+    parsed again, the variable being solved for is never replaced
+
+    :param variable: the variable(s) being solved for, None if it is an expression
+    :type variable: Union[sympy.Symbol, Tuple[sympy.Symbol, ...], None]
+    :param equation: the parsed equation
+    :type equation: sympy.Basic
+    :param values: session variables, name -> value
+    :type values: Dict[str, sympy.Basic]
+    :return: the equation with the variables put in, its cache key
+    :rtype: sympy.Basic, str
+    """
+    solving_for = set(variable) if isinstance(variable, tuple) else {variable}
+    replacements = {sympy.Symbol(name): value for name, value in values.items()
+                    if sympy.Symbol(name) not in solving_for}
+    if replacements:
+        equation = sympy.sympify(equation).subs(replacements)
+    return equation, canonical_key(variable, equation)
+
+
+def assign_equ(value: str, values: Dict[str, sympy.Basic]) -> (sympy.Basic, str):
+    """
+    Works out the value of a session variable, it can use the other session variables
+
+    :param value: the organized value, from `split_assignment()`
+    :type value: str
+    :param values: the other session variables, name -> value
+    :type values: Dict[str, sympy.Basic]
+    :return: the value, how it is shown to the user
+    :rtype: sympy.Basic, str
+    """
+    parsed = sympy_parser.parse_expr(value, global_dict=SYMPY_NAMES,  # so 3.2 stays exactly 16/5
+                                     transformations=TRANSFORMATIONS + (sympy_parser.rationalize,))
+    parsed, _ = substitute_equ(None, parsed, values)
+    if parsed.is_number and not parsed.is_Integer:
+        return parsed, str(sympy.N(parsed, FLOAT_DIGITS))
+    return parsed, str(parsed)
+
+
+def approximate_equ(equation: str, values: Dict[str, sympy.Basic] = None,
+                    digits: int = FLOAT_DIGITS) -> (List[str], str):
+    """
+    Approximates an expression that is too big to work out exactly, it is parsed without being
+    evaluated and then `sympy.N()` works it out with mpmath
+
+    :param equation: the organized expression
+    :type equation: str
+    :param values: the user's session variables that are in it, name -> value
+    :type values: Dict[str, sympy.Basic]
+    :param digits: number of significant digits
+    :type digits: int
+    :return: the answer, name of the engine
+    :rtype: List[str], str
+    """
+    parsed = _put_values(parse_equ(equation, exact=False), values)
+    return [f"`{sympy.N(parsed, digits)}`"], ENGINE_MPMATH
+
+
+def _to_mp(value: sympy.Basic) -> mp.mpc:
+    """
+    Turns a sympy number into an mpmath one at the current mpmath precision
+
+    :param value: sympy number
+    :type value: sympy.Basic
+    :return: the same number as an mpmath complex
+    :rtype: mp.mpc
+    """
+    real, imag = sympy.N(value, mp.mp.dps).as_real_imag()
+    return mp.mpc(mp.mpf(str(real)), mp.mpf(str(imag)))
+
+
+def _format_root(root: mp.mpc, digits: int = 15) -> str:
+    """
+    Formats a numeric root the same way `sympy.N()` would, leaving off the imaginary part if it is
+    just rounding error
+
+    :param root: the root to format
+    :type root: mp.mpc
+    :param digits: number of significant digits
+    :type digits: int
+    :return: the formatted root
+    :rtype: str
+    """
+    root = mp.mpc(root)
+    real = sympy.Float(mp.nstr(root.real, digits + 5), digits)
+    if abs(root.imag) <= mp.mpf(10) ** -digits * max(1, abs(root)):
+        return str(real)
+    return str(real + sympy.Float(mp.nstr(root.imag, digits + 5), digits) * sympy.I)
+
+
+def _is_duplicate(root: mp.mpc, roots: List[mp.mpc], digits: int) -> bool:
+    tolerance = mp.mpf(10) ** -(digits // 2)
+    return any(abs(root - other) <= tolerance * max(1, abs(root)) for other in roots)
+
+
+def _root_order(root: mp.mpc) -> tuple:
+    root = mp.mpc(root)
+    return abs(root.imag) > mp.mpf(10) ** -10 * max(1, abs(root)), root.real, root.imag
+
+
+def solve_polynomial(variable: sympy.Symbol, equation: sympy.Basic,
+                     digits: int = 15) -> Union[List[mp.mpc], None]:
+    """
+    Numerically finds all of the roots of a polynomial from its coefficients, numpy gets them from
+    the eigenvalues of the companion matrix and then they get a couple of newton steps in mpmath so
+    they are right to `digits` digits. Repeated roots are taken out first (for exact coefficients)
+    since they are what throws off the eigenvalues.
+
+    :param variable: the variable being solved for
+    :type variable: sympy.Symbol
+    :param equation: the parsed equation, equal to 0
+    :type equation: sympy.Basic
+    :param digits: number of significant digits the roots should be right to
+    :type digits: int
+    :return: the roots, None if the equation isn't a polynomial with numeric coefficients
+    :rtype: Union[List[mp.mpc], None]
+    """
+    if equation.free_symbols != {variable} or not equation.is_polynomial(variable):
+        return None
+    poly = sympy.Poly(equation, variable)
+    if poly.degree() < 1:
+        return None
+    if poly.domain.is_ZZ or poly.domain.is_QQ:
+        poly = poly.sqf_part()
+
+    guesses = numpy.roots([complex(sympy.N(c)) for c in poly.all_coeffs()])
+    roots = []
+    with mp.workdps(digits + 10):
+        coefficients = [_to_mp(c) for c in poly.all_coeffs()]
+        for guess in guesses:
+            root = mp.mpc(complex(guess))
+            for _ in range(NEWTON_STEPS + math.ceil(math.log2(max(digits, 15) / 15))):
+                value, slope = mp.polyval(coefficients, root, derivative=True)
+                if slope == 0:
+                    break
+                root -= value / slope
+            roots.append(root)
+    return sorted(roots, key=_root_order)
+
+
+def _real_value(function, x: mp.mpf) -> Union[mp.mpf, None]:
+    try:
+        value = mp.mpmathify(function(x))
+    except (ValueError, TypeError, ZeroDivisionError, OverflowError):
+        return None
+    if isinstance(value, mp.mpc):
+        if value.imag != 0:
+            return None
+        value = value.real
+    return value if mp.isfinite(value) else None
+
+
+def _add_root(function, x0, roots: List[mp.mpf], digits: int, **kwargs) -> None:
+    """
+    Runs `mp.findroot()` from `x0` and adds the root to `roots` if it is real and isn't already
+    there
+    """
+    try:
+        root = mp.findroot(function, x0, **kwargs)
+    except (ValueError, TypeError, ZeroDivisionError, OverflowError):
+        return
+    if isinstance(root, mp.mpc) or not mp.isfinite(root):
+        return
+    if not _is_duplicate(root, roots, digits):
+        roots.append(root)
+
+
+def _grid_starts(function) -> Iterator[Tuple[Any, dict]]:
+    """
+    Checks the function on a grid across `FINDROOT_WINDOW`, points that are exactly 0 are roots and
+    places where the sign changes have a root in between
+
+    :return: where `mp.findroot()` should start, and the arguments it needs for it
+    :rtype: Iterator[Tuple[Any, dict]]
+    """
+    points = mp.linspace(*FINDROOT_WINDOW, FINDROOT_STEPS + 1)
+    values = [_real_value(function, x) for x in points]
+    for a, b, value_a, value_b in zip(points, points[1:], values, values[1:]):
+        if value_a is None or value_b is None:
+            continue
+        if value_a == 0:
+            yield a, {}
+        elif value_a * value_b < 0:
+            yield (a, b), {'solver': 'anderson'}
+
+
+def solve_findroot(variable: sympy.Symbol, equation: sympy.Basic,
+                   digits: int = 15) -> Union[List[mp.mpf], None]:
+    """
+    Numerically finds the real roots of a single variable equation in `FINDROOT_WINDOW`. Brackets
+    come from sign changes on a grid across the window and each one goes to a bracketed
+    `mp.findroot()`, then a handful of starting points get tried with the secant method to catch
+    roots that touch 0 without crossing it.
+
+    :param variable: the variable being solved for
+    :type variable: sympy.Symbol
+    :param equation: the parsed equation, equal to 0
+    :type equation: sympy.Basic
+    :param digits: number of significant digits the roots should be right to
+    :type digits: int
+    :return: the roots, None if it has other symbols in it or no roots could be found
+    :rtype: Union[List[mp.mpf], None]
+    """
+    if equation.free_symbols != {variable}:
+        return None
+    function = sympy.lambdify(variable, equation, 'mpmath')
+
+    roots = []
+    with mp.workdps(digits + 10):
+        starts = list(_grid_starts(function)) + [(x0, {}) for x0 in FINDROOT_STARTS]
+        for x0, kwargs in starts:
+            _add_root(function, x0, roots, digits, **kwargs)
+
+    if not roots:
+        return None
+    return sorted(roots)[:MAX_NUMERIC_ROOTS]
+
+
+def solve_numeric(variable: Union[sympy.Symbol, None], equation: Union[sympy.Basic, int, float],
+                  digits: int = FLOAT_DIGITS) -> Union[Tuple[List[str], str], None]:
+    """
+    Solves or evaluates the equation numerically to `digits` significant digits, polynomials are
+    solved from their coefficients and other single variable equations with `mp.findroot()`
+
+    :param variable: the variable being solved for, None if it is an expression
+    :type variable: Union[sympy.Symbol, None]
+    :param equation: the parsed equation
+    :type equation: Union[sympy.Basic, int, float]
+    :param digits: number of significant digits
+    :type digits: int
+    :return: all possible solutions and the name of the engine that solved it, None if it can't be
+    solved numerically
+    :rtype: Union[Tuple[List[str], str], None]
+    """
+    if variable is None:
+        return [f"`{sympy.N(equation, digits)}`"], ENGINE_SYMPY
+
+    for engine, solver in ((ENGINE_POLYNOMIAL, solve_polynomial),
+                           (ENGINE_FINDROOT, solve_findroot)):
+        roots = solver(variable, equation, digits)
+        if roots is not None:
+            with mp.workdps(digits + 10):
+                return [f"{variable} = {_format_root(root, digits)}\n" for root in roots], engine
+    return None
+
+
+def solve_exact(variable: Union[sympy.Symbol, None], equation: Union[sympy.Basic, int, float],
+                digits: int = FLOAT_DIGITS) -> (List[str], List[str]):
+    """
+    Solves or simplifies the equation symbolically with sympy, this is what gives exact answers like
+    `x = sqrt(2)`, but it can take a very long time
+
+    :param variable: the variable being solved for, None if it is an expression
+    :type variable: Union[sympy.Symbol, None]
+    :param equation: the parsed equation
+    :type equation: Union[sympy.Basic, int, float]
+    :param digits: number of significant digits for the numeric versions of the answers
+    :type digits: int
+    :return: exact solutions, the same solutions to `digits` digits
+    :rtype: List[str], List[str]
+    """
+    if variable is None:
+        return [f"`{sympy.simplify(equation)}`"], [f"`{sympy.N(equation, digits)}`"]
+
+    solutions = [list(ans.values())[0] for ans in sympy.solve(equation, variable, dict=True)]
+    return ([f"{variable} = {solution}\n" for solution in solutions],
+            [f"{variable} = {sympy.N(solution, digits)}\n" for solution in solutions])
 
 
 def solve_equ(variable: Union[sympy.Symbol, None],
-              equation: Union[sympy.Add, int, float]) -> List[str]:
+              equation: Union[sympy.Add, int, float]) -> (List[str], str):
     """
     If it is just an expression it will simplify it, otherwise it will solve it and return all
     possible answers in a list, with backticks (`) around it so it can be a little code segment with
     the discord markdown
 
+    It is solved numerically if it can be (see `solve_numeric()`), `sympy.solve()` is only used
+    when that doesn't work
+
     :param variable: sympy.sympy.Symbol
     :param equation: str
-    :return: first element is all possible solutions
-    :rtype: List[str]
+    :return: all possible solutions, name of the engine that solved it
+    :rtype: List[str], str
+    """
+    numeric = solve_numeric(variable, equation)
+    if numeric is not None:
+        return numeric
+    return solve_exact(variable, equation)[1], ENGINE_SYMPY
+
+
+def prepare_system(variables: List[sympy.Symbol], equations: List[str],
+                   values: Dict[str, sympy.Basic] = None) -> (List[sympy.Symbol],
+                                                              List[sympy.Basic], str):
     """
+    `prepare_equ()` for systems of equations, if no variables were given then every symbol in the
+    equations is solved for, after the session variables are put in
+
+    :param variables: the variables being solved for
+    :type variables: List[sympy.Symbol]
+    :param equations: the organized equations
+    :type equations: List[str]
+    :param values: session variables, name -> value
+    :type values: Dict[str, sympy.Basic]
+    :return: the variables, the parsed equations, cache key
+    :rtype: List[sympy.Symbol], List[sympy.Basic], str
+    """
+    parsed = [parse_equ(equation) for equation in equations]
+    if values:
+        parsed = list(substitute_equ(tuple(variables), sympy.Tuple(*parsed), values)[0])
+    if not variables:
+        variables = sorted(set().union(*[e.free_symbols for e in parsed]), key=str)
+    return variables, parsed, canonical_key(tuple(variables), sympy.Tuple(*parsed))
+
+
+def _format_solution(variables: List[sympy.Symbol], values: List[mp.mpc], digits: int) -> str:
+    return ", ".join(f"{v} = {_format_root(value, digits)}" for v, value in zip(variables, values))
+
+
+def _is_linear(variables: List[sympy.Symbol], equations: List[sympy.Basic]) -> bool:
+    if set().union(*[e.free_symbols for e in equations]) - set(variables):
+        return False
+    return all(equation.is_polynomial(*variables) and
+               sympy.Poly(equation, *variables).total_degree() <= 1 for equation in equations)
+
+
+def _float_solve(a: numpy.ndarray, b: numpy.ndarray, square: bool) -> (List[mp.mpf], str, float):
+    """
+    Solves `a x = b` with numpy, least squares if `a` isn't square
+
+    :return: the solution, name of the engine, residual
+    :rtype: List[mp.mpf], str, float
+    """
+    if square:
+        solution, engine, residual = numpy.linalg.solve(a, b), ENGINE_LINALG, 0
+    else:
+        solution = numpy.linalg.lstsq(a, b, rcond=None)[0]
+        engine, residual = ENGINE_LSTSQ, numpy.linalg.norm(a @ solution - b)
+    return [mp.mpf(float(value)) for value in solution], engine, residual
+
+
+def _mp_solve(matrix: sympy.Matrix, vector: sympy.Matrix,
+              square: bool) -> (List[mp.mpf], str, float):
+    """
+    Solves `matrix x = vector` with mpmath at the current precision, least squares if `matrix` isn't
+    square
+
+    :return: the solution, name of the engine, residual
+    :rtype: List[mp.mpf], str, float
+    """
+    a = mp.matrix([[_to_mp(c).real for c in row] for row in matrix.tolist()])
+    b = mp.matrix([_to_mp(c).real for c in vector])
+    if square:
+        return list(mp.lu_solve(a, b)), ENGINE_MP_LINALG, 0
+    solution, residual = mp.qr_solve(a, b)
+    return list(solution), ENGINE_MP_LSTSQ, residual
+
+
+def solve_linear_system(variables: List[sympy.Symbol], equations: List[sympy.Basic],
+                        digits: int = FLOAT_DIGITS) -> Union[Tuple[List[str], str], None]:
+    """
+    Solves a linear system as a matrix, with numpy for float64 precision and mpmath for more.
+    Over-determined systems get a least squares answer, with the residual if it doesn't fit exactly.
+
+    :param variables: the variables being solved for
+    :type variables: List[sympy.Symbol]
+    :param equations: the parsed equations, each equal to 0
+    :type equations: List[sympy.Basic]
+    :param digits: number of significant digits
+    :type digits: int
+    :return: the solution and the engine that solved it, None if the system isn't linear, has other
+    symbols in it, or doesn't have exactly one solution
+    :rtype: Union[Tuple[List[str], str], None]
+    """
+    if not _is_linear(variables, equations):
+        return None
+
+    matrix, vector = sympy.linear_eq_to_matrix(equations, variables)
+    try:
+        a = numpy.array(matrix.tolist(), dtype=float)
+        b = numpy.array(vector.tolist(), dtype=float).flatten()
+    except TypeError:  # complex coefficients
+        return None
+    if numpy.linalg.matrix_rank(a) < len(variables):
+        return None
+    square = len(equations) == len(variables)
+
+    with mp.workdps(digits + 10):
+        if digits <= FLOAT_DIGITS:
+            solution, engine, residual = _float_solve(a, b, square)
+        else:
+            solution, engine, residual = _mp_solve(matrix, vector, square)
+
+        answer = [_format_solution(variables, solution, digits) + "\n"]
+        if residual > 10 ** -(digits - 2) * max(1, float(numpy.abs(b).max())):
+            answer.append(f"(best fit, residual = {mp.nstr(mp.mpf(residual), 6)})\n")
+    return answer, engine
+
+
+def nsolve_system(variables: List[sympy.Symbol], equations: List[sympy.Basic],
+                  digits: int = FLOAT_DIGITS) -> Union[List[List[mp.mpc]], None]:
+    """
+    Numerically solves a small nonlinear system with `sympy.nsolve()` (multidimensional
+    `mp.findroot()`), trying every combination of `NSOLVE_STARTS` as a starting point
+
+    :param variables: the variables being solved for
+    :type variables: List[sympy.Symbol]
+    :param equations: the parsed equations, each equal to 0
+    :type equations: List[sympy.Basic]
+    :param digits: number of significant digits
+    :type digits: int
+    :return: each solution found, None if the system can't be solved this way
+    :rtype: Union[List[List[mp.mpc]], None]
+    """
+    if len(equations) != len(variables) or len(variables) > MAX_NSOLVE_VARIABLES or \
+            set().union(*[e.free_symbols for e in equations]) - set(variables):
+        return None
+
+    solutions = []
+    with mp.workdps(digits + 10):
+        for combination in itertools.product(NSOLVE_STARTS, repeat=len(variables)):
+            # nudged so no two variables start equal, symmetric starts often have singular jacobians
+            start = [value * (1 + 0.13 * i) for i, value in enumerate(combination)]
+            try:
+                solution = sympy.nsolve(equations, variables, start, prec=digits + 10)
+            except (ValueError, TypeError, ZeroDivisionError):
+                continue
+            solution = [_to_mp(value) for value in solution]
+            if not any(all(_is_duplicate(a, [b], digits) for a, b in zip(solution, other))
+                       for other in solutions):
+                solutions.append(solution)
+    return solutions or None
+
+
+def solve_system(variables: List[sympy.Symbol], equations: List[sympy.Basic],
+                 digits: int = FLOAT_DIGITS) -> (List[str], str):
+    """
+    Solves a system of equations, linear systems are solved as a matrix (see
+    `solve_linear_system()`), small nonlinear ones with `nsolve_system()`, and `sympy.solve()` is
+    only used when neither of those work
+
+    :param variables: the variables being solved for
+    :type variables: List[sympy.Symbol]
+    :param equations: the parsed equations, each equal to 0
+    :type equations: List[sympy.Basic]
+    :param digits: number of significant digits
+    :type digits: int
+    :return: all possible solutions, name of the engine that solved it
+    :rtype: List[str], str
+    """
+    linear = solve_linear_system(variables, equations, digits)
+    if linear is not None:
+        return linear
+
+    solutions = nsolve_system(variables, equations, digits)
+    if solutions is not None:
+        with mp.workdps(digits + 10):
+            return [_format_solution(variables, solution, digits) + "\n"
+                    for solution in solutions], ENGINE_NSOLVE
+
     answer = []
+    for solution in sympy.solve(equations, variables, dict=True):
+        answer.append(", ".join(f"{v} = {sympy.N(solution.get(v, v), digits)}"
+                                for v in variables) + "\n")
+    return answer, ENGINE_SYMPY
+
+
+def table_equ(variable: Union[sympy.Symbol, None], equation: str, start: float, stop: float,
+              step: float) -> (numpy.ndarray, numpy.ndarray):
+    """
+    Evaluates an expression over a range of values for its variable, the expression is compiled to
+    a numpy function once with `sympy.lambdify()` so the whole range is done in one vectorized call
+
+    :param variable: the variable to change, None if there is only one variable to pick
+    :type variable: Union[sympy.Symbol, None]
+    :param equation: the organized expression
+    :type equation: str
+    :param start: first value of the variable
+    :type start: float
+    :param stop: last value of the variable (included)
+    :type stop: float
+    :param step: how much the variable goes up by each row
+    :type step: float
+    :raises ValueError: if the range or expression can't be used to make a table
+    :return: values of the variable, values of the expression
+    :rtype: numpy.ndarray, numpy.ndarray
+    """
+    if step == 0 or (stop - start) / step < 0:
+        raise ValueError("The range has to go from the start to the stop")
+    points = math.floor((stop - start) / step + 1e-9) + 1
+    if points > MAX_TABLE_POINTS:
+        raise ValueError(f"The range has {points} points, the most is {MAX_TABLE_POINTS}")
+
+    expression = parse_equ(equation)
     if variable is None:
-        return [f"`{sympy.N(equation)}`"]
+        if len(expression.free_symbols) > 1:
+            raise ValueError("Use `-v` to say which variable to change")
+        variable = next(iter(expression.free_symbols), sympy.Symbol('x'))
+    if expression.free_symbols - {variable}:
+        raise ValueError(f"The only variable can be `{variable}`")
+
+    xs = start + step * numpy.arange(points)
+    function = sympy.lambdify(variable, expression, 'numpy')
+    with numpy.errstate(all='ignore'):  # things like log(-1) just become nan
+        ys = numpy.broadcast_to(function(xs), xs.shape)
+    if numpy.iscomplexobj(ys) and not numpy.any(ys.imag):
+        ys = ys.real
+    return xs, ys
+
+
+def format_table(variable: Union[sympy.Symbol, str], xs: numpy.ndarray, ys: numpy.ndarray,
+                 csv: bool = False) -> str:
+    """
+    Formats the output of `table_equ()` as either a lined up table or as CSV
+
+    :param variable: name of the variable
+    :type variable: Union[sympy.Symbol, str]
+    :param xs: values of the variable
+    :type xs: numpy.ndarray
+    :param ys: values of the expression
+    :type ys: numpy.ndarray
+    :param csv: whether to make it CSV
+    :type csv: bool
+    :return: the table
+    :rtype: str
+    """
+    if csv:
+        rows = [f"{variable},value"]
+        rows += [f"{x:.15g},{y:.15g}" for x, y in zip(xs.tolist(), ys.tolist())]
     else:
-        solved_answer = sympy.solve(equation, variable, dict=True)
-    for ans in solved_answer:
-        answer.append(f"{variable} = {sympy.N(list(ans.values())[0])}\n")
-    return answer
+        rows = [f"{str(variable):>12} | value"]
+        rows += [f"{x:>12.6g} | {y:.10g}" for x, y in zip(xs.tolist(), ys.tolist())]
+    return "\n".join(rows) + "\n"
+
+
+def tabulate_equ(variable: Union[sympy.Symbol, None], equation: str, start: float, stop: float,
+                 step: float, max_length: int = None) -> (str, bool):
+    """
+    Makes the table with `table_equ()` and formats it, short tables are lined up to go in a message
+    and long ones are made into CSV to be sent as a file. A table is long if it has more than
+    `TABLE_ROWS` rows or the lined up table has more than `max_length` characters.
+
+    :param variable: the variable to change, None if there is only one variable to pick
+    :type variable: Union[sympy.Symbol, None]
+    :param equation: the organized expression
+    :type equation: str
+    :param start: first value of the variable
+    :type start: float
+    :param stop: last value of the variable (included)
+    :type stop: float
+    :param step: how much the variable goes up by each row
+    :type step: float
+    :param max_length: most characters the lined up table can have, None for no limit
+    :type max_length: int
+    :return: the table, whether it is CSV
+    :rtype: str, bool
+    """
+    xs, ys = table_equ(variable, equation, start, stop, step)
+    if len(xs) <= TABLE_ROWS:
+        text = format_table(variable or "x", xs, ys)
+        if max_length is None or len(text) <= max_length:
+            return text, False
+    return format_table(variable or "x", xs, ys, csv=True), True
 
 
 def math_main(user_input: List[str]) -> (List[str], str):
@@ -80,6 +1043,6 @@ def math_main(user_input: List[str]) -> (List[str], str):
     :rtype: List[str], str
     """
     variable, equation, copy = organize(user_input)
-    simplified_equ = parse_equ(equation)
-    answers = solve_equ(variable, simplified_equ)
+    simplified_equ = parse_equ(equation, check_cost(variable, equation))
+    answers, _ = solve_equ(variable, simplified_equ)
     return answers, copy
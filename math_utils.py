@@ -0,0 +1,567 @@
+"""
+this file contains the logic that runs the math solver for the bot, the actual math lives in
+`math_equ`, this just makes sure it never runs on the event loop and that answers get reused
+"""
+import asyncio
+import io
+import re
+from typing import AsyncIterator, Dict, List, Union
+
+import discord
+import sympy
+
+from classes.math_cache import MathCache
+from classes.math_pool import MathPool, WorkerTimeout
+from classes.math_session import MathSession, SessionStore
+from extras import SYSTEM_CONFIG, Colors
+import math_equ
+
+MATH_POOL = MathPool(workers=SYSTEM_CONFIG['math workers'], timeout=SYSTEM_CONFIG['math timeout'])
+MATH_CACHE = MathCache(size=SYSTEM_CONFIG['math cache size'],
+                       path='cache/math' if SYSTEM_CONFIG['math disk cache'] else None,
+                       version=2)  # answers are (answers, engine), version 1 was just the answers
+REFINE_TIMEOUT = SYSTEM_CONFIG['math refine timeout']
+MAX_MESSAGE = 2000  # Discord's limit for one message
+CACHE_WRITE_INTERVAL = 30  # seconds between writing new answers to the disk cache
+NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")  # anything in an equation that could be a variable
+SESSIONS = SessionStore(max_sessions=SYSTEM_CONFIG['math sessions'],
+                        ttl=SYSTEM_CONFIG['math session ttl'],
+                        max_bytes=SYSTEM_CONFIG['math session bytes'])
+
+
+async def solve(user_args: List[str], session: MathSession = None) -> (List[str], str, str):
+    """
+    Organizes the equation and checks that it is worth trying, then parses it in the worker pool and
+    checks the cache, if it isn't cached then it gets solved in the worker pool and cached. This
+    only gives the final answer, see `solve_progressive()` for one that gives answers as it goes.
+
+    :param user_args: args that the user passed in
+    :type user_args: List[str]
+    :param session: the user's session, for variables and parsed equations
+    :type session: MathSession
+    :raises math_equ.ComplexityError: if the equation is too expensive to try
+    :raises classes.math_pool.WorkerTimeout: if a step took longer than the pool's timeout
+    :return: list of answers, original equation, name of the engine that solved it
+    :rtype: List[str], str, str
+    """
+    user_args = list(user_args)
+    if math_equ.is_system(user_args):
+        return await solve_system(user_args, session)
+    if session is not None and math_equ.split_assignment(user_args) is not None:
+        return await assign(user_args, session)
+    digits = pop_digits(user_args)
+    variable, equation, copy = math_equ.organize(user_args)
+    exact = math_equ.check_cost(variable, equation)  # cheap enough for the event loop
+    parsed, key = await prepare(variable, equation, exact, session)
+
+    if not exact:
+        answers, engine = await _cached_run(f"{key}:{digits}", math_equ.approximate_equ, equation,
+                                            used_values(variable, equation, session), digits)
+        return answers, copy, engine
+
+    solved = await _cached_run(f"{key}:{digits}", math_equ.solve_numeric, variable, parsed, digits)
+    if solved is None:
+        _, answers = await _cached_run(f"{key}:exact:{digits}", math_equ.solve_exact, variable,
+                                       parsed, digits)
+        solved = answers, math_equ.ENGINE_SYMPY
+    answers, engine = solved
+    return answers, copy, engine
+
+
+async def solve_system(user_args: List[str],
+                       session: MathSession = None) -> (List[str], str, str):
+    """
+    Solves a system of equations (more than one equation or `-v`) in the worker pool, every equation
+    has to pass `math_equ.check_cost()` first
+
+    :param user_args: args that the user passed in
+    :type user_args: List[str]
+    :param session: the user's session, its variables are put into the equations
+    :type session: MathSession
+    :raises math_equ.ComplexityError: if one of the equations is too expensive to try
+    :raises classes.math_pool.WorkerTimeout: if a step took longer than the pool's timeout
+    :return: list of answers, original equations, name of the engine that solved it
+    :rtype: List[str], str, str
+    """
+    user_args = list(user_args)
+    digits = pop_digits(user_args)
+    variables, equations, copy = math_equ.organize_system(user_args)
+    for equation in equations:
+        if not math_equ.check_cost(variables[0] if variables else None, equation):
+            raise math_equ.ComplexityError("The numbers are too big to solve a system with")
+
+    variables, parsed, key = await MATH_POOL.run(math_equ.prepare_system, variables, equations,
+                                                 session.variables if session else None)
+    answers, engine = await _cached_run(f"{key}:{digits}", math_equ.solve_system, variables,
+                                        parsed, digits)
+    return answers, copy, engine
+
+
+async def solve_batch(batch: List[List[str]], session: MathSession = None) -> discord.Embed:
+    """
+    Solves all of the equations at the same time, spread across the worker pool, and puts all of the
+    answers into one embed. If one of the equations fails the others still get answered.
+
+    Variables are saved first, in order, so `k = 2; 3k` works.
+
+    :param batch: the args for each equation, from `math_equ.split_batch()`
+    :type batch: List[List[str]]
+    :param session: the user's session, for variables and parsed equations
+    :type session: MathSession
+    :return: the embed with all of the answers
+    :rtype: discord.Embed
+    """
+    results = await _assign_batch(batch, session) if session is not None else {}
+    remaining = [i for i in range(len(batch)) if i not in results]
+    solved = await asyncio.gather(*[solve(batch[i], session) for i in remaining],
+                                  return_exceptions=True)
+    results.update(zip(remaining, solved))
+
+    embed = discord.Embed(title=f"Solved {len(batch)} equations", color=Colors.purple)
+    for i, user_args in enumerate(batch):
+        name, value = _batch_field(user_args, results[i])
+        embed.add_field(name=f"`{name[:250]}`", value=value, inline=False)
+    return embed
+
+
+async def _assign_batch(batch: List[List[str]],
+                        session: MathSession) -> Dict[int, Union[tuple, Exception]]:
+    """
+    Saves the variables in the batch, in order
+
+    :return: index in the batch -> what `assign()` returned or raised, for the ones that save a
+    variable
+    :rtype: Dict[int, Union[tuple, Exception]]
+    """
+    results = {}
+    for i, user_args in enumerate(batch):
+        try:
+            if math_equ.split_assignment(user_args) is not None:
+                results[i] = await assign(user_args, session)
+        except Exception as e:
+            results[i] = e
+    return results
+
+
+def _batch_field(user_args: List[str], result: Union[tuple, Exception]) -> (str, str):
+    """
+    The name and value of the field for one equation in `solve_batch()`
+
+    :param user_args: the equation's args
+    :type user_args: List[str]
+    :param result: what `solve()` returned or raised
+    :type result: Union[tuple, Exception]
+    :return: name, value
+    :rtype: str, str
+    """
+    if isinstance(result, math_equ.ComplexityError):
+        name, value = " ".join(user_args), f"Complexity Error: {result}"
+    elif isinstance(result, WorkerTimeout):
+        name, value = " ".join(user_args), f"Complexity Error: gave up after " \
+                                           f"{MATH_POOL.timeout} seconds"
+    elif isinstance(result, Exception):
+        name, value = " ".join(user_args), f"Well, You did something wrong\n`{result}`"
+    else:
+        answers, equation, engine = result
+        name, value = equation, f"```\n{''.join(answers)}\n```Solved with {engine}"
+    if len(value) > 1024:  # max length of a field
+        value = value[:1000] + "\n...```"
+    return name, value
+
+
+async def table(user_args: List[str]) -> (str, Union[discord.File, None]):
+    """
+    Makes a table of the values of an expression over a range, in the worker pool. Short tables come
+    back as a message and ones with too many rows or too many characters for one message as a CSV
+    file.
+
+    :param user_args: args that the user passed in
+    :type user_args: List[str]
+    :raises ValueError: if `-r` is missing or the expression is an equation
+    :raises math_equ.ComplexityError: if the expression is too expensive to try
+    :raises classes.math_pool.WorkerTimeout: if it took longer than the pool's timeout
+    :return: content of the message, CSV file (None if it fits in the message)
+    :rtype: str, Union[discord.File, None]
+    """
+    user_args = list(user_args)
+    table_range = pop_flag(user_args, '-r', count=3)
+    if table_range is None:
+        raise ValueError("Use `-r <start> <stop> <step>` to give the range")
+    start, stop, step = [float(value) for value in table_range]
+
+    variable, equation, copy = math_equ.organize(user_args)
+    if '=' in copy:
+        raise ValueError("Tables only work with expressions, not equations")
+    math_equ.check_cost(variable, equation)
+
+    room = MAX_MESSAGE - len(f"`{copy}`\n```\n```")  # what is left for the table in the message
+    text, csv = await MATH_POOL.run(math_equ.tabulate_equ, variable, equation, start, stop, step,
+                                    room)
+    if csv:
+        return (f"`{copy}` from {start:g} to {stop:g} by {step:g}",
+                discord.File(io.BytesIO(text.encode()), filename="table.csv"))
+    return f"`{copy}`\n```\n{text}```", None
+
+
+async def prepare(variable: Union[sympy.Symbol, None], equation: str, exact: bool,
+                  session: MathSession = None) -> (Union[sympy.Basic, None], str):
+    """
+    `math_equ.prepare_equ()` that reuses the equations the user has already had parsed, and then
+    puts their session variables in
+
+    :param variable: the variable being solved for, None if it is an expression
+    :type variable: Union[sympy.Symbol, None]
+    :param equation: the organized equation
+    :type equation: str
+    :param exact: from `math_equ.check_cost()`
+    :type exact: bool
+    :param session: the user's session
+    :type session: MathSession
+    :return: the parsed equation (None if not `exact`), cache key
+    :rtype: Union[sympy.Basic, None], str
+    """
+    if not exact:  # the variables are put in while it is approximated
+        return await MATH_POOL.run(math_equ.prepare_equ, variable, equation, exact,
+                                   used_values(variable, equation, session))
+    if session is None:
+        return await MATH_POOL.run(math_equ.prepare_equ, variable, equation, exact)
+
+    prepared = session.get_parsed((str(variable), equation))
+    if prepared is None:
+        prepared = await MATH_POOL.run(math_equ.prepare_equ, variable, equation, exact)
+        session.add_parsed((str(variable), equation), prepared)
+
+    parsed, key = prepared
+    used = {str(symbol) for symbol in getattr(parsed, 'free_symbols', ())} - {str(variable)}
+    values = {name: value for name, value in session.variables.items() if name in used}
+    if not values:
+        return parsed, key
+    return await MATH_POOL.run(math_equ.substitute_equ, variable, parsed, values)
+
+
+def used_values(variable: Union[sympy.Symbol, None], equation: str,
+                session: Union[MathSession, None]) -> Dict[str, sympy.Basic]:
+    """
+    The user's session variables that are in an organized equation, for equations that are too big
+    to parse exactly and so don't have `free_symbols` to look at
+
+    :param variable: the variable being solved for, it is never replaced
+    :type variable: Union[sympy.Symbol, None]
+    :param equation: the organized equation
+    :type equation: str
+    :param session: the user's session
+    :type session: Union[MathSession, None]
+    :return: name -> value
+    :rtype: Dict[str, sympy.Basic]
+    """
+    if session is None:
+        return {}
+    names = set(NAME.findall(equation)) - {str(variable)}
+    return {name: value for name, value in session.variables.items() if name in names}
+
+
+async def assign(user_args: List[str], session: MathSession) -> (List[str], str, str):
+    """
+    Saves a variable to the user's session, e.g. `k = 3.2`, the value is worked out in the worker
+    pool and can use their other variables
+
+    :param user_args: args that the user passed in
+    :type user_args: List[str]
+    :param session: the user's session
+    :type session: MathSession
+    :raises math_equ.ComplexityError: if the value is too expensive to work out exactly
+    :raises classes.math_session.SessionFull: if there isn't room for it
+    :return: the saved value, original assignment, where it was saved
+    :rtype: List[str], str, str
+    """
+    name, value, copy = math_equ.split_assignment(user_args)
+    if not math_equ.check_cost(None, value):
+        raise math_equ.ComplexityError(f"`{name}` is too big to save")
+    value, shown = await MATH_POOL.run(math_equ.assign_equ, value, session.variables)
+    session.set_variable(name, value)
+    return [f"`{name} = {shown}`"], copy, "your session"
+
+
+def pop_digits(user_args: List[str]) -> int:
+    """
+    Takes the `-d` flag out of the args
+
+    :param user_args: args that the user passed in, this gets changed
+    :type user_args: List[str]
+    :raises ValueError: if the number of digits isn't allowed
+    :return: the number of digits asked for, `math_equ.FLOAT_DIGITS` if it wasn't given
+    :rtype: int
+    """
+    digits = int((pop_flag(user_args, '-d') or [math_equ.FLOAT_DIGITS])[0])
+    if not 1 <= digits <= math_equ.MAX_DIGITS:
+        raise ValueError(f"`-d` must be between 1 and {math_equ.MAX_DIGITS}")
+    return digits
+
+
+def pop_flag(user_args: List[str], flag: str, count: int = 1) -> Union[List[str], None]:
+    """
+    Takes a flag and the values after it out of the args
+
+    :param user_args: args that the user passed in, this gets changed
+    :type user_args: List[str]
+    :param flag: the flag, e.g. '-d'
+    :type flag: str
+    :param count: how many values come after the flag
+    :type count: int
+    :raises ValueError: if the flag doesn't have enough values after it
+    :return: the values of the flag, None if the flag isn't there
+    :rtype: Union[List[str], None]
+    """
+    if flag not in user_args:
+        return None
+    index = user_args.index(flag)
+    if index + count >= len(user_args):
+        raise ValueError(f"`{flag}` needs {count} value(s) after it")
+    values = user_args[index + 1:index + 1 + count]
+    del user_args[index:index + 1 + count]
+    return values
+
+
+async def _cached_run(key: str, func, *args, timeout: float = None):
+    """
+    Runs `func(*args)` in the worker pool unless its result is already cached under `key`, None
+    results aren't cached. Every function cached here returns a pair, so anything else that comes
+    out of the cache is treated as a miss.
+
+    :param key: cache key for the result
+    :type key: str
+    :param func: function to run in the worker pool
+    :type func: Callable
+    :param timeout: seconds the job is allowed to take, defaults to the pool's timeout
+    :type timeout: float
+    :return: what `func` returns
+    :rtype: Any
+    """
+    result = MATH_CACHE.get(key)
+    if not (isinstance(result, tuple) and len(result) == 2):  # a miss, or left by an old format
+        result = await MATH_POOL.run(func, *args, timeout=timeout)
+        if result is not None:
+            MATH_CACHE.put(key, result)
+    return result
+
+
+def math_embed(equation: str, answers: List[str], footer: str,
+               exact: List[str] = None) -> discord.Embed:
+    """
+    Makes the embed for an answer
+
+    :param equation: the equation as the user wrote it
+    :type equation: str
+    :param answers: the (numeric) answers
+    :type answers: List[str]
+    :param footer: text for the footer, what solved it and how precise it is
+    :type footer: str
+    :param exact: the exact answers, if there are any
+    :type exact: List[str]
+    :return: the embed
+    :rtype: discord.Embed
+    """
+    embed = discord.Embed(
+        title=f"`{equation}`",
+        color=Colors.purple,
+        description=f"```\n{''.join(answers)}\n```"
+    )
+    if exact:
+        embed.add_field(name="Exact", value=f"```\n{''.join(exact)}\n```", inline=False)
+    embed.set_footer(text=footer)
+    return embed
+
+
+async def _solve_once(user_args: List[str], session: Union[MathSession, None]) -> discord.Embed:
+    """
+    Systems and saving variables aren't done in stages, this gives the one embed for them
+
+    :param user_args: args that the user passed in
+    :type user_args: List[str]
+    :param session: the user's session
+    :type session: Union[MathSession, None]
+    :return: the embed
+    :rtype: discord.Embed
+    """
+    if math_equ.is_system(user_args):  # systems are only solved once, to the digits asked for
+        answers, copy, engine = await solve_system(user_args, session)
+        return math_embed(copy, answers, f"Solved with {engine}")
+    answers, copy, _ = await assign(user_args, session)
+    return math_embed(copy, answers, f"Saved for {SESSIONS.ttl // 60:g} minutes after you last use "
+                                     f"-math")
+
+
+async def _exact_stage(key: str, variable: Union[sympy.Symbol, None], parsed: sympy.Basic,
+                       digits: int, answers: Union[List[str], None],
+                       footer: Union[str, None]) -> (Union[List[str], None], List[str], str):
+    """
+    Stage 3 of `solve_progressive()`, gets the exact answers from sympy. If there weren't numeric
+    answers then sympy's are used instead and it gets the full timeout, otherwise it only gets
+    `REFINE_TIMEOUT` seconds.
+
+    :param answers: the numeric answers so far, None if there aren't any
+    :type answers: Union[List[str], None]
+    :param footer: the footer so far
+    :type footer: Union[str, None]
+    :raises Exception: whatever sympy raised, if there weren't numeric answers to fall back on
+    :return: the exact answers (None if sympy didn't find any), numeric answers, footer
+    :rtype: Union[List[str], None], List[str], str
+    """
+    try:
+        exact_answers, exact_numeric = await _cached_run(
+            f"{key}:exact:{digits}", math_equ.solve_exact, variable, parsed, digits,
+            timeout=REFINE_TIMEOUT if answers is not None else None)
+    except Exception:  # sympy either ran out of time or doesn't know how to solve it
+        if answers is None:
+            raise
+        return None, answers, footer + ", no exact form found"
+
+    if answers is None:
+        answers = exact_numeric
+        footer = f"Solved with {math_equ.ENGINE_SYMPY} to {digits} digits"
+    return exact_answers, answers, footer + f", exact form from {math_equ.ENGINE_SYMPY}"
+
+
+async def solve_progressive(user_args: List[str],
+                            session: MathSession = None) -> AsyncIterator[discord.Embed]:
+    """
+    Solves the equation in stages and yields a better embed after each one, so the first answer can
+    be sent right away and then edited
+
+    1. float64 precision numeric answer
+    2. the number of digits asked for with `-d`, using mpmath
+    3. exact answers from sympy
+
+    Stages 2 and 3 only get `REFINE_TIMEOUT` seconds, if they run out of time then the last answer
+    just stays. If stage 1 can't be done numerically then stage 3 is the first answer.
+
+    :param user_args: args that the user passed in
+    :type user_args: List[str]
+    :param session: the user's session, for variables and parsed equations
+    :type session: MathSession
+    :raises math_equ.ComplexityError: if the equation is too expensive to try
+    :raises classes.math_pool.WorkerTimeout: if no answer could be found in time
+    :return: embeds, each one better than the last
+    :rtype: AsyncIterator[discord.Embed]
+    """
+    user_args = list(user_args)
+    if math_equ.is_system(user_args) or \
+            (session is not None and math_equ.split_assignment(user_args) is not None):
+        yield await _solve_once(user_args, session)
+        return
+    digits = pop_digits(user_args)
+
+    variable, equation, copy = math_equ.organize(user_args)
+    exact = math_equ.check_cost(variable, equation)
+    parsed, key = await prepare(variable, equation, exact, session)
+
+    answers, footer = None, None
+    quick_digits = min(digits, math_equ.FLOAT_DIGITS)
+    if exact:
+        numeric, numeric_args = math_equ.solve_numeric, (variable, parsed)
+    else:
+        values = used_values(variable, equation, session)
+        numeric, numeric_args = math_equ.approximate_equ, (equation, values)
+
+    quick = await _cached_run(f"{key}:{quick_digits}", numeric, *numeric_args, quick_digits)
+    if quick is not None:
+        answers, engine = quick
+        footer = f"Solved with {engine} to {quick_digits} digits"
+        yield math_embed(copy, answers, footer + ", refining...")
+
+        if digits > quick_digits:
+            try:
+                answers, engine = await _cached_run(f"{key}:{digits}", numeric, *numeric_args,
+                                                    digits, timeout=REFINE_TIMEOUT)
+                footer = f"Solved with {engine} to {digits} digits"
+                yield math_embed(copy, answers, footer + ", refining...")
+            except WorkerTimeout:
+                footer += f", ran out of time for {digits} digits"
+
+    exact_answers = None
+    if exact:
+        exact_answers, answers, footer = await _exact_stage(key, variable, parsed, digits, answers,
+                                                            footer)
+
+    if answers is None:
+        raise WorkerTimeout("Couldn't find an answer")
+    yield math_embed(copy, answers, footer, exact_answers)
+
+
+async def stats(ctx) -> None:
+    """
+    Sends the worker pool and cache counters, for devs
+
+    :param ctx: context object for the message
+    :type ctx: Object
+    """
+    embed = discord.Embed(title="Math Stats", color=Colors.purple)
+    embed.add_field(name="Pool", value=f"Workers: {MATH_POOL.workers}\n"
+                                       f"Completed: {MATH_POOL.completed}\n"
+                                       f"Timeouts: {MATH_POOL.timeouts}\n"
+                                       f"Respawns: {MATH_POOL.respawns}")
+    embed.add_field(name="Cache", value="\n".join(f"{name.capitalize()}: {value}"
+                                                  for name, value in MATH_CACHE.stats.items()))
+    embed.add_field(name="Sessions", value="\n".join(f"{name.capitalize()}: {value}"
+                                                     for name, value in SESSIONS.stats.items()))
+    await ctx.channel.send(content=None, embed=embed)
+
+
+async def expire_sessions(bot) -> None:
+    """
+    Drops idle sessions every so often, so users who stop using -math don't keep their memory
+    This loops for the rest of time
+
+    :param bot: connection to discord
+    :type bot: Object
+    """
+    await bot.wait_until_ready()
+    while not bot.is_closed():
+        SESSIONS.expire()
+        await asyncio.sleep(max(SESSIONS.ttl / 4, 1))
+
+
+async def write_cache(bot) -> None:
+    """
+    Writes the answers cached since last time to disk every so often, in an executor so the event
+    loop never waits on the disk, and once more when the bot stops
+    This loops for the rest of time
+
+    :param bot: connection to discord
+    :type bot: Object
+    """
+    await bot.wait_until_ready()
+    try:
+        while not bot.is_closed():
+            await asyncio.sleep(CACHE_WRITE_INTERVAL)
+            await bot.loop.run_in_executor(None, MATH_CACHE.write, MATH_CACHE.take_pending())
+    finally:
+        MATH_CACHE.close()  # writes whatever is left
+
+
+async def variables(ctx, user_args: List[str]) -> None:
+    """
+    Sends the variables in the user's session, or clears them with `-vars clear`
+
+    :param ctx: context object for the message
+    :type ctx: Object
+    :param user_args: args that the user passed in
+    :type user_args: List[str]
+    """
+    session = SESSIONS.get(ctx.author.id, create=False)
+    if user_args and user_args[0].lower() == 'clear':
+        if session is not None:
+            session.clear()
+        await ctx.channel.send("Your variables have been cleared")
+        return
+
+    if session is None or not session.variables:
+        await ctx.channel.send("You don't have any variables, save one with `-math k = 3.2`")
+        return
+    embed = discord.Embed(title="Your Variables", color=Colors.purple,
+                          description="```\n" + "\n".join(
+                              f"{name} = {value}" for name, value in session.variables.items())
+                          + "\n```")
+    embed.set_footer(text=f"Using {session.size}/{session.max_bytes} bytes, "
+                          f"{session.parsed_count} equations remembered")
+    await ctx.channel.send(content=None, embed=embed)
@@ -0,0 +1,68 @@
+import sys
+import os.path
+import datetime
+
+import pytz
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.alarms import AlarmBook
+
+EASTERN = pytz.timezone('America/New_York')
+
+
+def eastern(*args) -> datetime.datetime:
+    return EASTERN.localize(datetime.datetime(*args))
+
+
+def test_load(tmp_path):
+    """
+    Tests `AlarmBook.load()` gets back the alarms that were added and not removed, even when the
+    last line of the journal was only half written, and that the journal gets compacted
+    """
+    path = str(tmp_path / 'alarms.jsonl')
+    book = AlarmBook(path, 'America/New_York')
+    first = book.add(1, eastern(2020, 6, 1, 9, 0), "Meeting", "<@2>", 2, "Max")
+    second = book.add(1, eastern(2020, 6, 1, 8, 0), "Build", "", 3, "Brendan", repeat='daily')
+    book.add(4, eastern(2020, 6, 2, 8, 0), "Elsewhere", "", 3, "Brendan")
+    assert book.remove(first.id) is first and book.remove(first.id) is None
+    with open(path, 'a') as file:
+        file.write('{"op": "set", "ala')
+
+    restarted = AlarmBook(path, 'America/New_York')
+    assert len(restarted) == 2
+    assert [alarm.message for alarm in restarted.in_channel(1)] == ["Build"]
+    assert restarted.get(second.id).when == eastern(2020, 6, 1, 8, 0)
+    assert restarted.add(1, eastern(2020, 6, 3), "", "", 2, "Max").id == 4
+    with open(path) as file:
+        assert len(file.readlines()) == 3  # the removed one and the broken line are gone
+
+
+def test_rang():
+    """
+    Tests `AlarmBook.rang()` removes alarms that don't repeat, and moves ones that do to the same
+    time on the next day they ring, across daylight saving time and skipping ones that were missed
+    """
+    book = AlarmBook(None, 'America/New_York')
+    once = book.add(1, eastern(2020, 3, 7, 9, 0), "", "", 2, "Max")
+    daily = book.add(1, eastern(2020, 3, 7, 9, 0), "", "", 2, "Max", repeat='daily')
+    weekly = book.add(1, eastern(2020, 3, 2, 9, 0), "", "", 2, "Max", repeat='weekly')
+
+    now = eastern(2020, 3, 7, 9, 0, 1)
+    assert book.rang(once.id, now) is None and book.get(once.id) is None
+    assert book.rang(daily.id, now).when == eastern(2020, 3, 8, 9, 0)  # UTC-4 now, not UTC-5
+    assert book.rang(weekly.id, eastern(2020, 3, 20)).when == eastern(2020, 3, 23, 9, 0)
+
+
+def test_resolve():
+    """
+    Tests `AlarmBook.resolve()` is today if the time hasn't passed yet, otherwise tomorrow, and
+    uses the day if there is one
+    """
+    book = AlarmBook(None, 'America/New_York')
+    now = eastern(2020, 12, 31, 12, 0)
+    assert book.resolve(datetime.time(13, 0), now=now) == eastern(2020, 12, 31, 13, 0)
+    assert book.resolve(datetime.time(11, 0), now=now) == eastern(2021, 1, 1, 11, 0)
+    assert book.resolve(datetime.time(11, 0), datetime.date(2021, 2, 1)) == \
+        eastern(2021, 2, 1, 11, 0)
@@ -0,0 +1,54 @@
+import sys
+import os.path
+import datetime
+
+import pytz
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.announcement_schedule import AnnouncementSchedule
+
+EASTERN = pytz.timezone('America/New_York')
+
+
+def eastern(*args) -> datetime.datetime:
+    return EASTERN.localize(datetime.datetime(*args))
+
+
+def test_next_deadline():
+    """
+    Tests `AnnouncementSchedule.next_deadline()` is at the right time in the timezone across
+    daylight saving time, uses the channel's own time, and still sends ones that were missed less
+    than `grace` ago
+    """
+    schedule = AnnouncementSchedule(None, 'America/New_York', '09:30', {'2': '18:00'}, grace=3600)
+
+    # daylight saving time starts on 2020-03-08, the UTC offset goes from -5 to -4
+    deadline = schedule.next_deadline(1, eastern(2020, 3, 7, 12, 0))
+    assert deadline == eastern(2020, 3, 8, 9, 30)
+    assert deadline.astimezone(pytz.utc).hour == 13
+    assert schedule.next_deadline(1, eastern(2020, 3, 6, 12, 0)).astimezone(pytz.utc).hour == 14
+
+    assert schedule.next_deadline(2, eastern(2020, 3, 7, 12, 0)) == eastern(2020, 3, 7, 18, 0)
+    assert schedule.next_deadline(1, eastern(2020, 3, 7, 10, 0)) == eastern(2020, 3, 7, 9, 30)
+    assert schedule.next_deadline(1, eastern(2020, 3, 7, 11, 0)) == eastern(2020, 3, 8, 9, 30)
+
+    deadlines = schedule.deadlines([1, 2, 3], eastern(2020, 3, 7, 8, 0))
+    assert deadlines == {eastern(2020, 3, 7, 9, 30): [1, 3], eastern(2020, 3, 7, 18, 0): [2]}
+
+
+def test_announced(tmp_path):
+    """
+    Tests `AnnouncementSchedule.announced()` is saved, so after a restart a channel doesn't get the
+    same day's announcement again
+    """
+    path = str(tmp_path / 'announcements.json')
+    schedule = AnnouncementSchedule(path, 'America/New_York', '09:30')
+    now = eastern(2020, 6, 1, 9, 45)
+    assert schedule.next_deadline(1, now) == eastern(2020, 6, 1, 9, 30)
+
+    schedule.announced([1], schedule.local_day(eastern(2020, 6, 1, 9, 30)))
+    restarted = AnnouncementSchedule(path, 'America/New_York', '09:30')
+    assert restarted.next_deadline(1, now) == eastern(2020, 6, 2, 9, 30)
+    assert restarted.next_deadline(2, now) == eastern(2020, 6, 1, 9, 30)
@@ -0,0 +1,88 @@
+import sys
+import os.path
+import asyncio
+import time
+
+import pytest
+
+discord = pytest.importorskip("discord")
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.announcer import Announcer, RateLimiter
+
+
+class FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "Fake"
+
+
+class FakeChannel:
+    def __init__(self, failures: list = ()):
+        """
+        Takes 0.05s to send, and fails with each status in `failures` first
+        """
+        self.failures = list(failures)
+        self.sent = []
+
+    async def send(self, **message):
+        await asyncio.sleep(0.05)
+        if self.failures:
+            status = self.failures.pop(0)
+            error = discord.Forbidden if status == 403 else discord.HTTPException
+            raise error(FakeResponse(status), "Failing on purpose")
+        self.sent.append(message)
+
+
+class FakeBot:
+    def __init__(self, channels: dict):
+        self.channels = channels
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+
+def test_announce():
+    """
+    Tests `Announcer.announce()` with 30 channels, one that was deleted, one the bot can't talk in
+    and one that fails once with a 503. They are all sent at once, and the broken ones don't stop
+    the others
+    """
+    channels = {channel_id: FakeChannel() for channel_id in range(30)}
+    channels[1] = FakeChannel([403])
+    channels[2] = FakeChannel([503])
+    del channels[0]
+
+    async def run():
+        announcer = Announcer(concurrency=30, backoff=0.01)
+        start = time.monotonic()
+        report = await announcer.announce(FakeBot(channels), range(30), content="Hi")
+        assert time.monotonic() - start < 0.5  # not 30 * 0.05s one after another
+        return report
+
+    report = asyncio.run(run())
+    assert sorted(report.failed) == [0, 1]
+    assert report.failed[0] == "channel not found" and report.failed[1].startswith("403")
+    assert len(report.delivered) == 28 and report.retries == 1
+    assert channels[2].sent == [{'content': "Hi"}]
+    assert "28/30" in str(report)
+
+
+def test_rate_limiter():
+    """
+    Tests `RateLimiter.acquire()` lets `rate` requests through right away and then makes the next
+    one wait, on each route separately
+    """
+    async def run():
+        limiter = RateLimiter(5, 0.5)
+        start = time.monotonic()
+        for _ in range(5):
+            await limiter.acquire("a")
+        await limiter.acquire("b")
+        assert time.monotonic() - start < 0.05
+        await limiter.acquire("a")
+        assert time.monotonic() - start >= 0.09  # one token takes 0.1s to come back
+
+    asyncio.run(run())
@@ -0,0 +1,80 @@
+import sys
+import os.path
+import datetime
+import random
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.event_batch import EventBatch
+from classes.event_index import EventIndex
+from classes.gcal_event import Event
+
+DAY = datetime.datetime(2020, 1, 10)
+EDT = datetime.timezone(datetime.timedelta(hours=-4))
+
+
+def _events(count: int) -> list:
+    """
+    Random all day events (some a few days long) and timed events in EDT, from before `DAY` to a
+    month after it
+    """
+    rand = random.Random(5587)
+    events = []
+    for i in range(count):
+        start = DAY + datetime.timedelta(days=rand.randrange(-5, 30))
+        if rand.random() < 0.3:
+            end = start + datetime.timedelta(days=rand.choice((1, 1, 3)))
+            events.append(Event(f"Calendar {i % 3}", f"All day {i}", start, end))
+        else:
+            start = start.replace(hour=rand.randrange(0, 24), minute=rand.choice((0, 30)),
+                                  tzinfo=EDT)
+            end = start + datetime.timedelta(minutes=rand.choice((30, 90, 300)))
+            events.append(Event(f"Calendar {i % 3}", f"Timed {i}", start, end, has_time=True,
+                                description=rand.choice(("", "Bring snacks"))))
+    return events
+
+
+def test_overlapping():
+    """
+    Tests `EventBatch.overlapping()` with an event that started before the range and is still
+    going, one that ended right before it, and only some of the calendars
+    """
+    competition = Event("Build", "Competition", DAY - datetime.timedelta(days=3),
+                        DAY + datetime.timedelta(days=2))
+    ended = Event("Build", "Ended", DAY - datetime.timedelta(days=2), DAY)
+    meeting = Event("Outreach", "Meeting", DAY.replace(hour=18, tzinfo=EDT),
+                    DAY.replace(hour=19, tzinfo=EDT), has_time=True)
+    batch = EventBatch([competition, ended, meeting])
+    assert batch.calendar_names == ["Build", "Outreach"] and batch.nbytes > 0
+
+    week = DAY.date(), DAY.date() + datetime.timedelta(days=7)
+    assert batch.overlapping(*week).tolist() == [0, 2]
+    assert batch.overlapping(*week, calendars=["Outreach", "Nope"]).tolist() == [2]
+    # the meeting ends at 23:00 UTC
+    assert batch.overlapping(*week, after=DAY.replace(hour=23)).tolist() == [0]
+
+
+def test_days():
+    """
+    Tests `EventBatch.days()` groups and sorts events the same way that `EventIndex.days()` does,
+    with and without leaving out events that already ended
+    """
+    events = _events(500)
+    batch = EventBatch(events)
+    index = EventIndex(enumerate(events))
+    start, end = DAY.date(), DAY.date() + datetime.timedelta(days=14)
+    now = DAY + datetime.timedelta(hours=20)
+
+    def ends_after(event: Event) -> bool:
+        event_end = event.end
+        if event_end.tzinfo is not None:
+            event_end = event_end.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return event_end > now
+
+    for after, keep in ((None, None), (now, ends_after)):
+        expected = index.days(start, end, keep=keep)
+        days = batch.days(start, end, after=after)
+        assert days == expected  # the same events, in the same order
+
+    assert [day[0].title for day in EventBatch().days(start, start)] == ["No Events"]
@@ -0,0 +1,70 @@
+import sys
+import os.path
+import datetime
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.event_index import EventIndex
+from classes.gcal_event import Event
+
+DAY = datetime.datetime(2020, 1, 10)
+
+
+def _event(title: str, start_day: int, days: int = 1, hour: int = None) -> Event:
+    if hour is None:  # all day, the end is the start of the day after
+        start = DAY + datetime.timedelta(days=start_day)
+        return Event("Team", title, start, start + datetime.timedelta(days=days))
+    start = DAY + datetime.timedelta(days=start_day, hours=hour)
+    return Event("Team", title, start, start + datetime.timedelta(hours=1), has_time=True)
+
+
+def test_overlapping():
+    """
+    Tests `EventIndex.overlapping()` with an event that started before the range and is still going,
+    one that ended right before it, and one after it
+    """
+    index = EventIndex([("competition", _event("Competition", -3, days=5)),
+                        ("ended", _event("Ended", -2, days=2)),
+                        ("meeting", _event("Meeting", 1, hour=18)),
+                        ("later", _event("Later", 30))])
+    assert [e.title for e in index.overlapping(DAY.date(), DAY.date() + datetime.timedelta(days=7))
+            ] == ["Competition", "Meeting"]
+
+    index.remove("competition")
+    assert [e.title for e in index.overlapping(DAY.date(), DAY.date() + datetime.timedelta(days=7))
+            ] == ["Meeting"]
+    assert "competition" not in index and len(index) == 3
+
+
+def test_overlapping___long_event():
+    """
+    Tests `EventIndex.overlapping()` with one event that lasts all season among lots of short ones,
+    a range in the middle gets the long event and only the short ones on those days
+    """
+    index = EventIndex([(i, _event(f"Meeting {i}", i, hour=18)) for i in range(-100, 100)])
+    index.add("season", _event("Season", -100, days=200))
+    assert len(index._days[DAY.date()]) == 2  # the long event doesn't slow down the other days
+
+    found = index.overlapping(DAY.date(), DAY.date() + datetime.timedelta(days=2))
+    assert [e.title for e in found] == ["Season", "Meeting 0", "Meeting 1", "Meeting 2"]
+
+    index.remove("season")
+    assert [e.title for e in index.overlapping(DAY.date(), DAY.date())] == ["Meeting 0"]
+    assert all(len(keys) == 1 for keys in index._days.values())
+
+
+def test_days():
+    """
+    Tests `EventIndex.days()`, all day events come first on each day, days without events get an
+    empty event, and an event that is replaced only shows up once
+    """
+    index = EventIndex([("a", _event("Build", 0, hour=18)),
+                        ("b", _event("Outreach", 0)),
+                        ("c", _event("Business", 2, hour=9))])
+    index.add("c", _event("Business moved", 1, hour=9))
+    days = index.days(DAY.date(), DAY.date() + datetime.timedelta(days=2))
+
+    assert [[event.title for event in day] for day in days] == [
+        ["Outreach", "Build"], ["Business moved"], ["No Events"]]
+    assert days[2][0].start_date == DAY.date() + datetime.timedelta(days=2)
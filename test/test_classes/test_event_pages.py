@@ -0,0 +1,125 @@
+import sys
+import os.path
+import asyncio
+import datetime
+
+import pytest
+
+discord = pytest.importorskip("discord")
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.event_pages import (FOOTER_ROOM, MAX_CHARACTERS, MAX_FIELD_VALUE, MAX_FIELDS,
+                                 EventPages, add_days)
+from classes.swr_cache import SWRCache
+from classes.gcal_event import Event
+
+TODAY = datetime.date(2020, 1, 10)
+
+
+class FakeMessage:
+    id = 1
+
+    def __init__(self, embed):
+        self.embed = embed
+
+    async def add_reaction(self, emoji):
+        pass
+
+    async def edit(self, embed):
+        self.embed = embed
+
+
+class FakeChannel:
+    async def send(self, embed):
+        self.message = FakeMessage(embed)
+        return self.message
+
+
+class FakeBot:
+    user = discord.Object(0)
+
+    def add_listener(self, func, name):
+        pass
+
+
+def test_turn():
+    """
+    Tests `EventPages.turn()` through 60 days with busy days, every page fits in an embed, pages
+    are only made when they are turned to, and turning back goes to the same day
+    """
+    asked = []
+
+    async def get_days(first: int, count: int):
+        asked.append(first)
+        days = []
+        for i in range(first, first + count):
+            day = datetime.datetime.combine(TODAY + datetime.timedelta(days=i), datetime.time())
+            days.append([Event("Team", f"Event {i}", day, day + datetime.timedelta(days=1),
+                               description="Bring snacks " * (i % 4) * 10)] * (i % 7 + 1))
+        return days
+
+    async def run():
+        pages = EventPages(FakeBot(), discord.Embed(title="Events"), get_days, 60, TODAY)
+        channel = FakeChannel()
+        await pages.start(channel)
+        assert asked == [0] and channel.message.embed.fields[0].name == "**Today**"
+
+        seen = []
+        while pages.next_start is not None:
+            embed = channel.message.embed
+            assert len(embed) <= MAX_CHARACTERS
+            assert all(len(field.value) <= MAX_FIELD_VALUE for field in embed.fields)
+            seen.append(len(embed.fields))
+            await pages.turn(pages.NEXT)
+        seen.append(len(channel.message.embed.fields))
+        assert sum(seen) == 61 and len(seen) == len(asked) > 2
+
+        await pages.turn(pages.PREVIOUS)
+        assert channel.message.embed.footer.text.startswith(f"Days {pages.starts[-2] + 1}-")
+
+    asyncio.run(run())
+
+
+def test_add_days():
+    """
+    Tests `add_days()` stops at Discord's limits for one embed, with lots of busy days
+    """
+    day = datetime.datetime.combine(TODAY, datetime.time())
+    busy = [Event("Team", "Build " * 20, day, day + datetime.timedelta(days=1),
+                  description="Bring snacks " * 50)] * 10
+    embed = discord.Embed(title="Events")
+    added = add_days(embed, [busy] * 60, TODAY, TODAY)
+    assert 0 < added == len(embed.fields) < MAX_FIELDS
+    assert len(embed) <= MAX_CHARACTERS - FOOTER_ROOM
+
+    embed = discord.Embed(title="Events")
+    assert add_days(embed, [[]] * 60, TODAY, TODAY) == MAX_FIELDS
+
+
+def test_get_page():
+    """
+    Tests `EventPages.get_page()` only makes a page once while the version stays the same
+    """
+    asked = []
+    version = [1]
+
+    async def get_days(first: int, count: int):
+        asked.append(first)
+        return [[]] * count
+
+    async def run():
+        cache = SWRCache(ttl=60)
+        for _ in range(3):
+            pages = EventPages(FakeBot(), discord.Embed(title="Events"), get_days, 60, TODAY,
+                               cache=cache, key=('page',), version=lambda: version[0])
+            embed, next_start = await pages.get_page(0)
+            assert next_start == MAX_FIELDS
+        assert asked == [0]
+
+        version[0] = 2
+        await pages.get_page(0)
+        assert asked == [0, 0]
+
+    asyncio.run(run())
@@ -0,0 +1,154 @@
+import sys
+import os.path
+import datetime
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.event_store import EventStore
+from benchmarks.fake_calendar import FakeCalendarServer, generate_calendars
+
+
+def _event(event_id: str, days: int, status: str = "confirmed") -> dict:
+    day = (datetime.datetime.utcnow() + datetime.timedelta(days=days)).date()
+    return {'id': event_id, 'status': status, 'summary': f"Event {event_id}",
+            'start': {'date': day.isoformat()},
+            'end': {'date': (day + datetime.timedelta(days=1)).isoformat()}}
+
+
+class FakeRequest:
+    def __init__(self, service, kwargs: dict):
+        self.service = service
+        self.kwargs = kwargs
+
+    def execute(self) -> dict:
+        return self.service.respond(**self.kwargs)
+
+
+class FakeBatch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request: FakeRequest, request_id: str) -> None:
+        self.requests.append((request_id, request))
+
+    def execute(self) -> None:
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.execute(), None)
+            except HttpError as e:
+                self.callback(request_id, None, e)
+
+
+class FakeSyncService:
+    """
+    Stands in for the Google Calendar service with one calendar, `changes` is what the next
+    incremental sync returns, and if `expired` is set then sync tokens are rejected with 410
+    """
+    def __init__(self, events: list):
+        self.events_list = events
+        self.changes = []
+        self.expired = False
+        self.requests = []
+        self.full_syncs = []  # the other args of each full sync request
+
+    def calendarList(self):
+        return self
+
+    def events(self):
+        return self
+
+    def list(self, **kwargs) -> FakeRequest:
+        return FakeRequest(self, kwargs)
+
+    def respond(self, calendarId: str = None, syncToken: str = None, pageToken: str = None,
+                **kwargs) -> dict:
+        if calendarId is None:
+            return {'items': [{'id': "team"}]}
+        self.requests.append(syncToken)
+        if syncToken is None:
+            self.full_syncs.append(kwargs)
+        if syncToken is not None and self.expired:
+            raise HttpError(httplib2.Response({'status': 410}), b"Gone")
+        if syncToken is None:  # full sync, in 2 pages
+            page = int(pageToken or 0)
+            items = self.events_list[page::2]
+            if page == 0:
+                return {'summary': "Team", 'items': items, 'nextPageToken': "1"}
+            return {'summary': "Team", 'items': items, 'nextSyncToken': "sync"}
+        return {'summary': "Team", 'items': self.changes, 'nextSyncToken': "sync"}
+
+    def new_batch_http_request(self, callback) -> FakeBatch:
+        return FakeBatch(callback)
+
+
+def test_sync(tmp_path):
+    """
+    Tests `EventStore.sync()` with a full sync, an incremental sync that adds, changes and deletes
+    events, and an expired sync token
+    """
+    service = FakeSyncService([_event("a", 1), _event("b", 2), _event("old", -10)])
+    store = EventStore(str(tmp_path / "events.json"))
+    assert not store.ready
+
+    store.sync(service)
+    assert service.requests == [None, None]
+    assert all('timeMin' in kwargs for kwargs in service.full_syncs)  # only asks for recent ones
+    assert len(store) == 2  # "old" ended too long ago
+
+    changed = _event("a", 1)
+    changed['summary'] = "Changed"
+    service.changes = [changed, _event("b", 2, status="cancelled"), _event("c", 3)]
+    store.sync(service)
+    assert service.requests[-1] == "sync"
+    end = (datetime.datetime.utcnow() + datetime.timedelta(days=5)).date()
+    events = store.events_until(datetime.datetime.utcnow(), end)
+    assert sorted(event.title for event in events) == ["Changed", "Event c"]
+
+    service.expired = True
+    store.sync(service)
+    assert store.resyncs == 1
+    assert len(store) == 2
+
+    reloaded = EventStore(str(tmp_path / "events.json"), max_age=60)  # saved after every sync
+    assert len(reloaded) == 2
+    assert not reloaded.ready  # until it syncs, the saved events could be from any time ago
+    reloaded.sync(service)
+    assert reloaded.ready and reloaded.resyncs == 1  # the saved sync token was expired
+
+    reloaded.last_sync -= datetime.timedelta(seconds=61)  # the syncs since then failed
+    assert not reloaded.ready
+
+
+def test_sync___fake_calendar():
+    """
+    Tests `EventStore.sync()` over HTTP against the fake Google Calendar, with hundreds of events
+    in 3 calendars, so every sync is paged and batched the same way it is with Google
+    """
+    with FakeCalendarServer(generate_calendars(calendars=3, events=600, days=60)) as server:
+        service = server.build_service()
+        store = EventStore()
+        store.sync(service)
+        assert store.full_syncs == 3 and len(store) > 1500
+        assert server.stats['batch'] == 3  # 600 events is 3 pages of 250
+
+        calendar_id = "calendar0@group.calendar.google.com"
+        event_ids = [event_id for event_id in server.event_ids(calendar_id)
+                     if (calendar_id, event_id) in store.index]  # not ones that already ended
+        server.delete_event(calendar_id, event_ids[0])
+        moved = dict(server.get_event(calendar_id, event_ids[1]), summary="Moved",
+                     start={'date': "2000-01-01"}, end={'date': "2000-01-02"})
+        server.put_event(calendar_id, moved)
+        size, version = len(store), store.version
+        server.stats.clear()
+        store.sync(service)
+        assert server.stats['batch'] == 1 and store.incremental_syncs == 3
+        assert len(store) == size - 2 and store.version == version + 1  # "Moved" is in the past
+
+        server.expire_sync_tokens()
+        store.sync(service)
+        assert store.resyncs == 3 and len(store) == size - 2
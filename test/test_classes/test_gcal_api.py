@@ -0,0 +1,158 @@
+import sys
+import os.path
+import asyncio
+import datetime
+import pickle
+import threading
+import time
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes import gcal_api
+import tokens
+
+
+class FakeCredentials:
+    """
+    Stands in for `google.oauth2.credentials.Credentials`, refreshing just pushes the expiry back
+    """
+    def __init__(self, expiry: datetime.datetime):
+        self.token = "token"
+        self.refresh_token = "refresh"
+        self.expiry = expiry
+
+    @property
+    def valid(self) -> bool:
+        return self.expiry > datetime.datetime.utcnow()
+
+    def refresh(self, request) -> None:
+        self.expiry = datetime.datetime.utcnow() + datetime.timedelta(hours=1)
+
+    def before_request(self, request, method, url, headers) -> None:
+        headers['authorization'] = f"Bearer {self.token}"
+
+
+def test_calendar_service(tmp_path, monkeypatch):
+    """
+    Tests that `CalendarService` only reads the token and builds the service once, refreshes
+    credentials that are about to expire, and writes the new token back
+    """
+    reads = []
+
+    def read_google_token():
+        reads.append(1)
+        return FakeCredentials(datetime.datetime.utcnow() + datetime.timedelta(minutes=1))
+
+    monkeypatch.setattr(tokens, 'read_google_token', read_google_token)
+    token_location = str(tmp_path / "calendar-token.pickle")
+    service = gcal_api.CalendarService(token_location=token_location)
+
+    first = service.get()  # expires in a minute, which is inside of the refresh margin
+    assert service.get() is first
+    assert (len(reads), service.builds, service.refreshes) == (1, 1, 1)
+    assert service.seconds_until_refresh() > 0
+
+    service._writer.shutdown(wait=True)
+    with open(token_location, 'rb') as file:
+        assert pickle.load(file).expiry == service.credentials.expiry
+    request = first.events().list(calendarId="primary")
+    assert request.uri.startswith("https://www.googleapis.com/calendar/v3/calendars/primary/events")
+
+
+def test_run():
+    """
+    Tests `CalendarService.run()` uses the service on one thread, one call at a time, even when
+    they are all started at once
+    """
+    fake_service = object()
+    running, threads = [], set()
+
+    def use(service, i: int) -> int:
+        assert service is fake_service and not running
+        running.append(i)
+        threads.add(threading.get_ident())
+        time.sleep(0.01)
+        running.remove(i)
+        return i
+
+    async def run():
+        service = gcal_api.CalendarService(service=fake_service)
+        assert await asyncio.gather(*[service.run(use, i) for i in range(5)]) == list(range(5))
+
+    asyncio.run(run())
+    assert len(threads) == 1
+
+
+class FakeRequest:
+    def __init__(self, response: dict):
+        self.response = response
+
+    def execute(self) -> dict:
+        return self.response
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request: FakeRequest, request_id: str) -> None:
+        self.requests.append((request_id, request))
+
+    def execute(self) -> None:
+        self.service.round_trips += 1
+        for request_id, request in self.requests:
+            self.callback(request_id, request.execute(), None)
+
+
+class FakeService:
+    """
+    Stands in for the Google Calendar service, each calendar has one event tomorrow on its first
+    page, then pages with one event every 10 days after that
+    """
+    def __init__(self, calendars: int):
+        self.calendars = calendars
+        self.round_trips = 0
+        self.pages = 0
+
+    def calendarList(self):
+        return self
+
+    def events(self):
+        return self
+
+    def list(self, calendarId: str = None, pageToken: str = None, **kwargs) -> FakeRequest:
+        assert 'fields' in kwargs
+        if calendarId is None:
+            self.round_trips += 1
+            return FakeRequest({'items': [{'id': str(i)} for i in range(self.calendars)]})
+        self.pages += 1
+        page = int(pageToken or 0)
+        day = (datetime.datetime.utcnow() + datetime.timedelta(days=1 + 10 * page)).date()
+        return FakeRequest({'summary': f"Calendar {calendarId}", 'nextPageToken': str(page + 1),
+                            'items': [{
+                                'summary': f"Event {calendarId}",
+                                'start': {'dateTime': f"{day}T{10 + int(calendarId) % 10}:00:00"},
+                                'end': {'dateTime': f"{day}T{11 + int(calendarId) % 10}:00:00"}
+                            }]})
+
+    def new_batch_http_request(self, callback) -> FakeBatch:
+        return FakeBatch(self, callback)
+
+
+def test_get_all_events_until():
+    """
+    Tests that `get_all_events_until()` fetches the calendars in batches, stops fetching pages once
+    it is past the last day, and merges events from different calendars that are on the same day
+    """
+    service = FakeService(calendars=60)
+    days = gcal_api.get_all_events_until(service, days=2)
+
+    # the calendar list, then 2 pages of 60 calendars in 2 batches each
+    assert service.round_trips == 1 + 2 * 2
+    assert service.pages == 2 * 60
+    assert [len(day) for day in days] == [1, 60, 1]
+    assert days[0][0].title == "No Events"
+    assert {event.calendar_name for event in days[1]} == {f"Calendar {i}" for i in range(60)}
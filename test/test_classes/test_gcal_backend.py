@@ -0,0 +1,128 @@
+import sys
+import os.path
+import asyncio
+import datetime
+
+import pytest
+from aiohttp import web
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.gcal_api import CalendarService
+from classes.gcal_backend import (AiohttpBackend, CalendarBackend, CalendarRequestError,
+                                  GoogleApiBackend)
+from benchmarks.fake_calendar import FakeCalendarServer, generate_calendars
+
+
+class FakeCredentials:
+    """
+    Stands in for `gcal_api.CalendarService`, every refresh makes a new token
+    """
+    def __init__(self):
+        self.credentials = self
+        self.token = "token 0"
+        self.refreshes = 0
+
+    def needs_refresh(self) -> bool:
+        return False
+
+    def refresh(self) -> None:
+        self.refreshes += 1
+        self.token = f"token {self.refreshes}"
+
+    async def call(self, func, *args):
+        return func(*args)
+
+
+def _app(failures: dict) -> web.Application:
+    """
+    A tiny Google Calendar with 2 calendars, `failures` is path -> [status, ...] that the path
+    answers with (in order) before it works. The "build" calendar turns down the first token.
+    """
+    day = (datetime.datetime.utcnow() + datetime.timedelta(days=1)).date().isoformat()
+
+    async def calendar_list(request):
+        if failures.get(request.path):
+            return web.Response(status=failures[request.path].pop(0))
+        return web.json_response({'items': [{'id': "build"}, {'id': "outreach@group"}]})
+
+    async def events(request):
+        calendar_id = request.match_info['calendar_id']
+        if calendar_id == "build" and request.headers['Authorization'] == "Bearer token 0":
+            return web.Response(status=401)
+        assert request.query['singleEvents'] == "true"
+        return web.json_response({'summary': calendar_id, 'items': [{
+            'summary': f"{calendar_id} meeting",
+            'start': {'dateTime': f"{day}T18:00:00"},
+            'end': {'dateTime': f"{day}T20:00:00"}
+        }]})
+
+    app = web.Application()
+    app.router.add_get('/users/me/calendarList', calendar_list)
+    app.router.add_get('/calendars/{calendar_id}/events', events)
+    return app
+
+
+async def _serve(app: web.Application) -> (web.AppRunner, str):
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def test_get_all_events_until():
+    """
+    Tests `AiohttpBackend.get_all_events_until()` against a fake Google Calendar, a 503 is retried,
+    a 401 refreshes the token, and a 404 isn't retried
+    """
+    async def run():
+        failures = {'/users/me/calendarList': [503]}
+        runner, url = await _serve(_app(failures))
+        credentials = FakeCredentials()
+        backend = AiohttpBackend(credentials, base_url=url, backoff=0.01)
+        try:
+            days = await backend.get_all_events_until(days=1)
+            assert [[event.title for event in day] for day in days] == [
+                ["No Events"], ["build meeting", "outreach@group meeting"]]
+            assert backend.retried == 1 and credentials.refreshes == 1
+
+            failures['/users/me/calendarList'] = [404]
+            with pytest.raises(CalendarRequestError):
+                await backend.get_all_events_until(days=1)
+            assert backend.retried == 1
+        finally:
+            await backend.close()
+            await runner.cleanup()
+
+    asyncio.run(run())
+
+
+def test_google_api_backend():
+    """
+    Tests `GoogleApiBackend.get_all_events_until()` against the fake Google Calendar, with requests
+    at the same time, which all go through the service's one thread
+    """
+    with FakeCalendarServer(generate_calendars(calendars=2, events=50, days=7)) as server:
+        backend = GoogleApiBackend(CalendarService(service=server.build_service()))
+
+        async def run():
+            return await asyncio.gather(*[backend.get_all_events_until(days=7) for _ in range(4)])
+
+        results = [[[event.title for event in day] for day in days]
+                   for days in asyncio.run(run())]
+    assert len(results[0]) == 8 and sum(map(len, results[0])) > 8
+    assert all(days == results[0] for days in results)
+
+
+def test_calendar_backend():
+    """
+    Tests that a backend without `get_all_events_until()` can't be made
+    """
+    class Incomplete(CalendarBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,72 @@
+import sys
+import os.path
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.math_cache import MathCache
+
+
+def test_lru():
+    """
+    Tests that the memory tier evicts the least recently used answer and counts hits and misses
+    """
+    cache = MathCache(size=2)
+    cache.put("a", ["1"])
+    cache.put("b", ["2"])
+    assert cache.get("a") == ["1"]  # "b" is now the least recently used
+    cache.put("c", ["3"])
+
+    assert cache.get("b") is None
+    assert cache.get("c") == ["3"]
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 1, 1)
+
+
+def test_disk(tmp_path):
+    """
+    Tests that answers written to disk survive a new cache object, like they would a restart
+    """
+    path = str(tmp_path / "math")
+    cache = MathCache(size=2, path=path)
+    cache.put("a", ["1"])
+    cache.close()
+
+    cache = MathCache(size=2, path=path)
+    assert cache.get("a") == ["1"]
+    assert cache.disk_hits == 1
+    cache.close()
+
+
+def test_write(tmp_path):
+    """
+    Tests that `put()` leaves the disk alone until the answers are taken and written, and that
+    answers waiting to be written are still found
+    """
+    path = str(tmp_path / "math")
+    cache = MathCache(size=1, path=path)
+    cache.put("a", ["1"])
+    cache.put("b", ["2"])  # pushes "a" out of memory, it is only waiting to be written
+    assert cache._disk_key("a") not in cache.disk
+    assert cache.get("a") == ["1"] and cache.disk_hits == 1
+
+    cache.write(cache.take_pending())
+    assert cache.disk[cache._disk_key("b")] == ["2"]
+    assert cache.take_pending() == {}
+    cache.close()
+
+
+def test_version(tmp_path):
+    """
+    Tests that answers saved with another format version, or that can't be unpickled anymore, are
+    misses instead of errors
+    """
+    path = str(tmp_path / "math")
+    cache = MathCache(size=1, path=path)
+    cache.put("a", ["1"])
+    cache.close()
+
+    cache = MathCache(size=1, path=path, version=2)
+    assert cache.get("a") is None
+    cache.disk.dict[cache._disk_key("b").encode()] = b"not a pickle"
+    assert cache.get("b") is None and cache.misses == 2
+    cache.close()
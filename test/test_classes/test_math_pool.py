@@ -0,0 +1,57 @@
+import sys
+import os.path
+import asyncio
+import time
+
+import pytest
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.math_pool import MathPool, WorkerTimeout
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _divide(a, b):
+    return a / b
+
+
+def test_run():
+    """
+    Tests `MathPool.run()` with a normal job and a job that raises, the exception should be raised
+    in the parent
+    """
+    async def run():
+        pool = MathPool(workers=1, timeout=5)
+        try:
+            assert await pool.run(_divide, 6, 3) == 2
+            with pytest.raises(ZeroDivisionError):
+                await pool.run(_divide, 1, 0)
+        finally:
+            pool.close()
+
+    asyncio.run(run())
+
+
+def test_run___timeout():
+    """
+    Tests that `MathPool.run()` kills a job that goes over its budget, and that the pool still
+    works afterwards with a fresh worker
+    """
+    async def run():
+        pool = MathPool(workers=1, timeout=0.5)
+        try:
+            old_process = pool.start()._all[0].process
+            with pytest.raises(WorkerTimeout):
+                await pool.run(_sleep, 30)
+            assert not old_process.is_alive()
+            assert pool.respawns == 1
+            assert await pool.run(_sleep, 0) == 0
+        finally:
+            pool.close()
+
+    asyncio.run(run())
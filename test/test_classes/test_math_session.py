@@ -0,0 +1,54 @@
+import sys
+import os.path
+import pickle
+import time
+
+import pytest
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.math_session import PICKLE_PROTOCOL, MathSession, SessionFull, SessionStore
+
+
+def _size(value) -> int:
+    return len(pickle.dumps(value, protocol=PICKLE_PROTOCOL))
+
+
+def test_session_memory():
+    """
+    Tests that a session drops its oldest parsed equations to stay under its memory cap, and refuses
+    a variable that can't fit at all
+    """
+    parsed, variable = "x" * 80, "z" * 10
+    max_bytes = 2 * _size(parsed) + _size(variable) - 1  # room for both equations, not the variable
+    session = MathSession(0, max_bytes=max_bytes)
+    session.add_parsed("a", parsed)
+    session.add_parsed("b", parsed)
+    assert session.get_parsed("a") is not None  # "b" is now the oldest
+    session.set_variable("k", variable)
+
+    assert session.get_parsed("b") is None and session.get_parsed("a") is not None
+    assert session.variables == {"k": variable}
+    assert session.size <= max_bytes
+    with pytest.raises(SessionFull):
+        session.set_variable("big", "z" * max_bytes)
+
+
+def test_store_expire():
+    """
+    Tests that `SessionStore` drops idle sessions after the TTL and the least recently used ones
+    when there are too many
+    """
+    store = SessionStore(max_sessions=2, ttl=0.2)
+    store.get(1).set_variable("k", 1)
+    store.get(2)
+    store.get(1)
+    store.get(3)  # 2 is the least recently used
+    assert store.get(2, create=False) is None
+    assert store.get(1, create=False).variables == {"k": 1}
+    assert store.evicted == 1
+
+    time.sleep(0.3)
+    assert sorted(store.expire()) == [1, 3]
+    assert len(store) == 0
@@ -0,0 +1,76 @@
+import sys
+import os.path
+import asyncio
+import time
+
+import pytest
+
+discord = pytest.importorskip("discord")
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.poll import PollBase
+from classes.reaction_router import ROUTER
+
+
+class FakePayload:
+    def __init__(self, emoji: str, user_id: int):
+        self.message_id = 1
+        self.emoji = emoji
+        self.user_id = user_id
+
+
+class FakeBot:
+    def add_listener(self, func, name):
+        pass
+
+    def remove_listener(self, func, name):
+        pass
+
+
+class RecordingPoll(PollBase):
+    def __init__(self):
+        super(RecordingPoll, self).__init__(['🍇', '🍈'], ["Grapes", "Melon"],
+                                            discord.Object(5), "Fruit", FakeBot())
+        self.message = discord.Object(1)
+        self.message.author = discord.Object(0)
+        self.reactions = asyncio.Queue()
+        self.seen = []
+
+    async def on_reaction_add(self, emoji: str, user_id: int):
+        self.seen.append((time.monotonic(), "add", emoji))
+
+    async def on_reaction_remove(self, emoji: str, user_id: int):
+        self.seen.append((time.monotonic(), "remove", emoji))
+
+    async def end(self):
+        return self
+
+
+def test_loop():
+    """
+    Tests `PollBase.loop()` handles reactions as soon as they come in, in the order they were added
+    and removed, ignores the bot's own reactions, and stops when the author reacts with the stop
+    emoji. The reactions go through `ROUTER`, like they do from discord
+    """
+    async def run():
+        poll = RecordingPoll()
+        task = asyncio.ensure_future(poll.loop())
+        await asyncio.sleep(0.05)
+        assert poll.seen == [] and 1 in ROUTER
+
+        sent = time.monotonic()
+        await ROUTER.on_raw_reaction_add(FakePayload('🍇', 3))
+        await ROUTER.on_raw_reaction_remove(FakePayload('🍇', 3))
+        await ROUTER.on_raw_reaction_add(FakePayload('🍈', 0))  # the bot
+        await ROUTER.on_raw_reaction_add(FakePayload('🍈', 3))
+        await asyncio.sleep(0)
+        assert [what[1:] for what in poll.seen] == [("add", "🍇"), ("remove", "🍇"), ("add", "🍈")]
+        assert poll.seen[0][0] - sent < 0.05  # not waiting for the next 0.1s tick
+
+        await ROUTER.on_raw_reaction_add(FakePayload('❌', 5))
+        await asyncio.wait_for(task, 1)
+        assert 1 not in ROUTER
+
+    asyncio.run(run())
@@ -0,0 +1,55 @@
+import sys
+import os.path
+import asyncio
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.reaction_router import ReactionRouter
+
+
+class FakePayload:
+    def __init__(self, message_id: int, emoji: str = '🍇'):
+        self.message_id = message_id
+        self.emoji = emoji
+
+
+class FakeBot:
+    def __init__(self):
+        self.listeners = []
+
+    def add_listener(self, func, name):
+        self.listeners.append(name)
+
+
+def test_route():
+    """
+    Tests `ReactionRouter` only listens to the bot once, sends each reaction to the handlers of its
+    message and nothing else, and drops reactions on messages nobody registered
+    """
+    got = []
+
+    def handler(name: str):
+        async def handle(payload):
+            got.append((name, payload.message_id))
+        return handle
+
+    async def run():
+        bot, router = FakeBot(), ReactionRouter()
+        for message_id in range(1000):
+            router.register(bot, message_id, handler("add"), handler("remove"))
+        router.register(bot, 1000, handler("add"))
+        assert bot.listeners == ["on_raw_reaction_add", "on_raw_reaction_remove"]
+
+        await router.on_raw_reaction_add(FakePayload(5))
+        await router.on_raw_reaction_remove(FakePayload(7))
+        await router.on_raw_reaction_remove(FakePayload(1000))  # no remove handler
+        await router.on_raw_reaction_add(FakePayload(2000))
+        assert router.unregister(5) and not router.unregister(5)
+        await router.on_raw_reaction_add(FakePayload(5))
+        assert len(router) == 1000
+        return router
+
+    router = asyncio.run(run())
+    assert got == [("add", 5), ("remove", 7)]
+    assert router.routed == 2 and router.dropped == 3
@@ -0,0 +1,72 @@
+import sys
+import os.path
+import asyncio
+import datetime
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.scheduler import Scheduler
+
+
+def soon(seconds: float) -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=seconds)
+
+
+def test_run():
+    """
+    Tests `Scheduler.run()` runs jobs in the order they are due, a job added in front of the one it
+    is sleeping for still runs first, and replaced and cancelled jobs don't run
+    """
+    fired = []
+
+    def job(name: str):
+        async def callback():
+            fired.append(name)
+        return callback
+
+    async def run():
+        scheduler = Scheduler()
+        scheduler.schedule("c", soon(0.3), job("c"))
+        scheduler.schedule("b", soon(0.2), job("b"))
+        scheduler.schedule("gone", soon(0.1), job("gone"))
+        scheduler.schedule("late", soon(0.05), job("late"))
+        task = asyncio.ensure_future(scheduler.run())
+        await asyncio.sleep(0.01)
+
+        scheduler.schedule("a", soon(0.02), job("a"))  # wakes it up
+        scheduler.schedule("late", soon(0.25), job("late"))  # replaced
+        assert scheduler.cancel("gone") and not scheduler.cancel("gone")
+        assert len(scheduler) == 4 and "late" in scheduler
+        await asyncio.sleep(0.45)
+        task.cancel()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert fired == ["a", "b", "late", "c"]
+    assert scheduler.fired == 4 and len(scheduler) == 0
+
+
+def test_run___failing_job():
+    """
+    Tests `Scheduler.run()` keeps going when a job raises, and runs jobs that were due in the past
+    right away
+    """
+    fired = []
+
+    async def broken():
+        raise ValueError("Failing on purpose")
+
+    async def works():
+        fired.append(True)
+
+    async def run():
+        scheduler = Scheduler()
+        scheduler.schedule("broken", soon(-60), broken)
+        scheduler.schedule("works", soon(0.01), works)
+        task = asyncio.ensure_future(scheduler.run())
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(run())
+    assert fired == [True]
@@ -0,0 +1,38 @@
+import sys
+import os.path
+import asyncio
+
+sys.path.append(  # import from 2 directories above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from classes.swr_cache import SWRCache
+
+
+def test_get():
+    """
+    Tests that `SWRCache.get()` builds once for concurrent calls, gives out a stale value while it
+    rebuilds in the background, and rebuilds first when the version changes
+    """
+    async def run():
+        builds = []
+
+        async def build():
+            builds.append(1)
+            await asyncio.sleep(0.01)
+            return len(builds)
+
+        cache = SWRCache(ttl=0.05)
+        assert await asyncio.gather(cache.get("today", 1, build), cache.get("today", 1, build)) \
+            == [1, 1]
+        assert await cache.get("today", 1, build) == 1 and cache.hits == 1
+
+        await asyncio.sleep(0.1)
+        assert await cache.get("today", 1, build) == 1  # stale, but given out right away
+        await asyncio.sleep(0.05)
+        assert await cache.get("today", 1, build) == 2
+        assert cache.stale_hits == 1
+
+        assert await cache.get("today", 2, build) == 3  # the data changed
+        assert len(builds) == 3
+
+    asyncio.run(run())
@@ -1,6 +1,7 @@
 import sys
 import os.path
 
+import pytest
 import sympy
 
 sys.path.append(  # import from directory above
@@ -33,6 +34,21 @@ def test_solve_equ():
     assert math_equ.solve_equ(None, 27)
 
 
+def test_solve_equ___engines():
+    """
+    Tests that `solve_equ()` uses the polynomial solver for polynomials (and only gives repeated
+    roots once), `mp.findroot()` for other single variable equations, and sympy for everything else
+    """
+    x, y = sympy.Symbol('x'), sympy.Symbol('y')
+    assert math_equ.solve_equ(x, (x - 1) ** 2) == (['x = 1.00000000000000\n'],
+                                                   math_equ.ENGINE_POLYNOMIAL)
+    assert math_equ.solve_equ(x, x ** 2 + 1) == (['x = -1.0*I\n', 'x = 1.0*I\n'],
+                                                 math_equ.ENGINE_POLYNOMIAL)
+    assert math_equ.solve_equ(x, sympy.cos(x) - x) == (['x = 0.739085133215161\n'],
+                                                       math_equ.ENGINE_FINDROOT)
+    assert math_equ.solve_equ(x, x + y)[1] == math_equ.ENGINE_SYMPY
+
+
 def test_math_main():
     """
     Tests `math_main()` with an expression (3^3) and an equation (3x=3), this in turn tests the rest
@@ -40,3 +56,135 @@ def test_math_main():
     """
     assert math_equ.math_main(["3x=3", "-v", "x"]) == (['x = 1.00000000000000\n'], '3x=3')
     assert math_equ.math_main(["3^3"]) == (['`27.0000000000000`'], '3^3')
+
+
+def test_canonical_key():
+    """
+    Tests `canonical_key()` with the same equation written two different ways, and a different
+    variable for the same equation
+    """
+    variable, equation, _ = math_equ.organize(["2x+1=5", "-v", "x"])
+    key = math_equ.canonical_key(variable, math_equ.parse_equ(equation))
+
+    variable, equation, _ = math_equ.organize(["2*x", "+", "1", "=", "5", "-v", "x"])
+    assert math_equ.canonical_key(variable, math_equ.parse_equ(equation)) == key
+    assert math_equ.canonical_key(sympy.Symbol('y'), math_equ.parse_equ(equation)) != key
+
+
+def test_check_cost():
+    """
+    Tests `check_cost()` with a normal equation, a big number that should only be approximated, and
+    some equations that should be rejected outright
+    """
+    assert math_equ.check_cost(sympy.Symbol('x'), "(3x**2)-(3)")
+    assert not math_equ.check_cost(None, "10**10**10")
+
+    for equation in ["5587**5587**5587", "2**3**4**5**6", "x**600+1", "9" * 2000]:
+        with pytest.raises(math_equ.ComplexityError):
+            math_equ.check_cost(None, equation)
+
+    with pytest.raises(math_equ.ComplexityError):  # too big to solve for a variable
+        math_equ.check_cost(sympy.Symbol('x'), "x-10**10**10")
+
+
+def test_solve_numeric___digits():
+    """
+    Tests that `solve_numeric()` gives as many digits as it is asked for, and that `solve_exact()`
+    gives the exact form of the same answers
+    """
+    x = sympy.Symbol('x')
+    answers, _ = math_equ.solve_numeric(x, x ** 2 - 2, 30)
+    assert answers == ['x = -1.41421356237309504880168872421\n',
+                       'x = 1.41421356237309504880168872421\n']
+    assert math_equ.solve_exact(x, x ** 2 - 2)[0] == ['x = -sqrt(2)\n', 'x = sqrt(2)\n']
+    assert math_equ.approximate_equ("10**10**10") == (['`1.00000000000000E+10000000000`'],
+                                                      math_equ.ENGINE_MPMATH)
+
+
+def test_split_batch():
+    """
+    Tests `split_batch()` with equations separated by `;` and with a code block that has a language
+    tag on it
+    """
+    assert math_equ.split_batch("3x=3 -v x; 3^3") == [["3x=3", "-v", "x"], ["3^3"]]
+    assert math_equ.split_batch("```py\n3x=3 -v x\n3^3\n```") == [["3x=3", "-v", "x"], ["3^3"]]
+    assert math_equ.split_batch("3^3") == [["3^3"]]
+
+
+def test_table_equ():
+    """
+    Tests `table_equ()` with a polynomial, a constant, and a function that isn't defined for part of
+    the range
+    """
+    xs, ys = math_equ.table_equ(None, "x**2+1", 0, 2, 0.5)
+    assert xs.tolist() == [0, 0.5, 1, 1.5, 2]
+    assert ys.tolist() == [1, 1.25, 2, 3.25, 5]
+
+    assert math_equ.table_equ(None, "5", 0, 1, 0.5)[1].tolist() == [5, 5, 5]
+    assert math_equ.table_equ(sympy.Symbol('t'), "sqrt(t)", -1, 1, 1)[1].tolist()[1:] == [0, 1]
+
+    with pytest.raises(ValueError):
+        math_equ.table_equ(None, "x", 0, 1, -1)
+
+
+def test_tabulate_equ():
+    """
+    Tests `tabulate_equ()` makes a CSV table when there are too many rows, or when the lined up
+    table has too many characters for the message even though there are only a few rows
+    """
+    text, csv = math_equ.tabulate_equ(None, "x**2", 0, 4, 1, max_length=2000)
+    assert not csv and text.splitlines()[1].split() == ["0", "|", "0"]
+    assert math_equ.tabulate_equ(None, "x**2", 0, 100, 1)[1]
+
+    text, csv = math_equ.tabulate_equ(None, "x**2", 0, 4, 1, max_length=50)
+    assert csv and text.splitlines() == ["x,value", "0,0", "1,1", "2,4", "3,9", "4,16"]
+
+
+def test_organize_system():
+    """
+    Tests `organize_system()` with two equations, one with a comma inside of brackets
+    """
+    assert math_equ.organize_system(["x+y=log(8,2),", "x-y=1", "-v", "x", "-v", "y"]) == (
+        [sympy.Symbol('x'), sympy.Symbol('y')], ["(x+y)-(log(8,2))", "(x-y)-(1)"],
+        "x+y=log(8,2),x-y=1")
+    assert math_equ.is_system(["x+y=3,x-y=1"])
+    assert not math_equ.is_system(["log(8,2)"])
+
+
+def test_organize_system___missing_variable():
+    """
+    Tests `organize_system()` with a `-v` at the end that doesn't have a variable after it
+    """
+    with pytest.raises(ValueError, match="`-v` needs 1 value"):
+        math_equ.organize_system(["x+y=3,", "x-y=1", "-v", "x", "-v"])
+
+
+def test_solve_system():
+    """
+    Tests `solve_system()` with a linear system, an over-determined linear system, and a nonlinear
+    system
+    """
+    x, y = sympy.Symbol('x'), sympy.Symbol('y')
+    assert math_equ.solve_system([x, y], [2 * x + y - 3, x - y]) == (
+        ['x = 1.00000000000000, y = 1.00000000000000\n'], math_equ.ENGINE_LINALG)
+    assert math_equ.solve_system([x, y], [x - 1, y - 1, x + y - 2]) == (
+        ['x = 1.00000000000000, y = 1.00000000000000\n'], math_equ.ENGINE_LSTSQ)
+
+    answers, engine = math_equ.solve_system([x, y], [x ** 2 + y ** 2 - 4, x * y - 1])
+    assert engine == math_equ.ENGINE_NSOLVE
+    assert 'x = 0.517638090205041, y = 1.93185165257814\n' in answers
+
+
+def test_split_assignment():
+    """
+    Tests `split_assignment()` only finds assignments with `-set`, so `y = 2x+1` is still an
+    equation, and won't save names with an `e` in them
+    """
+    assert math_equ.split_assignment(["-set", "k", "=", "3"]) == ("k", "3", "k=3")
+    assert math_equ.split_assignment(["-set", "y=2x+1"]) == ("y", "2x+1", "y=2x+1")
+    assert math_equ.split_assignment(["y", "=", "2x+1"]) is None
+    assert math_equ.split_assignment(["k=3"]) is None
+    with pytest.raises(ValueError):
+        math_equ.split_assignment(["-set", "2k=3"])
+    with pytest.raises(ValueError):
+        math_equ.split_assignment(["-set", "speed=3"])
@@ -0,0 +1,115 @@
+import sys
+import os.path
+import asyncio
+
+import pytest
+
+pytest.importorskip("discord")
+
+sys.path.append(  # import from directory above
+    os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import math_equ
+import math_utils
+from classes.math_cache import MathCache
+from classes.math_pool import MathPool
+from classes.math_session import MathSession
+
+
+def test_session(monkeypatch):
+    """
+    Tests `assign()` and `prepare()`, the way the bot uses sessions: a variable is saved and then
+    used, the parsed equation is reused the second time instead of being parsed again, and the
+    same parsed equation works with a new value of the variable
+    """
+    async def run():
+        pool = MathPool(workers=1, timeout=30)
+        monkeypatch.setattr(math_utils, "MATH_POOL", pool)
+        monkeypatch.setattr(math_utils, "MATH_CACHE", MathCache(size=16))
+        try:
+            session = MathSession(0, max_bytes=65536)
+            assert await math_utils.assign(["-set", "k", "=", "3"], session) == (
+                ['`k = 3`'], 'k=3', "your session")
+            assert (await math_utils.solve(["2k"], session))[0] == ['`6.00000000000000`']
+            assert session.parsed_count == 1
+            parsed, key = session.get_parsed(('None', '2k'))  # what `prepare()` saves
+            assert str(parsed) == '2*k' and isinstance(key, str)
+
+            await math_utils.assign(["-set", "k", "=", "4"], session)
+            parsed, key = await math_utils.prepare(None, '2k', True, session)
+            assert parsed == 8 and session.parsed_count == 1
+
+            answers, copy, _ = await math_utils.solve(["k*x=8", "-v", "x"], session)
+            assert (answers, copy) == (["x = 2.00000000000000\n"], "k*x=8")
+
+            answers, _, _ = await math_utils.solve(["y=2x+1"], session)  # no `-set`, so solved
+            assert "y" not in session.variables and answers == ['`-2.0*x + y - 1.0`']
+
+            # too big to parse exactly, so it is approximated, still with k = 4 put in
+            answers, _, engine = await math_utils.solve(["k*10^10^10"], session)
+            assert answers == ['`4.00000000000000E+10000000000`']
+            assert engine == math_equ.ENGINE_MPMATH
+        finally:
+            pool.close()
+
+    asyncio.run(run())
+
+
+def test_solve_progressive(monkeypatch):
+    """
+    Tests `solve_progressive()` gives a quick answer first and then one with the exact form
+    """
+    async def run():
+        pool = MathPool(workers=2, timeout=30)
+        monkeypatch.setattr(math_utils, "MATH_POOL", pool)
+        monkeypatch.setattr(math_utils, "MATH_CACHE", MathCache(size=16))
+        try:
+            embeds = [embed async for embed in math_utils.solve_progressive(["x^2=2", "-v", "x"])]
+            assert embeds[0].footer.text.endswith("refining...")
+            assert embeds[-1].fields[0].name == "Exact" and "sqrt(2)" in embeds[-1].fields[0].value
+            assert math_equ.ENGINE_SYMPY in embeds[-1].footer.text
+        finally:
+            pool.close()
+
+    asyncio.run(run())
+
+
+def test_solve_batch(monkeypatch):
+    """
+    Tests `solve_batch()` saves the variables first and still answers the rest of the batch when
+    one of them is broken
+    """
+    async def run():
+        pool = MathPool(workers=2, timeout=30)
+        monkeypatch.setattr(math_utils, "MATH_POOL", pool)
+        monkeypatch.setattr(math_utils, "MATH_CACHE", MathCache(size=16))
+        try:
+            embed = await math_utils.solve_batch([["-set", "k", "=", "2"], ["3k"], ["2x=", "-v"]],
+                                                 MathSession(0, max_bytes=65536))
+            assert [field.name for field in embed.fields[:2]] == ["`k=2`", "`3k`"]
+            assert "6.0" in embed.fields[1].value and "wrong" in embed.fields[2].value
+        finally:
+            pool.close()
+
+    asyncio.run(run())
+
+
+def test_table(monkeypatch):
+    """
+    Tests `table()` sends a short table in the message, and a CSV file when the expression is so
+    long that the table wouldn't fit in one message
+    """
+    async def run():
+        pool = MathPool(workers=1, timeout=30)
+        monkeypatch.setattr(math_utils, "MATH_POOL", pool)
+        try:
+            content, file = await math_utils.table(["x^2", "-r", "0", "4", "1"])
+            assert file is None and "16" in content and len(content) <= math_utils.MAX_MESSAGE
+
+            long = "x^2" + "+0.000000000*x" * 135  # a few rows, but the expression is most of it
+            content, file = await math_utils.table([long, "-r", "0", "4", "1"])
+            assert file is not None and file.filename == "table.csv"
+        finally:
+            pool.close()
+
+    asyncio.run(run())